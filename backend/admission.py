@@ -0,0 +1,143 @@
+"""Admit new sessions only while the server can still serve everyone it has.
+
+Every admitted session is promised at least ``FLOW_MIN_FPS`` analysed frames a
+second.  A new session is refused when keeping that promise for all sessions
+would no longer fit in the usable inference capacity, costing each frame at
+what frames actually take.  It is also refused while the machine's CPU is
+saturated.  A new session that fits only at a lower rate joins the reduced
+tier, which starts at smaller frames and a lower frame-rate cap.  Refused
+clients are told when to retry, and ``/health`` reports the capacity left so
+a load balancer can send new patients elsewhere.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from flow_control import FlowController
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "1") == "1"
+# Machine-wide CPU use above which new sessions are refused
+ADMISSION_MAX_CPU = float(os.environ.get("ADMISSION_MAX_CPU", "0.95"))
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "15"))
+# Assumed cost of a frame until one has been measured
+ADMISSION_DEFAULT_FRAME_MS = float(os.environ.get("ADMISSION_DEFAULT_FRAME_MS", "40"))
+
+
+class CpuSampler:
+    """Machine-wide CPU utilisation from /proc/stat, averaged since the previous sample."""
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._last: Optional[Tuple[float, int, int]] = None
+        self.utilisation: Optional[float] = None
+
+    @staticmethod
+    def _read() -> Optional[Tuple[int, int]]:
+        try:
+            with open("/proc/stat") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        # idle and iowait are the time the CPUs had nothing to run
+        return sum(values), values[3] + (values[4] if len(values) > 4 else 0)
+
+    def sample(self) -> Optional[float]:
+        now = time.monotonic()
+        if self._last is not None and now - self._last[0] < self.min_interval:
+            return self.utilisation
+        reading = self._read()
+        if reading is None:
+            return None
+        total, idle = reading
+        if self._last is not None and total > self._last[1]:
+            self.utilisation = 1.0 - (idle - self._last[2]) / (total - self._last[1])
+        self._last = (now, total, idle)
+        return self.utilisation
+
+
+@dataclass
+class AdmissionDecision:
+    """Whether a new session may start, and on which tier."""
+    admitted: bool
+    tier: str = "standard"
+    retry_after: int = 0
+    reason: str = ""
+
+
+class AdmissionController:
+    """Decides whether new sessions fit alongside the ones already being served."""
+
+    def __init__(self, flow: FlowController, enabled: bool = ADMISSION_CONTROL,
+                 max_cpu: float = ADMISSION_MAX_CPU, retry_after: int = ADMISSION_RETRY_AFTER,
+                 default_frame_ms: float = ADMISSION_DEFAULT_FRAME_MS):
+        self.flow = flow
+        self.enabled = enabled
+        self.max_cpu = max_cpu
+        self.retry_after = retry_after
+        self.default_frame_ms = default_frame_ms
+        self.cpu = CpuSampler()
+        self.counters = {"admitted_standard": 0, "admitted_reduced": 0, "refused": 0}
+
+    def _frame_ms(self) -> float:
+        return self.flow.typical_frame_ms() or self.default_frame_ms
+
+    def _usable_ms(self) -> float:
+        return self.flow.capacity_ms * self.flow.utilisation
+
+    def assess(self) -> AdmissionDecision:
+        """What would happen to a session asking to start now."""
+        if not self.enabled:
+            return AdmissionDecision(True)
+        frame_ms = self._frame_ms()
+        usable = self._usable_ms()
+        cpu = self.cpu.sample()
+        if self.flow.reserved_ms(frame_ms) + self.flow.min_fps * frame_ms > usable:
+            return AdmissionDecision(False, retry_after=self.retry_after,
+                                     reason="inference capacity is fully committed")
+        if cpu is not None and cpu >= self.max_cpu:
+            return AdmissionDecision(False, retry_after=self.retry_after, reason="CPU is saturated")
+        if self.flow.demand_ms() + self.flow.max_fps * frame_ms > usable:
+            return AdmissionDecision(True, tier="reduced")
+        return AdmissionDecision(True)
+
+    def admit(self, session_id: str) -> AdmissionDecision:
+        """Decide on a session that is starting now, count the outcome and hold its place.
+
+        An admitted session is tracked by flow control before this returns, so
+        connections arriving together cannot all be admitted into the same spare
+        capacity.  Call ``release`` if the session then fails to start.
+        """
+        decision = self.assess()
+        if decision.admitted:
+            self.flow.start_session(session_id, decision.tier)
+            self.counters[f"admitted_{decision.tier}"] += 1
+        else:
+            self.counters["refused"] += 1
+            logger.warning(f"Refusing a new session: {decision.reason}")
+        return decision
+
+    def release(self, session_id: str):
+        """Give back the place of an admitted session that did not start."""
+        self.flow.end_session(session_id)
+
+    def capacity(self) -> Dict:
+        """Capacity left for new sessions, for load balancers."""
+        frame_ms = self._frame_ms()
+        free_ms = self._usable_ms() - self.flow.reserved_ms(frame_ms)
+        decision = self.assess()
+        return {
+            "accepting_sessions": decision.admitted,
+            "next_session_tier": decision.tier if decision.admitted else None,
+            "retry_after": decision.retry_after or None,
+            "estimated_free_sessions": max(0, int(free_ms // (self.flow.min_fps * frame_ms))),
+            "load": round(self.flow.load(), 3),
+            "cpu_utilisation": round(self.cpu.utilisation, 3) if self.cpu.utilisation is not None else None,
+            "frame_ms": round(frame_ms, 2)
+        }
+
+    def stats(self) -> Dict:
+        return {**self.counters, "enabled": self.enabled, **self.capacity()}
@@ -0,0 +1,91 @@
+"""Posture checkers built and warmed up before a session asks for one.
+
+Building a checker creates a MediaPipe pose graph, and its first frame pays for
+graph and TFLite delegate initialisation.  The pool does both ahead of time and
+tops itself back up in the background after each hand-out, so a new session's
+first frame runs at steady-state latency.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class PostureCheckerPool:
+    """A small stock of warmed-up posture checkers for new sessions."""
+
+    def __init__(self, size: int, factory: Callable):
+        self.size = size
+        self.factory = factory
+        self._ready: List = []
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._closed = False
+        self.counters = {"warm_hits": 0, "cold_builds": 0}
+        self.last_warm_up_ms = None
+
+    def _build_warm(self):
+        started = time.perf_counter()
+        checker = self.factory()
+        checker.warm_up()
+        self.last_warm_up_ms = (time.perf_counter() - started) * 1000
+        return checker
+
+    def fill(self):
+        """Build and warm up checkers until the pool is full. Blocking."""
+        while True:
+            with self._lock:
+                if self._closed or len(self._ready) >= self.size:
+                    return
+            checker = self._build_warm()
+            with self._lock:
+                if self._closed:
+                    checker.close()
+                    return
+                self._ready.append(checker)
+
+    def acquire(self):
+        """Take a warm checker, or build a cold one if none is left. Blocking."""
+        with self._lock:
+            checker = self._ready.pop() if self._ready else None
+            self.counters["warm_hits" if checker else "cold_builds"] += 1
+        if checker is None:
+            checker = self.factory()
+        self._start_refill()
+        return checker
+
+    def _start_refill(self):
+        with self._lock:
+            if self._refilling or self._closed or len(self._ready) >= self.size:
+                return
+            self._refilling = True
+
+        def refill():
+            try:
+                self.fill()
+            except Exception as e:
+                logger.error(f"Error refilling posture checker pool: {e}")
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        threading.Thread(target=refill, name="checker-pool-refill", daemon=True).start()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "size": self.size,
+                "available": len(self._ready),
+                "last_warm_up_ms": self.last_warm_up_ms
+            }
+
+    def close(self):
+        """Release every pooled checker; later acquires still build cold ones."""
+        with self._lock:
+            self._closed = True
+            checkers, self._ready = self._ready, []
+        for checker in checkers:
+            checker.close()
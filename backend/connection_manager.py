@@ -0,0 +1,193 @@
+"""Outbound message queues for WebSocket sessions.
+
+Every connection gets a bounded queue drained by its own sender task, so
+handlers and broadcasts only ever enqueue and never wait on a client's socket.
+A client whose queue overflows, or whose send misses its deadline, is evicted:
+its socket is closed and it is dropped from the registry.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Close code 1013: "Try Again Later"
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """One WebSocket and the queue of messages waiting to be sent to it."""
+
+    def __init__(self, session_id: str, websocket: WebSocket, manager: "ConnectionManager"):
+        self.session_id = session_id
+        self.websocket = websocket
+        self.manager = manager
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=manager.max_queue)
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.sent = 0
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def enqueue(self, text: str, deadline: Optional[float] = None,
+                delivered: Optional[asyncio.Future] = None) -> bool:
+        """Queue a serialised message; evicts the client if its queue is full."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((text, deadline, delivered))
+            return True
+        except asyncio.QueueFull:
+            self.evict("send queue overflow")
+            return False
+
+    async def _send_loop(self):
+        while True:
+            text, deadline, delivered = await self.queue.get()
+            timeout = self.manager.send_timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+            try:
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(self.websocket.send_text(text), timeout)
+                self.sent += 1
+                if delivered and not delivered.done():
+                    delivered.set_result(True)
+            except asyncio.TimeoutError:
+                self._fail(delivered)
+                self.evict("send deadline exceeded")
+                return
+            except Exception as e:
+                self._fail(delivered)
+                self.evict(f"send failed: {e}")
+                return
+
+    @staticmethod
+    def _fail(delivered: Optional[asyncio.Future]):
+        if delivered and not delivered.done():
+            delivered.set_result(False)
+
+    def evict(self, reason: str):
+        """Stop sending to this client, close its socket and unregister it."""
+        if self.closed:
+            return
+        logger.warning(f"Evicting session {self.session_id}: {reason}")
+        self.manager.evictions += 1
+        self.close_reason = reason
+        self._stop()
+        asyncio.create_task(self._close_socket(SLOW_CLIENT_CLOSE_CODE, reason))
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None):
+        if self.closed:
+            return
+        self._stop()
+        await self._close_socket(code, reason)
+
+    def _stop(self):
+        self.closed = True
+        self.manager.unregister(self)
+        if self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        # Anything still queued will never be sent
+        while not self.queue.empty():
+            self._fail(self.queue.get_nowait()[2])
+
+    async def _close_socket(self, code: int, reason: Optional[str]):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason or ""),
+                                   self.manager.send_timeout)
+        except Exception:
+            pass
+
+
+class ConnectionManager:
+    """Registry of live WebSocket connections keyed by session id."""
+
+    def __init__(self, max_queue: int = 32, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.connections: Dict[str, ClientConnection] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.connections
+
+    def register(self, session_id: str, websocket: WebSocket) -> ClientConnection:
+        previous = self.connections.get(session_id)
+        if previous is not None:
+            asyncio.create_task(previous.close(reason="replaced by a new connection"))
+        connection = ClientConnection(session_id, websocket, self)
+        self.connections[session_id] = connection
+        return connection
+
+    def unregister(self, connection: ClientConnection):
+        # A reconnect may already have replaced this connection under the same id
+        if self.connections.get(connection.session_id) is connection:
+            del self.connections[connection.session_id]
+
+    def get(self, session_id: str) -> Optional[ClientConnection]:
+        return self.connections.get(session_id)
+
+    def send(self, session_id: str, message: Dict) -> bool:
+        """Queue a message for one session without waiting for the socket."""
+        return self.send_text(session_id, json.dumps(message))
+
+    def send_text(self, session_id: str, text: str) -> bool:
+        """Queue an already-serialised message for one session."""
+        connection = self.connections.get(session_id)
+        if connection is None:
+            return False
+        return connection.enqueue(text)
+
+    async def disconnect(self, session_id: str):
+        connection = self.connections.get(session_id)
+        if connection is not None:
+            await connection.close(reason="session ended")
+
+    async def broadcast(self, message: Dict, deadline: float) -> Dict[str, List[str]]:
+        """Send one message to every connection, waiting at most ``deadline`` seconds."""
+        text = json.dumps(message)
+        expires = time.monotonic() + deadline
+        loop = asyncio.get_running_loop()
+
+        pending = {}
+        evicted = []
+        # Iterate over a snapshot: evictions mutate the registry
+        for session_id, connection in list(self.connections.items()):
+            delivered = loop.create_future()
+            if connection.enqueue(text, expires, delivered):
+                pending[session_id] = (connection, delivered)
+            else:
+                evicted.append(session_id)
+
+        if pending:
+            await asyncio.wait([delivered for _, delivered in pending.values()], timeout=deadline)
+
+        delivered_to = []
+        for session_id, (connection, delivered) in pending.items():
+            if delivered.done() and delivered.result():
+                delivered_to.append(session_id)
+            else:
+                evicted.append(session_id)
+                connection.evict("broadcast deadline exceeded")
+        return {"delivered": delivered_to, "evicted": evicted}
+
+    def stats(self) -> Dict:
+        return {
+            "connections": len(self.connections),
+            "queued_messages": sum(c.queue.qsize() for c in self.connections.values()),
+            "max_queue": self.max_queue,
+            "send_timeout": self.send_timeout,
+            "evictions": self.evictions
+        }
+
+    async def close_all(self):
+        for connection in list(self.connections.values()):
+            await connection.close(1001, "server shutting down")
@@ -0,0 +1,214 @@
+"""Tell each client how many frames, and how large, the server can take.
+
+Every analysed frame reports how long it took.  From that and the frame rate
+the session is actually sending, the controller works out the share of the
+server's inference capacity each session may use and turns it into a target
+frame rate.  When even the minimum frame rate does not fit, the session is
+asked for smaller, more compressed frames; when there is headroom again it is
+allowed back up.  A ``flow_control`` message goes out only when the advice
+changes, and at most once per update interval per session.  A parked session
+is suspended: it neither counts towards demand nor holds capacity until it
+resumes.
+"""
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+FLOW_MAX_FPS = float(os.environ.get("FLOW_MAX_FPS", "10"))
+FLOW_MIN_FPS = float(os.environ.get("FLOW_MIN_FPS", "2"))
+# Fraction of inference capacity handed out, leaving room for control messages and bursts
+FLOW_TARGET_UTILISATION = float(os.environ.get("FLOW_TARGET_UTILISATION", "0.8"))
+FLOW_UPDATE_INTERVAL = float(os.environ.get("FLOW_UPDATE_INTERVAL", "1"))
+# Sessions admitted while the server is busy start smaller and are capped at a lower rate
+FLOW_REDUCED_MAX_FPS = float(os.environ.get("FLOW_REDUCED_MAX_FPS", "5"))
+FLOW_REDUCED_LEVEL = int(os.environ.get("FLOW_REDUCED_LEVEL", "2"))
+
+# (max width, max height, JPEG quality), from what the client sends by default down
+FRAME_LEVELS: List[Tuple[int, int, float]] = [
+    (1280, 720, 0.8),
+    (960, 540, 0.7),
+    (640, 360, 0.6),
+    (480, 270, 0.5),
+]
+# Wait this long after a size change so the timings reflect the new frames
+LEVEL_SETTLE_SECONDS = 3.0
+SMOOTHING = 0.2
+
+
+class SessionFlow:
+    """Measured cost and current advice for one session."""
+
+    def __init__(self, max_fps: float = FLOW_MAX_FPS, level: int = 0, tier: str = "standard"):
+        self.processing_ms: Optional[float] = None
+        self.frames = 0
+        self.fps = 0.0
+        self.tier = tier
+        self.max_fps = max_fps
+        self.level = level
+        self.target_fps = max_fps
+        self.advised: Optional[Dict] = None
+        self.last_frame: Optional[float] = None
+        self.last_sent = 0.0
+        self.level_changed = 0.0
+
+    def record(self, processing_ms: float, now: float):
+        self.frames += 1
+        if self.last_frame is not None and now > self.last_frame:
+            self.fps += SMOOTHING * (1.0 / (now - self.last_frame) - self.fps)
+        self.last_frame = now
+        if self.frames == 1:
+            # A session's first frame may pay for building its pose graph; it says little about the rest
+            return
+        if self.processing_ms is None:
+            self.processing_ms = processing_ms
+        else:
+            self.processing_ms += SMOOTHING * (processing_ms - self.processing_ms)
+
+    @property
+    def demand_ms(self) -> float:
+        """Inference milliseconds per second this session is currently using."""
+        return self.fps * (self.processing_ms or 0.0)
+
+    def advice(self) -> Dict:
+        max_width, max_height, quality = FRAME_LEVELS[self.level]
+        return {
+            "target_fps": self.target_fps,
+            "max_width": max_width,
+            "max_height": max_height,
+            "jpeg_quality": quality
+        }
+
+
+class FlowController:
+    """Shares inference capacity between sessions and advises clients of their share."""
+
+    def __init__(self, capacity_ms: float, max_fps: float = FLOW_MAX_FPS, min_fps: float = FLOW_MIN_FPS,
+                 utilisation: float = FLOW_TARGET_UTILISATION, update_interval: float = FLOW_UPDATE_INTERVAL):
+        # Inference milliseconds available per second across all sessions
+        self.capacity_ms = capacity_ms
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.utilisation = utilisation
+        self.update_interval = update_interval
+        self.sessions: Dict[str, SessionFlow] = {}
+        # Parked sessions, kept out of every share and reservation until they resume
+        self.suspended: Dict[str, SessionFlow] = {}
+        self.updates_sent = 0
+
+    def start_session(self, session_id: str, tier: str = "standard") -> Dict:
+        """Track a new session and return the advice to open it with; a resumed one keeps its own."""
+        flow = self.sessions.get(session_id)
+        if flow is None:
+            if tier == "reduced":
+                flow = SessionFlow(min(self.max_fps, FLOW_REDUCED_MAX_FPS),
+                                   min(FLOW_REDUCED_LEVEL, len(FRAME_LEVELS) - 1), tier)
+            else:
+                flow = SessionFlow(self.max_fps)
+            self.sessions[session_id] = flow
+        flow.advised = flow.advice()
+        return flow.advised
+
+    def end_session(self, session_id: str):
+        self.sessions.pop(session_id, None)
+        self.suspended.pop(session_id, None)
+
+    def suspend(self, session_id: str):
+        """Stop counting a session whose client has gone, keeping its measurements."""
+        flow = self.sessions.pop(session_id, None)
+        if flow is not None:
+            self.suspended[session_id] = flow
+
+    def resume(self, session_id: str) -> bool:
+        """Count a suspended session again; False if it was not suspended."""
+        flow = self.suspended.pop(session_id, None)
+        if flow is None:
+            return False
+        # The time spent parked is not a gap between frames
+        flow.last_frame = None
+        self.sessions[session_id] = flow
+        return True
+
+    def record(self, session_id: str, processing_ms: float) -> Optional[Dict]:
+        """Account one analysed frame; return new advice if it has changed enough to send."""
+        flow = self.sessions.get(session_id)
+        if flow is None:
+            return None
+        now = time.monotonic()
+        flow.record(processing_ms, now)
+        if flow.processing_ms is None:
+            return None
+
+        budget = self.budget_ms(session_id)
+        affordable = budget / max(flow.processing_ms, 1e-3)
+        if affordable < self.min_fps and flow.level < len(FRAME_LEVELS) - 1 \
+                and now - flow.level_changed >= LEVEL_SETTLE_SECONDS:
+            # Even the slowest rate does not fit: ask for cheaper frames
+            flow.level += 1
+            flow.level_changed = now
+        elif affordable > flow.max_fps * 1.5 and flow.level > 0 \
+                and now - flow.level_changed >= LEVEL_SETTLE_SECONDS:
+            flow.level -= 1
+            flow.level_changed = now
+        target_fps = max(self.min_fps, min(flow.max_fps, int(affordable * 2) / 2))
+        # Ignore small swings so timing jitter does not produce an update every second
+        if abs(target_fps - flow.target_fps) >= max(1.0, 0.1 * flow.target_fps):
+            flow.target_fps = target_fps
+
+        advice = flow.advice()
+        if advice == flow.advised or now - flow.last_sent < self.update_interval:
+            return None
+        flow.advised = advice
+        flow.last_sent = now
+        self.updates_sent += 1
+        return advice
+
+    def budget_ms(self, session_id: str) -> float:
+        """Inference milliseconds per second one session may use."""
+        usable = self.capacity_ms * self.utilisation
+        count = max(1, len(self.sessions))
+        own = self.sessions[session_id].demand_ms
+        headroom = usable - self.demand_ms()
+        if headroom >= 0:
+            # Spare capacity is shared out equally on top of what each session uses now
+            return own + headroom / count
+        # Overloaded: sessions above an equal share come down to it
+        return min(own, usable / count)
+
+    def demand_ms(self) -> float:
+        """Inference milliseconds per second all sessions are using now."""
+        return sum(flow.demand_ms for flow in self.sessions.values())
+
+    def typical_frame_ms(self) -> Optional[float]:
+        """Mean measured cost of a frame across sessions, or None before any frame."""
+        measured = [flow.processing_ms for flow in self.sessions.values() if flow.processing_ms is not None]
+        return sum(measured) / len(measured) if measured else None
+
+    def reserved_ms(self, frame_ms: float) -> float:
+        """Inference milliseconds per second that keep every session at the minimum frame rate."""
+        return sum(self.min_fps * (flow.processing_ms if flow.processing_ms is not None else frame_ms)
+                   for flow in self.sessions.values())
+
+    def load(self) -> float:
+        """Fraction of inference capacity currently in use."""
+        return self.demand_ms() / self.capacity_ms
+
+    def session_stats(self, session_id: str) -> Optional[Dict]:
+        flow = self.sessions.get(session_id) or self.suspended.get(session_id)
+        if flow is None:
+            return None
+        return {
+            **flow.advice(),
+            "tier": flow.tier,
+            "suspended": session_id in self.suspended,
+            "processing_ms": round(flow.processing_ms, 2) if flow.processing_ms is not None else None,
+            "measured_fps": round(flow.fps, 2)
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "capacity_ms": self.capacity_ms,
+            "load": round(self.load(), 3),
+            "sessions": len(self.sessions),
+            "suspended_sessions": len(self.suspended),
+            "updates_sent": self.updates_sent
+        }
@@ -0,0 +1,78 @@
+"""Decode camera JPEGs no larger than pose inference needs.
+
+MediaPipe scales every frame down to its own small input, so decoding a
+1280x720 upload at full size mostly produces pixels that are thrown away.  The
+JPEG header gives the size before decoding; when the longest side is at least
+twice ``INFERENCE_MAX_SIDE`` the frame is decoded at 1/2, 1/4 or 1/8 scale with
+libjpeg's DCT scaling, which is faster than a full decode plus resize.
+Landmarks are normalised to the frame, so scoring does not change.
+
+This is opt-in: the overlay is drawn on the decoded frame, so with it enabled
+``annotated_frame`` comes back at the reduced size (e.g. 640x360 for a 1280x720
+upload) and clients must scale it up for display.  ``INFERENCE_MAX_SIDE`` is 0,
+full size, unless set.
+"""
+import os
+import struct
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Longest side the decoded frame needs for inference (640 suits MediaPipe); 0 decodes at full size
+INFERENCE_MAX_SIDE = int(os.environ.get("INFERENCE_MAX_SIDE", "0"))
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# Start-of-frame markers carry the image size; C4, C8 and CC share the range but are not frames
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's start-of-frame header, or None if it cannot be found."""
+    view = memoryview(data).cast("B")
+    if len(view) < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 <= len(view):
+        if view[i] != 0xFF:
+            return None
+        marker = view[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker == 0xD9:
+            return None
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack_from(">HH", view, i + 5)
+            return width, height
+        i += 2 + struct.unpack_from(">H", view, i + 2)[0]
+    return None
+
+
+def decode_flag(width: int, height: int, max_side: int = INFERENCE_MAX_SIDE) -> int:
+    """The imdecode flag that shrinks a frame the most while keeping its longest side >= ``max_side``."""
+    if max_side > 0:
+        longest = max(width, height)
+        for factor, flag in _REDUCED_FLAGS:
+            if longest // factor >= max_side:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_jpeg(data, max_side: int = INFERENCE_MAX_SIDE) -> Optional[np.ndarray]:
+    """Decode JPEG bytes (or any buffer) to BGR at the reduced size inference needs."""
+    flag = cv2.IMREAD_COLOR
+    if max_side > 0:
+        size = jpeg_dimensions(data)
+        if size is not None:
+            flag = decode_flag(*size, max_side)
+    buffer = data if isinstance(data, np.ndarray) else np.frombuffer(data, np.uint8)
+    return cv2.imdecode(buffer, flag)
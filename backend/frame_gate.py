@@ -0,0 +1,76 @@
+"""Skip pose inference on frames that have barely changed.
+
+Right after decode each frame is shrunk to a small grayscale thumbnail and
+compared with the thumbnail of the last frame that went through inference.
+Counting pixels that changed noticeably, rather than averaging the difference,
+keeps a moving limb visible against a large still background and ignores
+sensor and compression noise.  If too few pixels changed, the previous pose is
+reused, up to a maximum number of frames in a row, so a patient holding a pose
+still gets a full response at the normal rate without a full ``pose.process``.
+"""
+import os
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+# Fraction of thumbnail pixels that must change for a frame to count as moving; 0 disables
+MOTION_GATE_THRESHOLD = float(os.environ.get("MOTION_GATE_THRESHOLD", "0.005"))
+# Frames in a row that may reuse one inference before a fresh one is forced
+MOTION_GATE_MAX_REUSE = int(os.environ.get("MOTION_GATE_MAX_REUSE", "5"))
+THUMBNAIL_SIZE = (64, 48)
+# Grayscale difference (0-255) above which a thumbnail pixel counts as changed
+PIXEL_DELTA = 12
+
+
+class MotionGate:
+    """Per-session decision of whether a decoded frame needs pose inference."""
+
+    def __init__(self, threshold: float = MOTION_GATE_THRESHOLD, max_reuse: int = MOTION_GATE_MAX_REUSE):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.frames = 0
+        self.skipped = 0
+        self._reference: Optional[np.ndarray] = None
+        self._reused = 0
+        # Reused per frame: a grayscale copy, a thumbnail, and the changed-pixel mask
+        self._gray: Optional[np.ndarray] = None
+        self._thumbnail = np.empty(THUMBNAIL_SIZE[::-1], dtype=np.uint8)
+        self._delta = np.empty_like(self._thumbnail)
+
+    def should_skip(self, frame: np.ndarray) -> bool:
+        """Return True if ``frame`` can reuse the last inference; otherwise it becomes the reference."""
+        self.frames += 1
+        if self.threshold <= 0:
+            return False
+
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        thumbnail = cv2.resize(self._gray, THUMBNAIL_SIZE, dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        if self._reference is not None and self._reused < self.max_reuse:
+            cv2.absdiff(thumbnail, self._reference, dst=self._delta)
+            cv2.compare(self._delta, PIXEL_DELTA, cv2.CMP_GT, dst=self._delta)
+            if cv2.countNonZero(self._delta) / thumbnail.size < self.threshold:
+                self._reused += 1
+                self.skipped += 1
+                return True
+
+        # The thumbnail becomes the reference; the old reference is overwritten next time
+        if self._reference is None:
+            self._reference = np.empty_like(thumbnail)
+        self._reference, self._thumbnail = thumbnail, self._reference
+        self._reused = 0
+        return False
+
+    def record(self, skipped: bool):
+        """Count a frame whose decision was made by another gate, such as an inference worker's."""
+        self.frames += 1
+        self.skipped += skipped
+
+    def stats(self) -> Dict:
+        return {
+            "frames": self.frames,
+            "inference_skipped": self.skipped,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0.0
+        }
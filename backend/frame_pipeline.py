@@ -0,0 +1,148 @@
+"""Overlap the stages of a session's frames instead of running them back to back.
+
+A frame goes through three stages: decode, pose inference, then drawing,
+scoring and JPEG encoding.  In pipelined mode each stage is its own task with a
+small fixed-depth queue in front of it, and the heavy work runs in threads, so
+frame N+1 is decoded while frame N is in inference and frame N-1 is encoded.
+Each stage handles one frame at a time in arrival order, so results come out
+in order and MediaPipe tracking sees the frames in sequence.  With a frame
+scheduler the inference stage waits for the session's turn there, so pipelined
+sessions share inference fairly with everyone else.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+
+from frame_scheduler import FrameDropped
+
+if TYPE_CHECKING:
+    from posture_checker import PhysiotherapyPostureChecker
+
+logger = logging.getLogger(__name__)
+
+# Sessions start pipelined when set; clients can switch with update_settings
+FRAME_PIPELINE = os.environ.get("FRAME_PIPELINE", "0") == "1"
+# Frames waiting in front of each stage
+FRAME_PIPELINE_DEPTH = int(os.environ.get("FRAME_PIPELINE_DEPTH", "2"))
+
+
+class _FrameJob:
+    def __init__(self, frame_base64: str, started: float, frame_id=None):
+        self.frame_base64 = frame_base64
+        self.started = started
+        self.frame_id = frame_id
+        self.frame = None
+        self.pose_results = None
+        self.pose_reused = False
+        self.result: Optional[Dict] = None
+        # Cleared from the scheduler before its inference turn; nobody is waiting for its result
+        self.dropped = False
+
+
+class FramePipeline:
+    """Decode, inference and encode stages for one session's frames."""
+
+    def __init__(self, checker: "PhysiotherapyPostureChecker", on_result: Callable[[Dict, float], None],
+                 depth: int = FRAME_PIPELINE_DEPTH,
+                 schedule: Optional[Callable[[Callable[[], Awaitable[None]]], Awaitable[None]]] = None):
+        self.checker = checker
+        # Called on the event loop with each result, in frame order, and when its frame arrived
+        self.on_result = on_result
+        self.depth = depth
+        # Runs the inference stage's work in the session's scheduler turn; None runs it straight away
+        self.schedule = schedule
+        self.frames = 0
+        self.dropped = 0
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._to_decode = asyncio.Queue(depth)
+        self._to_infer = asyncio.Queue(depth)
+        self._to_encode = asyncio.Queue(depth)
+        self._tasks = [
+            asyncio.create_task(self._stage(self._to_decode, self._to_infer, self._decode)),
+            asyncio.create_task(self._stage(self._to_infer, self._to_encode, self._infer, scheduled=True)),
+            asyncio.create_task(self._stage(self._to_encode, None, self._encode)),
+        ]
+
+    async def submit(self, frame_base64: str, started: Optional[float] = None, frame_id=None):
+        """Queue a frame; waits while the first stage is full.  ``frame_id`` is echoed on its result."""
+        self._in_flight += 1
+        self._idle.clear()
+        await self._to_decode.put(_FrameJob(frame_base64, started or time.perf_counter(), frame_id))
+
+    def _decode(self, job: _FrameJob):
+        job.frame = self.checker.decode_frame(job.frame_base64)
+        if job.frame is None:
+            job.result = self.checker.frame_error("Invalid frame data", "Could not process frame")
+
+    def _infer(self, job: _FrameJob):
+        job.pose_results, job.pose_reused = self.checker.detect_pose(job.frame)
+
+    def _encode(self, job: _FrameJob):
+        landmarks = self.checker.landmark_array(job.pose_results)
+        score = self.checker.score_landmarks(landmarks)
+        buffer = self.checker.annotate_frame(job.frame, landmarks, score)
+        job.result = self.checker.build_frame_result(landmarks, buffer, job.pose_reused, score)
+
+    async def _stage(self, source: asyncio.Queue, sink: Optional[asyncio.Queue], work: Callable,
+                     scheduled: bool = False):
+        while True:
+            job = await source.get()
+            # Frames that already failed or were dropped skip the remaining work but keep their place
+            if job.result is None and not job.dropped:
+                if scheduled and self.schedule is not None:
+                    try:
+                        # The dispatcher owns the work once its turn starts, and lets it finish
+                        await self.schedule(lambda: asyncio.to_thread(work, job))
+                    except FrameDropped:
+                        job.dropped = True
+                    except Exception as e:
+                        job.result = self.checker.frame_error(str(e), "Error processing frame")
+                else:
+                    running = asyncio.ensure_future(asyncio.to_thread(work, job))
+                    try:
+                        await asyncio.shield(running)
+                    except asyncio.CancelledError:
+                        # Let the thread finish with the checker before the session closes it
+                        await asyncio.wait([running])
+                        raise
+                    except Exception as e:
+                        job.result = self.checker.frame_error(str(e), "Error processing frame")
+            if sink is not None:
+                await sink.put(job)
+                continue
+
+            if job.dropped:
+                self.dropped += 1
+            else:
+                self.frames += 1
+                if job.frame_id is not None:
+                    job.result["frame_id"] = job.frame_id
+                try:
+                    self.on_result(job.result, job.started)
+                except Exception as e:
+                    logger.error(f"Error delivering a pipelined frame result: {e}")
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.set()
+
+    async def drain(self):
+        """Wait until every submitted frame has been delivered."""
+        await self._idle.wait()
+
+    async def close(self):
+        """Stop the stages; frames still in the pipeline are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "depth": self.depth,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "in_flight": self._in_flight
+        }
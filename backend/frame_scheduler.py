@@ -0,0 +1,319 @@
+"""Per-session frame queues served in a fair order by a fixed set of dispatchers.
+
+A session with a frame waiting and none started for ``1 / FLOW_MIN_FPS``
+seconds goes first.  Otherwise ``supervised`` sessions go ahead of
+``self_guided`` ones, and within a priority ``FRAME_SCHEDULER`` picks the
+order: ``fair`` serves the session charged the least analysis time,
+``round_robin`` one frame per session per turn, ``fifo`` arrival order, and
+``off`` leaves frames to be analysed as they are read.  Each queue holds
+``FRAME_QUEUE_DEPTH`` frames; a newer frame replaces the oldest.  Pipelined
+sessions wait here for a turn at their inference stage through ``run``.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from flow_control import FLOW_MIN_FPS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SCHEDULING_MODES = ("fair", "round_robin", "fifo", "off")
+FRAME_SCHEDULER = os.environ.get("FRAME_SCHEDULER", "fair")
+# Frames analysed at once; 0 means one per inference worker, or one in process
+FRAME_SCHEDULER_CONCURRENCY = int(os.environ.get("FRAME_SCHEDULER_CONCURRENCY", "0"))
+# Frames waiting per session before a newer one replaces the oldest
+FRAME_QUEUE_DEPTH = int(os.environ.get("FRAME_QUEUE_DEPTH", "2"))
+
+# Highest first
+PRIORITY_LEVELS = ("supervised", "self_guided")
+DEFAULT_PRIORITY = "self_guided"
+# Recent scheduling delays kept per session
+DELAY_WINDOW = 100
+
+
+def delay_summary(delays) -> Dict:
+    if not delays:
+        return {"delay_ms_mean": None, "delay_ms_p95": None, "delay_ms_max": None}
+    ordered = sorted(delays)
+    return {
+        "delay_ms_mean": round(sum(ordered) / len(ordered), 2),
+        "delay_ms_p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+        "delay_ms_max": round(ordered[-1], 2)
+    }
+
+
+class FrameDropped(Exception):
+    """Raised by ``FrameScheduler.run`` when the frame is dropped before its turn."""
+
+
+class _FrameJob:
+    def __init__(self, run: Callable[[], Awaitable[None]], drop: Callable[[], None], awaited: bool = False):
+        self.run = run
+        self.drop = drop
+        self.queued = time.perf_counter()
+        # Submitted through run(): dropping it only wakes the caller, so it is done even unanswered
+        self.awaited = awaited
+
+
+class _SessionQueue:
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.priority = DEFAULT_PRIORITY
+        self.jobs: Deque[_FrameJob] = deque()
+        # In its priority's turn order; true exactly while frames are waiting
+        self.waiting = False
+        # Set while one of its frames is being analysed; a session's frames run one at a time
+        self.running: Optional[asyncio.Future] = None
+        # Analysis milliseconds charged in fair mode, on its priority's clock
+        self.charged_ms = 0.0
+        self.last_dispatch = now
+        self.delays: Deque[float] = deque(maxlen=DELAY_WINDOW)
+        self.counters = {"dispatched": 0, "superseded": 0, "ahead_for_min_fps": 0}
+
+
+class FrameScheduler:
+    """Per-session frame queues and the dispatchers that serve them in a fair order."""
+
+    def __init__(self, mode: str = FRAME_SCHEDULER, concurrency: int = 1, depth: int = FRAME_QUEUE_DEPTH,
+                 min_fps: float = FLOW_MIN_FPS):
+        if mode not in SCHEDULING_MODES:
+            logger.warning(f"Unknown frame scheduling mode {mode!r}; using fair")
+            mode = "fair"
+        self.mode = mode
+        self.concurrency = max(1, concurrency)
+        self.depth = max(1, depth)
+        self.min_fps = min_fps
+        self.sessions: Dict[str, _SessionQueue] = {}
+        # Sessions with frames waiting, per priority, in turn order
+        self.turns: Dict[str, Deque[_SessionQueue]] = {priority: deque() for priority in PRIORITY_LEVELS}
+        # What the last session served at each priority had been charged
+        self.clock_ms: Dict[str, float] = {priority: 0.0 for priority in PRIORITY_LEVELS}
+        self.running = 0
+        self.counters = {"dispatched": 0, "superseded": 0, "ahead_for_min_fps": 0}
+        self.delays: Deque[float] = deque(maxlen=DELAY_WINDOW * 10)
+        self._work = asyncio.Event()
+        self._dispatchers: List[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _session(self, session_id: str) -> _SessionQueue:
+        queue = self.sessions.get(session_id)
+        if queue is None:
+            queue = self.sessions[session_id] = _SessionQueue(session_id, time.perf_counter())
+        return queue
+
+    def priority(self, session_id: str) -> str:
+        queue = self.sessions.get(session_id)
+        return queue.priority if queue is not None else DEFAULT_PRIORITY
+
+    def set_priority(self, session_id: str, priority: str) -> bool:
+        """Move a session to another priority; False for an unknown one."""
+        if priority not in PRIORITY_LEVELS:
+            return False
+        queue = self._session(session_id)
+        if priority != queue.priority:
+            if queue.waiting:
+                self.turns[queue.priority].remove(queue)
+                self.turns[priority].append(queue)
+            queue.priority = priority
+            queue.charged_ms = self.clock_ms[priority]
+        return True
+
+    def submit(self, session_id: str, run: Callable[[], Awaitable[None]], drop: Callable[[], None],
+               awaited: bool = False):
+        """Queue a frame; ``run`` analyses it when its turn comes, ``drop`` answers it if it is superseded."""
+        queue = self._session(session_id)
+        if len(queue.jobs) >= self.depth:
+            stale = queue.jobs.popleft()
+            queue.counters["superseded"] += 1
+            self.counters["superseded"] += 1
+            try:
+                stale.drop()
+            except Exception as e:
+                logger.error(f"Error answering a superseded frame for {session_id}: {e}")
+        queue.jobs.append(_FrameJob(run, drop, awaited))
+        if not queue.waiting:
+            queue.waiting = True
+            self.turns[queue.priority].append(queue)
+            # Time saved while idle does not carry over; time overspent does
+            queue.charged_ms = max(queue.charged_ms, self.clock_ms[queue.priority])
+        self._work.set()
+
+    async def run(self, session_id: str, work: Callable[[], Awaitable[T]]) -> T:
+        """Queue ``work`` as one of the session's frames, wait for its turn and return its result.
+
+        Raises ``FrameDropped`` if the frame is superseded or cleared first.  A
+        caller cancelled after its turn has started leaves the work to finish on
+        the dispatcher, which ``clear`` waits for as usual.
+        """
+        outcome = asyncio.get_running_loop().create_future()
+
+        async def turn():
+            if outcome.done():
+                # The caller stopped waiting before its turn came
+                return
+            try:
+                result = await work()
+            except Exception as e:
+                if not outcome.done():
+                    outcome.set_exception(e)
+            else:
+                if not outcome.done():
+                    outcome.set_result(result)
+
+        def dropped():
+            if not outcome.done():
+                outcome.set_exception(FrameDropped())
+
+        self.submit(session_id, turn, dropped, awaited=True)
+        return await outcome
+
+    def _leave_turns(self, queue: _SessionQueue):
+        if queue.waiting:
+            queue.waiting = False
+            self.turns[queue.priority].remove(queue)
+
+    def _overdue(self, now: float) -> Optional[_SessionQueue]:
+        if self.min_fps <= 0:
+            return None
+        due = now - 1.0 / self.min_fps
+        overdue = None
+        for turns in self.turns.values():
+            for queue in turns:
+                if queue.running is None and queue.last_dispatch <= due \
+                        and (overdue is None or queue.last_dispatch < overdue.last_dispatch):
+                    overdue = queue
+        return overdue
+
+    def _take_turn(self, priority: str) -> Optional[_SessionQueue]:
+        turns = self.turns[priority]
+        ready = [queue for queue in turns if queue.running is None]
+        if not ready:
+            return None
+        if self.mode == "fifo":
+            return min(ready, key=lambda q: q.jobs[0].queued)
+        if self.mode == "fair":
+            queue = min(ready, key=lambda q: q.charged_ms)
+            self.clock_ms[priority] = queue.charged_ms
+            return queue
+        while turns[0].running is not None:
+            turns.rotate(-1)
+        queue = turns[0]
+        turns.rotate(-1)
+        return queue
+
+    def _next(self) -> Optional[_SessionQueue]:
+        queue = self._overdue(time.perf_counter())
+        if queue is not None:
+            queue.counters["ahead_for_min_fps"] += 1
+            self.counters["ahead_for_min_fps"] += 1
+            return queue
+        for priority in PRIORITY_LEVELS:
+            queue = self._take_turn(priority)
+            if queue is not None:
+                return queue
+        return None
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            queue = self._next()
+            if queue is None:
+                self._work.clear()
+                await self._work.wait()
+                continue
+
+            job = queue.jobs.popleft()
+            if not queue.jobs:
+                self._leave_turns(queue)
+            started = time.perf_counter()
+            delay_ms = (started - job.queued) * 1000
+            queue.delays.append(delay_ms)
+            self.delays.append(delay_ms)
+            queue.last_dispatch = started
+            queue.counters["dispatched"] += 1
+            self.counters["dispatched"] += 1
+            queue.running = loop.create_future()
+            self.running += 1
+            running = asyncio.ensure_future(job.run())
+            try:
+                await asyncio.shield(running)
+            except asyncio.CancelledError:
+                # Let the frame finish with the session's checker before shutdown closes it
+                await asyncio.wait([running])
+                raise
+            except Exception as e:
+                logger.error(f"Error analysing a frame for {queue.session_id}: {e}")
+            finally:
+                self.running -= 1
+                queue.charged_ms += (time.perf_counter() - started) * 1000
+                queue.running.set_result(None)
+                queue.running = None
+                if queue.jobs:
+                    # Its next frame may be due on another dispatcher
+                    self._work.set()
+
+    def start(self):
+        if self.enabled and not self._dispatchers:
+            self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.concurrency)]
+
+    async def clear(self, session_id: str, answer: bool = False):
+        """Drop a session's waiting frames and wait for the one being analysed, if any.
+
+        With ``answer`` the dropped frames are answered, for a client that is still connected.
+        """
+        queue = self.sessions.get(session_id)
+        if queue is None:
+            return
+        self._leave_turns(queue)
+        jobs, queue.jobs = queue.jobs, deque()
+        for job in jobs:
+            if not (answer or job.awaited):
+                continue
+            try:
+                job.drop()
+            except Exception as e:
+                logger.error(f"Error answering a dropped frame for {session_id}: {e}")
+        if queue.running is not None:
+            await asyncio.shield(queue.running)
+
+    async def end_session(self, session_id: str):
+        """Forget a session once none of its frames is queued or running."""
+        await self.clear(session_id)
+        self.sessions.pop(session_id, None)
+
+    async def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+
+    def session_stats(self, session_id: str) -> Optional[Dict]:
+        queue = self.sessions.get(session_id)
+        if queue is None:
+            return None
+        return {
+            "priority": queue.priority,
+            "queued": len(queue.jobs),
+            **queue.counters,
+            **delay_summary(queue.delays)
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "queue_depth": self.depth,
+            "min_fps": self.min_fps,
+            "running": self.running,
+            "queued": sum(len(queue.jobs) for queue in self.sessions.values()),
+            **self.counters,
+            **delay_summary(self.delays)
+        }
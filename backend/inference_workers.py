@@ -0,0 +1,405 @@
+"""Pose inference in worker processes over a shared-memory frame ring.
+
+The WebSocket layer writes each frame's JPEG bytes once into a free slot of a
+preallocated shared-memory ring and passes only the slot number to a worker.
+The worker decodes the JPEG straight from the slot, runs the motion gate and
+MediaPipe, writes the 33 landmarks into the slot's header and the annotated
+JPEG back over the input bytes.  The parent reads both in place and scores
+them with the session's own checker, so history and feedback state never
+leave the main process.
+
+Sessions are pinned to one worker so MediaPipe tracking stays continuous.
+Each worker answers over a pipe of its own, so a worker killed mid-write
+cannot stall the others.  A crashed worker is restarted; its in-flight frames
+are failed and counted as lost, and its sessions move to other workers on
+their next frame.  A worker that keeps dying before it is ready is restarted
+less and less often.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from pose_landmarks import LANDMARK_COUNT, LANDMARK_VALUES
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+INFERENCE_SLOTS = int(os.environ.get("INFERENCE_SLOTS", "0")) or max(4, INFERENCE_WORKERS * 4)
+INFERENCE_SLOT_BYTES = int(os.environ.get("INFERENCE_SLOT_BYTES", 2 * 1024 * 1024))
+# Restart delay after a worker dies, doubled each time it dies again before becoming ready
+WORKER_RESTART_DELAY = 0.5
+WORKER_RESTART_MAX_DELAY = float(os.environ.get("INFERENCE_RESTART_MAX_DELAY", "30"))
+
+# Per-slot header, followed in the segment by slots * slot_bytes of JPEG data
+SLOT_HEADER = np.dtype([
+    ("generation", np.int64),
+    ("in_length", np.int32),
+    ("out_length", np.int32),
+    ("has_pose", np.int8),
+    ("pose_reused", np.int8),
+    ("landmarks", np.float32, (LANDMARK_COUNT, LANDMARK_VALUES)),
+])
+
+
+class InferenceBusy(Exception):
+    """Raised when every ring slot is in use; the frame should be dropped."""
+
+
+class WorkerCrashed(Exception):
+    """Raised for a frame that was in flight on a worker that died."""
+
+
+T = TypeVar("T")
+# Called with (landmarks or None, annotated JPEG, pose_reused) while the slot is still held
+ResultConsumer = Callable[[Optional[np.ndarray], np.ndarray, bool], T]
+
+
+class FrameRing:
+    """Slot headers and JPEG buffers laid out in one shared-memory segment."""
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        header_bytes = SLOT_HEADER.itemsize * slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.headers = np.ndarray((slots,), dtype=SLOT_HEADER, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        del self.headers, self.data
+        self.shm.close()
+
+
+def _worker_main(index: int, ring_name: str, slots: int, slot_bytes: int,
+                 control: multiprocessing.Queue, results):
+    """Serve frames for the sessions pinned to this worker until told to stop."""
+    import cv2
+    from frame_decode import decode_jpeg
+    from posture_checker import PhysiotherapyPostureChecker
+
+    # Spawned workers share the parent's resource tracker, so attaching does not
+    # hand the segment's lifetime to this process; the parent unlinks it
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+
+    def warm_checker() -> PhysiotherapyPostureChecker:
+        checker = PhysiotherapyPostureChecker()
+        checker.warm_up()
+        return checker
+
+    checkers: Dict[str, PhysiotherapyPostureChecker] = {}
+    spare = warm_checker()
+    results.send(("ready",))
+
+    while True:
+        try:
+            message = control.get(timeout=0.05)
+        except queue.Empty:
+            # Idle: keep a warmed-up checker ready for the next new session
+            if spare is None:
+                spare = warm_checker()
+            continue
+
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "end":
+            checker = checkers.pop(message[1], None)
+            if checker is not None:
+                checker.close()
+            continue
+
+        _, slot, generation, session_id, exercise = message
+        header = ring.headers[slot]
+        try:
+            checker = checkers.get(session_id)
+            if checker is None:
+                checker = spare if spare is not None else warm_checker()
+                spare = None
+                checkers[session_id] = checker
+
+            frame = decode_jpeg(ring.data[slot, :header["in_length"]])
+            if frame is None:
+                raise ValueError("Invalid frame data")
+
+            pose_results, pose_reused = checker.detect_pose(frame)
+            landmarks = checker.landmark_array(pose_results)
+            # Scored here only to highlight failed joints; the parent's score is the one reported
+            checker.current_exercise = exercise
+            highlight = checker.failed_rule_joints(checker.score_landmarks(landmarks))
+            _, annotated = cv2.imencode('.jpg', checker.draw_pose_landmarks(frame, landmarks, highlight))
+            if annotated.size > slot_bytes:
+                raise ValueError(f"Annotated frame of {annotated.size} bytes does not fit a slot")
+
+            # The input has been decoded, so the output can overwrite it in place
+            ring.data[slot, :annotated.size] = annotated.ravel()
+            header["out_length"] = annotated.size
+            header["has_pose"] = landmarks is not None
+            header["pose_reused"] = pose_reused
+            if landmarks is not None:
+                header["landmarks"] = landmarks
+            results.send(("done", slot, generation, None))
+        except Exception as e:
+            results.send(("done", slot, generation, str(e)))
+
+    for checker in checkers.values():
+        checker.close()
+    ring.close()
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        # None while a dead worker waits to be restarted
+        self.process: Optional[multiprocessing.Process] = None
+        self.control: Optional[multiprocessing.Queue] = None
+        self.results = None
+        self.sessions = set()
+        self.ready = asyncio.Event()
+        self.restart_delay = WORKER_RESTART_DELAY
+        self.restart_at = 0.0
+
+
+class InferencePool:
+    """Worker processes fed through a shared-memory frame ring."""
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, slots: int = INFERENCE_SLOTS,
+                 slot_bytes: int = INFERENCE_SLOT_BYTES):
+        self._context = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(slots, slot_bytes)
+        self._free = deque(range(slots))
+        self._generation = 0
+        # slot -> (generation, future, worker index)
+        self._in_flight: Dict[int, Tuple[int, asyncio.Future, int]] = {}
+        self._workers: List[_Worker] = [_Worker(i) for i in range(workers)]
+        self._owners: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+        self.counters = {
+            "frames_submitted": 0,
+            "frames_completed": 0,
+            "frames_failed": 0,
+            "frames_lost": 0,
+            "busy_rejections": 0,
+            "worker_restarts": 0,
+            "frames_abandoned": 0,
+        }
+
+    def _spawn(self, worker: _Worker):
+        worker.ready.clear()
+        worker.sessions.clear()
+        worker.control = self._context.Queue()
+        worker.results, results_writer = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.index, self.ring.name, self.ring.slots, self.ring.slot_bytes,
+                  worker.control, results_writer),
+            name=f"pose-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        # Only the worker writes; once it exits the parent sees the pipe close
+        results_writer.close()
+        self._loop.add_reader(worker.results.fileno(), self._read_results, worker)
+
+    async def start(self, ready_timeout: float = 120.0):
+        """Start the workers and wait until each has warmed up."""
+        self._loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            self._spawn(worker)
+        for worker in self._workers:
+            try:
+                await asyncio.wait_for(worker.ready.wait(), ready_timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Pose worker {worker.index} did not start within {ready_timeout:.0f}s")
+        self._monitor = asyncio.create_task(self._watch_workers())
+        logger.info(f"Started {len(self._workers)} pose workers with {self.ring.slots} frame slots")
+
+    def _read_results(self, worker: _Worker):
+        # Called on the event loop whenever the worker's pipe has something to read
+        results = worker.results
+        try:
+            while results.poll():
+                message = results.recv()
+                if message[0] == "ready":
+                    worker.ready.set()
+                else:
+                    self._complete(*message[1:])
+        except (EOFError, OSError):
+            # The worker has exited; the monitor fails its frames and restarts it
+            self._close_results(worker)
+
+    def _close_results(self, worker: _Worker):
+        if worker.results is not None:
+            self._loop.remove_reader(worker.results.fileno())
+            worker.results.close()
+            worker.results = None
+
+    def _complete(self, slot: int, generation: int, error: Optional[str]):
+        entry = self._in_flight.get(slot)
+        # A result for a slot that was failed and reused since is stale
+        if entry is None or entry[0] != generation:
+            return
+        _, future, _ = entry
+        if future.cancelled():
+            # The frame was abandoned; only now has the worker finished with its slot
+            self._release(slot)
+            return
+        if not future.done():
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _assign(self, session_id: str) -> _Worker:
+        index = self._owners.get(session_id)
+        if index is None:
+            running = [w for w in self._workers if w.process is not None]
+            if not running:
+                raise WorkerCrashed("No pose worker is running")
+            worker = min(running, key=lambda w: len(w.sessions))
+            worker.sessions.add(session_id)
+            self._owners[session_id] = worker.index
+            return worker
+        return self._workers[index]
+
+    async def infer(self, session_id: str, exercise: str, jpeg: bytes, consume: ResultConsumer) -> T:
+        """Run one frame through the session's worker and hand the slot's results to ``consume``.
+
+        ``consume`` gets views into shared memory that are only valid during the
+        call.  Raises InferenceBusy when every slot is taken.
+        """
+        if len(jpeg) > self.ring.slot_bytes:
+            raise ValueError(f"Frame of {len(jpeg)} bytes exceeds the {self.ring.slot_bytes}-byte slot size")
+        if not self._free:
+            self.counters["busy_rejections"] += 1
+            raise InferenceBusy("All inference slots are busy")
+
+        slot = self._free.popleft()
+        self._generation += 1
+        generation = self._generation
+        header = self.ring.headers[slot]
+        header["generation"] = generation
+        header["in_length"] = len(jpeg)
+        self.ring.data[slot, :len(jpeg)] = np.frombuffer(jpeg, dtype=np.uint8)
+
+        try:
+            worker = self._assign(session_id)
+        except WorkerCrashed:
+            self._free.appendleft(slot)
+            raise
+        future = self._loop.create_future()
+        self._in_flight[slot] = (generation, future, worker.index)
+        self.counters["frames_submitted"] += 1
+        try:
+            worker.control.put(("frame", slot, generation, session_id, exercise))
+            await future
+            self.counters["frames_completed"] += 1
+            landmarks = header["landmarks"] if header["has_pose"] else None
+            return consume(landmarks, self.ring.data[slot, :header["out_length"]], bool(header["pose_reused"]))
+        except RuntimeError:
+            self.counters["frames_failed"] += 1
+            raise
+        finally:
+            if future.cancelled():
+                # The worker may still be reading or writing the slot; it is freed when the
+                # worker answers or dies, so a later frame cannot be overwritten
+                self.counters["frames_abandoned"] += 1
+            else:
+                self._release(slot)
+
+    def _release(self, slot: int):
+        del self._in_flight[slot]
+        self._free.append(slot)
+
+    def end_session(self, session_id: str):
+        """Release the worker-side state of a finished session."""
+        index = self._owners.pop(session_id, None)
+        if index is not None:
+            worker = self._workers[index]
+            worker.sessions.discard(session_id)
+            worker.control.put(("end", session_id))
+
+    async def _watch_workers(self):
+        while not self._closing:
+            await asyncio.sleep(0.5)
+            for worker in self._workers:
+                if self._closing:
+                    break
+                if worker.process is None:
+                    if time.monotonic() >= worker.restart_at:
+                        self._spawn(worker)
+                    continue
+                if worker.process.is_alive():
+                    if worker.ready.is_set():
+                        worker.restart_delay = WORKER_RESTART_DELAY
+                    continue
+                self._worker_died(worker)
+
+    def _worker_died(self, worker: _Worker):
+        lost = [(slot, entry) for slot, entry in self._in_flight.items() if entry[2] == worker.index]
+        started = worker.ready.is_set()
+        logger.error(f"Pose worker {worker.index} exited with code {worker.process.exitcode}; "
+                     f"{len(lost)} in-flight frames lost, {len(worker.sessions)} sessions moved; "
+                     f"restarting in {worker.restart_delay:.1f}s")
+        self.counters["frames_lost"] += len(lost)
+        self.counters["worker_restarts"] += 1
+        for slot, (_, future, _) in lost:
+            if future.cancelled():
+                self._release(slot)
+            elif not future.done():
+                future.set_exception(WorkerCrashed(f"Pose worker {worker.index} crashed"))
+        for session_id in worker.sessions:
+            self._owners.pop(session_id, None)
+        worker.sessions.clear()
+        self._close_results(worker)
+        worker.process = None
+        worker.restart_at = time.monotonic() + worker.restart_delay
+        if not started:
+            # Died before it was ready: probably dies again, so wait longer each time
+            worker.restart_delay = min(worker.restart_delay * 2, WORKER_RESTART_MAX_DELAY)
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "workers": len(self._workers),
+            "slots": self.ring.slots,
+            "slots_in_use": self.ring.slots - len(self._free),
+            "sessions_per_worker": [len(w.sessions) for w in self._workers],
+            "workers_alive": sum(1 for w in self._workers if w.process and w.process.is_alive())
+        }
+
+    async def shutdown(self):
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+        for worker in self._workers:
+            if worker.process and worker.process.is_alive():
+                worker.control.put(("stop",))
+        for worker in self._workers:
+            if worker.process:
+                await asyncio.to_thread(worker.process.join, 5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+            self._close_results(worker)
+        for _, future, _ in self._in_flight.values():
+            if not future.done():
+                future.set_exception(WorkerCrashed("Inference pool shut down"))
+        self.ring.close()
+        self.ring.shm.unlink()
@@ -0,0 +1,124 @@
+"""Read-only live view of a patient's analysis stream for therapists.
+
+Each analysis result is serialised once by the patient's session and the same
+text is offered to every observer.  Observers never queue: each holds only the
+newest message, so a slow viewer skips frames instead of falling behind, and
+each is rate-limited by its own sender task.  Publishing is a few attribute
+writes per observer, so the patient's latency does not depend on who watches.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """One observer socket holding only the latest unsent message."""
+
+    def __init__(self, session_id: str, websocket: WebSocket, max_fps: float, send_timeout: float):
+        self.session_id = session_id
+        self.websocket = websocket
+        self.min_interval = 1.0 / max_fps
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.sent = 0
+        self.skipped = 0
+        self._latest: Optional[str] = None
+        self._wake = asyncio.Event()
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def offer(self, text: str):
+        """Replace whatever is waiting with ``text``."""
+        if self._latest is not None:
+            self.skipped += 1
+        self._latest = text
+        self._wake.set()
+
+    async def _send_loop(self):
+        next_send = 0.0
+        while True:
+            await self._wake.wait()
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                # Newer results offered meanwhile replace the pending one
+                await asyncio.sleep(delay)
+            self._wake.clear()
+            text, self._latest = self._latest, None
+            next_send = time.monotonic() + self.min_interval
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+                self.sent += 1
+            except Exception as e:
+                logger.info(f"Dropping observer of session {self.session_id}: {e}")
+                self.closed = True
+                return
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = True
+        self._sender.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception:
+            pass
+
+
+class LiveViewHub:
+    """Observers per session, fed from the session's own serialised results."""
+
+    def __init__(self, max_fps: float = 10.0, max_subscribers: int = 16, send_timeout: float = 5.0):
+        self.max_fps = max_fps
+        self.max_subscribers = max_subscribers
+        self.send_timeout = send_timeout
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.published = 0
+
+    def subscribe(self, session_id: str, websocket: WebSocket,
+                  max_fps: Optional[float] = None) -> Optional[Subscriber]:
+        """Attach an observer; None if the session already has the maximum."""
+        observers = self.subscribers.setdefault(session_id, set())
+        if len(observers) >= self.max_subscribers:
+            return None
+        fps = min(max_fps, self.max_fps) if max_fps and max_fps > 0 else self.max_fps
+        subscriber = Subscriber(session_id, websocket, fps, self.send_timeout)
+        observers.add(subscriber)
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        observers = self.subscribers.get(subscriber.session_id)
+        if observers is not None:
+            observers.discard(subscriber)
+            if not observers:
+                del self.subscribers[subscriber.session_id]
+        await subscriber.close()
+
+    def watching(self, session_id: str) -> bool:
+        return session_id in self.subscribers
+
+    def publish(self, session_id: str, text: str):
+        """Offer an already-serialised message to every observer of a session."""
+        observers = self.subscribers.get(session_id)
+        if not observers:
+            return
+        self.published += 1
+        for subscriber in observers:
+            subscriber.offer(text)
+
+    async def end_session(self, session_id: str):
+        """Disconnect every observer of a session that has ended."""
+        for subscriber in list(self.subscribers.pop(session_id, ())):
+            await subscriber.close(1000, "session ended")
+
+    def stats(self) -> Dict:
+        observers = [s for group in self.subscribers.values() for s in group]
+        return {
+            "watched_sessions": len(self.subscribers),
+            "observers": len(observers),
+            "published": self.published,
+            "sent": sum(s.sent for s in observers),
+            "skipped": sum(s.skipped for s in observers),
+            "max_fps": self.max_fps
+        }
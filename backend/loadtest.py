@@ -0,0 +1,370 @@
+"""Load generator for the posture analysis WebSocket.
+
+Opens synthetic patient sessions against a running server and sends frames at
+a fixed rate, stepping the number of concurrent patients up until round-trip
+p99 latency passes a target.  Frames come from a folder of recorded JPEGs or
+are rendered stick figures, so no camera or network access is needed.  Each
+patient also sends ``ping``, ``change_exercise`` and ``get_session_stats``
+messages now and then, like the dashboard does.  With ``--follow-flow-control``
+patients change their frame rate when the server sends ``flow_control`` advice.
+``--greedy`` patients send at ``--greedy-fps`` without waiting for answers, and
+``--supervised`` patients have an observer attached, as a therapist watching
+live would, which gives them supervised priority, to check that the frame
+scheduler keeps everyone else's rate up.
+
+    python loadtest.py --steps 1,2,4,8,16 --fps 10 --duration 20 --target-p99-ms 250
+"""
+import argparse
+import asyncio
+import base64
+import glob
+import itertools
+import json
+import math
+import os
+import sys
+import time
+import urllib.request
+import uuid
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import websockets
+
+EXERCISES = ["Left Arm Raise", "Right Arm Raise", "Shoulder Raise", "Squat", "Standing Balance"]
+
+
+def render_stick_figures(count: int, width: int, height: int) -> List[str]:
+    """Render ``count`` frames of a stick figure raising and lowering its arms."""
+    frames = []
+    for i in range(count):
+        image = np.full((height, width, 3), (200, 190, 180), dtype=np.uint8)
+        cx, unit = width // 2, height / 10
+        head = (cx, int(2 * unit))
+        neck = (cx, int(3 * unit))
+        hip = (cx, int(6 * unit))
+        # Arms sweep from the sides to overhead and back over the sequence
+        lift = math.pi * (0.5 - 0.5 * math.cos(2 * math.pi * i / count))
+        skin, limb = (150, 180, 220), (60, 60, 160)
+        cv2.circle(image, head, int(0.7 * unit), skin, -1)
+        cv2.line(image, neck, hip, limb, max(2, int(unit / 3)))
+        for side in (-1, 1):
+            elbow = (int(cx + side * 1.4 * unit * math.sin(lift)), int(neck[1] + 1.4 * unit * math.cos(lift)))
+            wrist = (int(cx + side * 2.8 * unit * math.sin(lift)), int(neck[1] + 2.8 * unit * math.cos(lift)))
+            knee = (int(cx + side * 0.6 * unit), int(8 * unit))
+            ankle = (int(cx + side * 0.7 * unit), int(9.6 * unit))
+            for start, end in ((neck, elbow), (elbow, wrist), (hip, knee), (knee, ankle)):
+                cv2.line(image, start, end, limb, max(2, int(unit / 4)))
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append("data:image/jpeg;base64," + base64.b64encode(buffer).decode('utf-8'))
+    return frames
+
+
+def load_recorded_frames(directory: str) -> List[str]:
+    """Read every JPEG in a directory, in name order, as data URLs."""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jpg")) + glob.glob(os.path.join(directory, "*.jpeg"))):
+        with open(path, 'rb') as f:
+            frames.append("data:image/jpeg;base64," + base64.b64encode(f.read()).decode('utf-8'))
+    if not frames:
+        raise SystemExit(f"No JPEG frames found in {directory}")
+    return frames
+
+
+def percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {"count": len(ordered), "p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 2)}
+
+
+class PatientStats:
+    """Counters for one simulated patient during one step."""
+
+    def __init__(self):
+        self.frame_latencies: List[float] = []
+        self.greedy = False
+        self.ping_latencies: List[float] = []
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.control_messages = 0
+        self.flow_updates = 0
+        self.final_fps: Optional[float] = None
+        self.result_bytes = 0
+        self.refused = False
+        self.connect_failed = False
+
+
+async def drain(websocket):
+    async for _ in websocket:
+        pass
+
+
+async def run_patient(url: str, frames: List[str], fps: float, duration: float,
+                      max_in_flight: Optional[int], control_every: float, offset: int,
+                      follow_flow_control: bool = False, verbosity: Optional[str] = None,
+                      delta: bool = False, supervised: bool = False) -> PatientStats:
+    """Drive one session for ``duration`` seconds and return its stats."""
+    stats = PatientStats()
+    stats.greedy = max_in_flight is None
+    # Send time per frame id, oldest first
+    in_flight: Dict[int, float] = {}
+    frame_ids = itertools.count()
+    pace = {"interval": 1.0 / fps}
+    pings: Dict[float, float] = {}
+    session_id = f"loadtest-{uuid.uuid4().hex[:12]}"
+
+    try:
+        websocket = await websockets.connect(f"{url}/ws/{session_id}", max_size=None)
+    except Exception:
+        stats.connect_failed = True
+        return stats
+
+    ready = asyncio.Event()
+
+    def answered(data: Dict) -> Optional[float]:
+        """Send time of the frame a message answers; servers that echo no id answer in order."""
+        frame_id = data.get("frame_id")
+        if frame_id is not None:
+            return in_flight.pop(frame_id, None)
+        if in_flight:
+            return in_flight.pop(next(iter(in_flight)))
+        return None
+
+    async def receive():
+        async for raw in websocket:
+            message = json.loads(raw)
+            kind = message.get("type")
+            now = time.perf_counter()
+            if kind == "analysis_result":
+                stats.result_bytes += len(raw)
+                if delta and "seq" in message["data"]:
+                    # Acknowledge every result so deltas stay small
+                    await websocket.send(json.dumps({"type": "ack", "data": {"seq": message["data"]["seq"]}}))
+                sent_at = answered(message["data"])
+                if sent_at is not None:
+                    stats.frame_latencies.append((now - sent_at) * 1000)
+            elif kind == "pong":
+                sent_at = pings.pop(message["data"].get("timestamp"), None)
+                if sent_at is not None:
+                    stats.ping_latencies.append((now - sent_at) * 1000)
+            elif kind == "flow_control":
+                stats.flow_updates += 1
+                if follow_flow_control:
+                    pace["interval"] = 1.0 / message["data"]["target_fps"]
+            elif kind == "session_info":
+                ready.set()
+            elif kind == "server_busy":
+                # Turned away by admission control; the server closes the socket next
+                stats.refused = True
+            elif kind == "frame_dropped":
+                # Turned away by the server rather than failed
+                stats.dropped += 1
+                answered(message["data"])
+            elif kind == "error":
+                stats.errors += 1
+                # Only errors about a frame answer one; the rest answer control messages
+                if "frame_id" in message["data"]:
+                    answered(message["data"])
+
+    receiver = asyncio.create_task(receive())
+    observer = None
+    try:
+        if supervised:
+            # A therapist can only watch a session that exists; a refused one never does
+            waiting = asyncio.create_task(ready.wait())
+            await asyncio.wait([waiting, receiver], timeout=10, return_when=asyncio.FIRST_COMPLETED)
+            waiting.cancel()
+            if ready.is_set():
+                observer = await websockets.connect(f"{url}/ws/{session_id}/watch", max_size=None)
+                observer_reader = asyncio.create_task(drain(observer))
+        if verbosity or delta:
+            settings = {"verbosity": verbosity or "full", "delta": delta}
+            await websocket.send(json.dumps({"type": "update_settings", "data": settings}))
+        started = time.perf_counter()
+        next_frame = started
+        next_control = started + control_every
+        control_step = 0
+        index = offset
+        while time.perf_counter() - started < duration:
+            now = time.perf_counter()
+            if max_in_flight is not None and len(in_flight) >= max_in_flight:
+                # A real client skips a camera frame it cannot send
+                stats.dropped += 1
+            else:
+                frame_id = next(frame_ids)
+                in_flight[frame_id] = now
+                await websocket.send(json.dumps({"type": "frame",
+                                                 "data": {"frame": frames[index % len(frames)], "frame_id": frame_id}}))
+                stats.sent += 1
+                index += 1
+
+            if now >= next_control:
+                control_step += 1
+                stats.control_messages += 1
+                if control_step % 3 == 1:
+                    pings[now] = now
+                    message = {"type": "ping", "data": {"timestamp": now}}
+                elif control_step % 3 == 2:
+                    message = {"type": "change_exercise",
+                               "data": {"exercise_name": EXERCISES[control_step % len(EXERCISES)]}}
+                else:
+                    message = {"type": "get_session_stats", "data": {}}
+                await websocket.send(json.dumps(message))
+                next_control += control_every
+
+            next_frame += pace["interval"]
+            await asyncio.sleep(max(0.0, next_frame - time.perf_counter()))
+
+        # Give outstanding frames a moment to come back; the rest count as dropped
+        deadline = time.perf_counter() + 2.0
+        while in_flight and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        stats.dropped += len(in_flight)
+        stats.final_fps = round(1.0 / pace["interval"], 2)
+    except websockets.ConnectionClosed:
+        if not stats.refused:
+            stats.errors += 1
+    finally:
+        receiver.cancel()
+        if observer is not None:
+            observer_reader.cancel()
+            await observer.close()
+        await websocket.close()
+    return stats
+
+
+def fetch_server_stats(http_url: str) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(f"{http_url}/stats", timeout=5) as response:
+            stats = json.loads(response.read())
+        # Per-session details are too long to keep for every step
+        stats.pop("session_details", None)
+        stats.pop("sessions", None)
+        return stats
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def run_step(args, frames: List[str], patients: int) -> Dict:
+    """Run ``patients`` concurrent sessions once and summarise the step."""
+    async def sample_server():
+        # Halfway through, while every patient is still connected
+        await asyncio.sleep(args.duration / 2)
+        return await asyncio.to_thread(fetch_server_stats, args.http_url)
+
+    server_sample = asyncio.create_task(sample_server())
+    # Stagger connections and frame phases so patients do not fire in lockstep
+    tasks = []
+    for i in range(patients):
+        # The first patients are supervised and the last ones greedy
+        greedy = i >= patients - args.greedy
+        tasks.append(asyncio.create_task(run_patient(
+            args.url, frames, args.greedy_fps if greedy else args.fps, args.duration,
+            None if greedy else args.max_in_flight,
+            args.control_every, offset=i * 7, follow_flow_control=args.follow_flow_control and not greedy,
+            verbosity=args.verbosity, delta=args.delta,
+            supervised=i < args.supervised
+        )))
+        await asyncio.sleep(min(0.05, 1.0 / args.fps / max(1, patients)))
+    results = await asyncio.gather(*tasks)
+
+    latencies = [ms for r in results for ms in r.frame_latencies]
+    polite = [r for r in results if not r.greedy]
+    sent = sum(r.sent for r in results)
+    dropped = sum(r.dropped for r in results)
+    return {
+        "patients": patients,
+        "target_fps": args.fps,
+        "achieved_fps_per_patient": round(len(latencies) / args.duration / patients, 2),
+        "achieved_fps_by_patient": [round(len(r.frame_latencies) / args.duration, 2) for r in results],
+        "min_fps_non_greedy": round(min(len(r.frame_latencies) for r in polite) / args.duration, 2) if polite else None,
+        "frames_sent": sent,
+        "frames_answered": len(latencies),
+        "frames_dropped": dropped,
+        "drop_ratio": round(dropped / (sent + dropped), 4) if sent + dropped else 0.0,
+        "errors": sum(r.errors for r in results),
+        "connect_failures": sum(r.connect_failed for r in results),
+        "sessions_refused": sum(r.refused for r in results),
+        "control_messages": sum(r.control_messages for r in results),
+        "flow_control_updates": sum(r.flow_updates for r in results),
+        "final_fps_per_patient": [r.final_fps for r in results],
+        "result_bytes_per_frame": round(sum(r.result_bytes for r in results) / len(latencies)) if latencies else None,
+        "frame_rtt_ms": percentiles(latencies),
+        "ping_rtt_ms": percentiles([ms for r in results for ms in r.ping_latencies]),
+        "server_stats": await server_sample
+    }
+
+
+async def run(args) -> Dict:
+    frames = load_recorded_frames(args.frames) if args.frames else \
+        render_stick_figures(args.synthetic_frames, args.width, args.height)
+    steps = []
+    saturation = None
+    for patients in [int(n) for n in args.steps.split(",")]:
+        step = await run_step(args, frames, patients)
+        steps.append(step)
+        p99 = step["frame_rtt_ms"]["p99"]
+        print(f"{patients:>4} patients: p50 {step['frame_rtt_ms']['p50']} ms, p99 {p99} ms, "
+              f"{step['achieved_fps_per_patient']} fps/patient, drop ratio {step['drop_ratio']}",
+              file=sys.stderr)
+        if p99 is None or p99 > args.target_p99_ms:
+            saturation = patients
+            break
+        await asyncio.sleep(args.cooldown)
+
+    sustained = [s["patients"] for s in steps if s["patients"] != saturation]
+    return {
+        "target_p99_ms": args.target_p99_ms,
+        "frame_source": args.frames or f"synthetic {args.width}x{args.height}",
+        "saturated_at_patients": saturation,
+        "max_sustained_patients": max(sustained) if sustained else 0,
+        "steps": steps
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find how many concurrent patients a server sustains")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000", help="WebSocket base URL")
+    parser.add_argument("--http-url", default=None, help="HTTP base URL for /stats (default: from --url)")
+    parser.add_argument("--steps", default="1,2,4,8,16,32", help="Concurrent patients per step")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second per patient")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per step")
+    parser.add_argument("--cooldown", type=float, default=3.0, help="Pause between steps")
+    parser.add_argument("--target-p99-ms", type=float, default=250.0, help="Saturation threshold")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="Unanswered frames before a patient drops one")
+    parser.add_argument("--control-every", type=float, default=5.0, help="Seconds between control messages")
+    parser.add_argument("--follow-flow-control", action="store_true",
+                        help="Adopt the frame rate the server advises instead of a fixed --fps")
+    parser.add_argument("--verbosity", choices=["score", "changes", "full"],
+                        help="Result verbosity to request (default: the server's)")
+    parser.add_argument("--delta", action="store_true", help="Request delta results and acknowledge each one")
+    parser.add_argument("--supervised", type=int, default=0, help="Patients per step watched by an observer")
+    parser.add_argument("--greedy", type=int, default=0,
+                        help="Patients per step that send at --greedy-fps without waiting for answers")
+    parser.add_argument("--greedy-fps", type=float, default=30.0, help="Frame rate of greedy patients")
+    parser.add_argument("--frames", help="Directory of recorded JPEG frames (default: synthetic)")
+    parser.add_argument("--synthetic-frames", type=int, default=60, help="Distinct synthetic frames")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+    args.http_url = args.http_url or args.url.replace("ws://", "http://").replace("wss://", "https://")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,221 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, File, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import json
 import asyncio
+import os
+import threading
+import time
 import uuid
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 import logging
 from contextlib import asynccontextmanager
-from posture_checker import PhysiotherapyPostureChecker
-from report_reader.report_parser import MedicalExerciseRecommendationSystem
-from pypdf import PdfReader
-import io
+from exercise_parser import ExerciseParser
+from pose_landmarks import decode_landmarks
+from report_reader.report_parser import MedicalExerciseRecommendationSystem, load_recommender
+from report_reader.model_store import artifact_signature, model_memory_report
+from report_reader.pdf_extract import get_page_pool, shutdown_page_pool
+from report_pipeline import analyse_report, analyse_report_in_worker, spool_to_disk
+from report_cache import ReportResultCache
+from report_jobs import QueueFullError, ReportJob, ReportJobManager
+from report_batch import run_batch
+from checker_pool import PostureCheckerPool
+from connection_manager import ConnectionManager
+from session_registry import SessionBusError, create_session_bus
+from live_view import LiveViewHub
+from inference_workers import INFERENCE_WORKERS, InferenceBusy, InferencePool, WorkerCrashed
+from flow_control import FlowController
+from admission import AdmissionController
+from frame_pipeline import FRAME_PIPELINE, FramePipeline
+from frame_scheduler import FRAME_SCHEDULER_CONCURRENCY, FrameScheduler
+from preview_stream import BOUNDARY, PreviewHub
+from result_encoding import VERBOSITY_LEVELS, ResultEncoder
+from session_parking import ParkedSessions
+from session_reaper import SessionReaper, resident_bytes
+
+# OpenCV and MediaPipe load on the first session, not at import time
+if TYPE_CHECKING:
+    from posture_checker import PhysiotherapyPostureChecker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global storage for active connections and checkers
-active_connections: Dict[str, WebSocket] = {}
-posture_checkers: Dict[str, PhysiotherapyPostureChecker] = {}
+# Each connection's messages go through its own bounded queue and sender task
+connection_manager = ConnectionManager(
+    max_queue=int(os.environ.get("WS_SEND_QUEUE", "32")),
+    send_timeout=float(os.environ.get("WS_SEND_TIMEOUT", "5"))
+)
+BROADCAST_DEADLINE = float(os.environ.get("BROADCAST_DEADLINE", "2"))
+
+# Therapists watching a session get its serialised results, rate-limited per observer
+live_view = LiveViewHub(
+    max_fps=float(os.environ.get("WATCH_MAX_FPS", "10")),
+    max_subscribers=int(os.environ.get("WATCH_MAX_OBSERVERS", "16"))
+)
+
+# MJPEG previews of annotated frames, encoded only while someone watches
+preview_hub = PreviewHub()
+# Whether analysis results carry the annotated frame unless a session changes it
+ANNOTATED_FRAME_IN_RESULTS = os.environ.get("ANNOTATED_FRAME_IN_RESULTS", "1") == "1"
+
+# Which worker owns each session; in-process unless SESSION_BUS_URL names a shared server
+session_bus = create_session_bus()
+SESSION_BUS_TIMEOUT = float(os.environ.get("SESSION_BUS_TIMEOUT", "5"))
+posture_checkers: Dict[str, "PhysiotherapyPostureChecker"] = {}
+# Sessions whose frames run through overlapping decode/inference/encode stages
+frame_pipelines: Dict[str, FramePipeline] = {}
+# How much of each analysis result goes to the patient, per session
+result_encoders: Dict[str, ResultEncoder] = {}
+
+def create_posture_checker() -> "PhysiotherapyPostureChecker":
+    """Build a posture checker, importing the pose stack on first use."""
+    from posture_checker import PhysiotherapyPostureChecker
+    return PhysiotherapyPostureChecker()
+
+# Pose inference in worker processes fed through shared memory (0 runs it in this process)
+inference_pool: Optional[InferencePool] = None
+
+# Frame rate and size advice for clients; in-process inference shares one event loop thread
+flow_control = FlowController(capacity_ms=1000.0 * max(1, INFERENCE_WORKERS))
+# New sessions only while every session can still get the minimum frame rate
+admission = AdmissionController(flow_control)
+# Sessions take turns at analysis instead of being served in arrival order
+frame_scheduler = FrameScheduler(concurrency=FRAME_SCHEDULER_CONCURRENCY or max(1, INFERENCE_WORKERS))
+
+# Warm checkers kept ready for new sessions (0 disables pose warm-up).
+# With inference workers the local checkers only score, so there is nothing to warm.
+checker_pool = PostureCheckerPool(
+    size=0 if INFERENCE_WORKERS > 0 else int(os.environ.get("PREWARM_POSE_CHECKERS", "1")),
+    factory=create_posture_checker
+)
+# Map the recommender and score a blank report during start-up
+PREWARM_RECOMMENDER = os.environ.get("PREWARM_RECOMMENDER", "1") == "1"
+
+# Recommender models are memory-mapped from here and shared by all workers on a host
+MODEL_ARTIFACT_DIR = os.environ.get("MODEL_ARTIFACT_DIR", "model_artifacts")
+_recommender: Optional[MedicalExerciseRecommendationSystem] = None
+_recommender_signature = None
+_recommender_lock = threading.Lock()
+
+def get_recommender(reload: bool = False) -> MedicalExerciseRecommendationSystem:
+    """Return the process-wide recommender, mapping the artifacts again whenever they are republished.
+
+    Checked on every call, so each worker moves to a new model on its next report
+    even if the reload request went to another worker.
+    """
+    global _recommender, _recommender_signature
+    # Taken before loading: artifacts published during the load are picked up next time
+    signature = artifact_signature(MODEL_ARTIFACT_DIR)
+    with _recommender_lock:
+        if reload or _recommender is None or signature != _recommender_signature:
+            if _recommender is not None:
+                logger.info(f"Mapping model artifacts again (was {_recommender.model_version})")
+            _recommender = load_recommender(MODEL_ARTIFACT_DIR, "exercises.txt")
+            _recommender_signature = signature
+        return _recommender
+
+# Analysis results keyed by PDF hash + model version + catalog version
+report_cache = ReportResultCache(
+    max_bytes=int(os.environ.get("REPORT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    disk_dir=os.environ.get("REPORT_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("REPORT_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024))
+)
+# Identical uploads already being analysed; retries wait on the first one
+_reports_in_flight: Dict[str, asyncio.Future] = {}
+
+async def _run_report_job(job: ReportJob, run_in_worker) -> Dict:
+    """Analyse a queued report in a job worker, sharing the result cache with /process_report."""
+    recommender = await asyncio.to_thread(get_recommender)
+    cache_key = ReportResultCache.make_key(
+        job.pdf_digest, recommender.model_version, recommender.catalog_version
+    )
+    result = await asyncio.to_thread(report_cache.get, cache_key)
+    if result is None:
+        result, model_version, catalog_version = await run_in_worker(
+            analyse_report_in_worker, job.pdf_path, MODEL_ARTIFACT_DIR, "exercises.txt",
+            recommender.model_version, recommender.catalog_version
+        )
+        # Keyed by the model the worker actually used, in case the artifacts changed meanwhile
+        cache_key = ReportResultCache.make_key(job.pdf_digest, model_version, catalog_version)
+        await asyncio.to_thread(report_cache.put, cache_key, result)
+    return result
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _remove_job_upload(job: ReportJob):
+    _remove_files([job.pdf_path])
+
+report_jobs = ReportJobManager(
+    _run_report_job,
+    max_running=int(os.environ.get("REPORT_JOB_WORKERS", "2")),
+    max_queued=int(os.environ.get("REPORT_JOB_QUEUE", "32")),
+    time_limit=float(os.environ.get("REPORT_JOB_TIMEOUT", "120")),
+    on_finished=_remove_job_upload
+)
+
+def _warm_recommender():
+    recommender = get_recommender()
+    # Touch the mapped model pages so the first report does not fault them in
+    recommender.predict_exercise_recommendations(recommender.extract_medical_features(""))
+
+async def warm_up(app: FastAPI):
+    """Pre-build pose resources and load models, then report ready."""
+    global inference_pool
+    started = time.perf_counter()
+    try:
+        if INFERENCE_WORKERS > 0:
+            inference_pool = InferencePool()
+            await inference_pool.start()
+        if checker_pool.size > 0:
+            await asyncio.to_thread(checker_pool.fill)
+        if PREWARM_RECOMMENDER:
+            await asyncio.to_thread(_warm_recommender)
+    except Exception as e:
+        logger.error(f"Start-up warm-up failed: {e}")
+        app.state.warmup_error = str(e)
+        return
+    app.state.ready = True
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Physiotherapy Posture Analysis Server...")
+    await session_bus.start()
+    parked_sessions.start()
+    session_reaper.start()
+    frame_scheduler.start()
+    # Warm up in the background so liveness answers while readiness waits
+    warm_up_task = asyncio.create_task(warm_up(app))
     yield
     # Shutdown
     logger.info("Shutting down...")
+    app.state.ready = False
+    warm_up_task.cancel()
+    await parked_sessions.close()
+    await session_reaper.close()
+    await frame_scheduler.close()
     # Clean up all posture checkers
+    checker_pool.close()
+    if inference_pool is not None:
+        await inference_pool.shutdown()
+    await connection_manager.close_all()
+    for session_id in list(frame_pipelines):
+        await stop_pipeline(session_id)
     for checker in posture_checkers.values():
         checker.close()
+    await session_bus.close()
+    await report_jobs.shutdown()
+    shutdown_page_pool()
 
 app = FastAPI(
     title="Physiotherapy Posture Analysis API",
@@ -37,6 +223,8 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+app.state.ready = False
+app.state.warmup_error = None
 
 # Configure CORS for Next.js frontend
 app.add_middleware(
@@ -66,6 +254,140 @@ class AnalysisResult(BaseModel):
     individual_scores: Dict[str, float]
     error: Optional[str] = None
 
+# Session control, served by whichever worker owns the session
+async def call_session_owner(session_id: str, action: str, payload: Dict) -> Optional[Dict]:
+    """Run a session action on its owning worker; None if no live worker owns it."""
+    owner = await session_bus.owner(session_id)
+    if owner is None:
+        return None
+    try:
+        return await session_bus.call(owner, action, payload, SESSION_BUS_TIMEOUT)
+    except SessionBusError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def _local_change_exercise(payload: Dict) -> Dict:
+    checker = posture_checkers.get(payload["session_id"])
+    if checker is None:
+        return {"found": False, "success": False}
+    return {"found": True, "success": checker.change_exercise(payload["exercise_name"])}
+
+async def close_session(session_id: str) -> bool:
+    """Release everything a session holds and close its checker; False if there was none."""
+    checker = posture_checkers.pop(session_id, None)
+    parked_sessions.discard(session_id)
+    session_reaper.forget(session_id)
+    if checker is None:
+        return False
+    await session_bus.release(session_id)
+    await live_view.end_session(session_id)
+    await stop_pipeline(session_id)
+    # The frame being analysed, if any, finishes with the checker before it closes
+    await frame_scheduler.end_session(session_id)
+    if inference_pool is not None:
+        inference_pool.end_session(session_id)
+    flow_control.end_session(session_id)
+    preview_hub.end_session(session_id)
+    result_encoders.pop(session_id, None)
+    checker.close()
+    return True
+
+# Sessions whose client dropped, kept warm for a while in case it reconnects
+parked_sessions = ParkedSessions(on_expire=close_session)
+
+# Close code 1001 "going away" for clients that stopped answering; they may reconnect
+HEARTBEAT_CLOSE_CODE = 1001
+
+async def reap_session(session_id: str, reason: str):
+    """End a connected session whose client stopped answering or stopped sending frames."""
+    connection = connection_manager.get(session_id)
+    if reason == "idle":
+        await close_session(session_id)
+        if connection is not None:
+            # A normal close: the client should not reconnect to an idle session
+            await connection.close(1000, "idle timeout")
+        return
+    
+    # Unreachable, perhaps only for now: drop the socket and park the session like any other drop
+    if connection is not None:
+        asyncio.create_task(connection.close(HEARTBEAT_CLOSE_CODE, "heartbeat timeout"))
+    if session_id in posture_checkers and parked_sessions.enabled:
+        await park_session(session_id)
+    else:
+        await close_session(session_id)
+
+async def park_session(session_id: str):
+    """Hold a dropped session for its client, without its queued frames or its share of capacity."""
+    await frame_scheduler.clear(session_id)
+    flow_control.suspend(session_id)
+    await parked_sessions.park(session_id)
+
+def send_heartbeat(session_id: str):
+    connection_manager.send(session_id, {"type": "heartbeat", "data": {"timestamp": time.time()}})
+
+session_reaper = SessionReaper(send_heartbeat=send_heartbeat, on_stale=reap_session)
+
+async def _local_end_session(payload: Dict) -> Dict:
+    session_id = payload["session_id"]
+    found = await close_session(session_id)
+    await connection_manager.disconnect(session_id)
+    await live_view.end_session(session_id)
+    return {"found": found}
+
+async def _local_stats(payload: Dict) -> Dict:
+    session_stats = {}
+    for session_id, checker in posture_checkers.items():
+        session_stats[session_id] = {
+            "current_exercise": checker.current_exercise,
+            "parked": session_id in parked_sessions,
+            "pose_history_length": len(checker.pose_history),
+            "recent_scores": checker.pose_history[-5:] if checker.pose_history else [],
+            "motion_gate": checker.motion_gate.stats(),
+            "flow_control": flow_control.session_stats(session_id),
+            "pipeline": frame_pipelines[session_id].stats() if session_id in frame_pipelines else None,
+            "scheduling": frame_scheduler.session_stats(session_id),
+            "results": result_encoders[session_id].stats() if session_id in result_encoders else None
+        }
+    return {
+        "active_connections": len(connection_manager),
+        "session_details": session_stats,
+        "outbound": connection_manager.stats(),
+        "live_view": live_view.stats(),
+        "inference": inference_pool.stats() if inference_pool is not None else None,
+        "flow_control": flow_control.stats(),
+        "preview": preview_hub.stats(),
+        "parked_sessions": parked_sessions.stats(),
+        "reaper": session_reaper.stats(),
+        "pose_graphs_open": sum(checker.pose_graph_open for checker in posture_checkers.values()),
+        "rss_bytes": resident_bytes(),
+        "admission": admission.stats(),
+        "scheduler": frame_scheduler.stats()
+    }
+
+async def _local_reload_exercises(payload: Dict) -> Dict:
+    for checker in posture_checkers.values():
+        checker.reload_exercises()
+    return {"affected_sessions": list(posture_checkers.keys())}
+
+async def _local_broadcast(payload: Dict) -> Dict:
+    return await connection_manager.broadcast(payload["message"], BROADCAST_DEADLINE)
+
+async def _local_reload_model(payload: Dict) -> Dict:
+    recommender = await asyncio.to_thread(get_recommender, True)
+    keep_prefix = ReportResultCache.version_prefix(recommender.model_version, recommender.catalog_version)
+    removed = await asyncio.to_thread(report_cache.invalidate, keep_prefix)
+    return {
+        "model_version": recommender.model_version,
+        "catalog_version": recommender.catalog_version,
+        "invalidated_results": removed
+    }
+
+session_bus.handle("change_exercise", _local_change_exercise)
+session_bus.handle("end_session", _local_end_session)
+session_bus.handle("stats", _local_stats)
+session_bus.handle("reload_exercises", _local_reload_exercises)
+session_bus.handle("broadcast", _local_broadcast)
+session_bus.handle("reload_model", _local_reload_model)
+
 # REST endpoints
 @app.get("/")
 async def root():
@@ -75,10 +397,9 @@ async def root():
 async def get_exercises():
     """Get list of available exercises."""
     try:
-        # Create a temporary checker to get exercises
-        temp_checker = PhysiotherapyPostureChecker()
-        exercises = temp_checker.get_available_exercises()
-        temp_checker.close()
+        # Read the catalog directly; a checker would build a MediaPipe graph
+        parser = ExerciseParser()
+        exercises = [name.replace('_', ' ').title() for name in parser.get_exercise_names()]
         return {"exercises": exercises}
     except Exception as e:
         #logger.error(f"Error getting exercises: {e}")
@@ -87,19 +408,25 @@ async def get_exercises():
 @app.post("/session")
 async def create_session():
     """Create a new analysis session."""
+    # Checked again when the socket opens; this lets a busy server turn clients away early
+    decision = admission.assess()
+    if not decision.admitted:
+        raise HTTPException(status_code=503, detail=f"Server busy: {decision.reason}",
+                            headers={"Retry-After": str(decision.retry_after)})
     session_id = str(uuid.uuid4())
     return {"session_id": session_id}
 
 @app.post("/session/{session_id}/exercise")
 async def change_exercise(session_id: str, request: ExerciseChangeRequest):
     """Change exercise for a specific session."""
-    if session_id not in posture_checkers:
+    reply = await call_session_owner(session_id, "change_exercise", {
+        "session_id": session_id,
+        "exercise_name": request.exercise_name
+    })
+    if reply is None or not reply["found"]:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    checker = posture_checkers[session_id]
-    success = checker.change_exercise(request.exercise_name)
-    
-    if success:
+    if reply["success"]:
         return {"success": True, "current_exercise": request.exercise_name}
     else:
         raise HTTPException(status_code=400, detail="Invalid exercise name")
@@ -107,12 +434,7 @@ async def change_exercise(session_id: str, request: ExerciseChangeRequest):
 @app.delete("/session/{session_id}")
 async def end_session(session_id: str):
     """End an analysis session."""
-    if session_id in posture_checkers:
-        posture_checkers[session_id].close()
-        del posture_checkers[session_id]
-    
-    if session_id in active_connections:
-        del active_connections[session_id]
+    await call_session_owner(session_id, "end_session", {"session_id": session_id})
     
     return {"success": True, "message": "Session ended"}
 
@@ -122,54 +444,279 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
     logger.info(f"WebSocket connection accepted for session: {session_id}")
     
-    # Store connection and create posture checker
-    active_connections[session_id] = websocket
-    posture_checkers[session_id] = PhysiotherapyPostureChecker()
+    # Sessions that already have a checker are resuming and were admitted before
+    tier = "standard"
+    if session_id not in posture_checkers:
+        # Holds the session's place from here; released below if it fails to start
+        decision = admission.admit(session_id)
+        if not decision.admitted:
+            await websocket.send_json({"type": "server_busy", "data": {
+                "retry_after": decision.retry_after,
+                "reason": decision.reason
+            }})
+            # Close code 1013: "Try Again Later"
+            await websocket.close(1013, "server busy")
+            return
+        tier = decision.tier
+    
+    # Store connection and create posture checker, or take over the one the session already has
+    connection = connection_manager.register(session_id, websocket)
+    checker = posture_checkers.get(session_id)
+    resumed = checker is not None
+    if resumed:
+        parked_sessions.resume(session_id)
+        flow_control.resume(session_id)
+        # The new client holds no earlier results for deltas to build on
+        encoder = result_encoders[session_id]
+        encoder.configure(encoder.verbosity, encoder.delta)
+        if session_id in flow_control.sessions:
+            tier = flow_control.sessions[session_id].tier
+        logger.info(f"Resumed session: {session_id}")
+    else:
+        checker = None
+        try:
+            checker = await asyncio.to_thread(checker_pool.acquire)
+            checker.include_annotated_frame = ANNOTATED_FRAME_IN_RESULTS
+            result_encoders[session_id] = ResultEncoder()
+            posture_checkers[session_id] = checker
+            await session_bus.claim(session_id)
+            if FRAME_PIPELINE:
+                start_pipeline(session_id, checker)
+        except BaseException:
+            admission.release(session_id)
+            if checker is not None and posture_checkers.get(session_id) is checker:
+                await close_session(session_id)
+            elif checker is not None:
+                result_encoders.pop(session_id, None)
+                checker.close()
+            await connection.close(1011, "session could not start")
+            raise
+    session_reaper.track(session_id)
+    close_code = None
     
     try:
         # Send initial session info
-        checker = posture_checkers[session_id]
         session_info = {
             "type": "session_info",
             "data": {
                 "session_id": session_id,
                 "exercises": checker.get_available_exercises(),
-                "current_exercise": checker.current_exercise.replace('_', ' ').title()
+                "current_exercise": checker.current_exercise.replace('_', ' ').title(),
+                "resumed": resumed,
+                "tier": tier
             }
         }
-        await websocket.send_text(json.dumps(session_info))
+        connection_manager.send(session_id, session_info)
+        # Start the client at its usual rate; later advice follows measured load
+        connection_manager.send(session_id, {
+            "type": "flow_control",
+            "data": flow_control.start_session(session_id, tier)
+        })
         
-        while True:
+        while not connection.closed:
             # Receive message from client
             #logger.info(f"Waiting for message from session: {session_id}")
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                raw = await websocket.receive()
+                if raw["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(raw.get("code", 1000))
+                if raw.get("bytes") is not None:
+                    # Binary messages are packed landmarks: 33 x (x, y, z, visibility) float32
+                    message = {"type": "landmarks", "data": {"landmarks": raw["bytes"]}}
+                else:
+                    message = json.loads(raw["text"])
+                session_reaper.touch(session_id, message.get("type") in ("frame", "landmarks"))
                 
                 await handle_websocket_message(websocket, session_id, message)
                 
-            except WebSocketDisconnect:
+            except WebSocketDisconnect as e:
                 logger.info(f"WebSocket disconnected for session: {session_id}")
+                close_code = e.code
                 break
             except json.JSONDecodeError:
                 error_msg = {"type": "error", "data": {"error": "Invalid JSON format"}}
-                await websocket.send_text(json.dumps(error_msg))
+                connection_manager.send(session_id, error_msg)
             except Exception as e:
                 logger.error(f"Error handling message: {e}")
                 error_msg = {"type": "error", "data": {"error": str(e)}}
-                await websocket.send_text(json.dumps(error_msg))
+                connection_manager.send(session_id, error_msg)
     
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {e}")
     
     finally:
-        # Clean up
-        if session_id in active_connections:
-            del active_connections[session_id]
-        if session_id in posture_checkers:
-            posture_checkers[session_id].close()
-            del posture_checkers[session_id]
-        logger.info(f"Cleaned up session: {session_id}")
+        # Clean up, unless a reconnect has already taken over this session id
+        await connection.close()
+        if connection_manager.get(session_id) is None and posture_checkers.get(session_id) is checker:
+            session_reaper.forget(session_id)
+            if parked_sessions.enabled and close_code != 1000:
+                # Dropped rather than closed on purpose: the client may be back shortly
+                await park_session(session_id)
+                logger.info(f"Parked session {session_id} for {parked_sessions.ttl:.0f}s")
+            else:
+                await close_session(session_id)
+                logger.info(f"Cleaned up session: {session_id}")
+
+def update_priority(session_id: str):
+    """Serve a session's frames ahead of self-guided ones while a therapist is watching it live."""
+    if session_id in posture_checkers:
+        frame_scheduler.set_priority(session_id, "supervised" if live_view.watching(session_id) else "self_guided")
+
+@app.websocket("/ws/{session_id}/watch")
+async def watch_session(websocket: WebSocket, session_id: str, max_fps: Optional[float] = None):
+    """Observe a patient's live analysis results without sending frames."""
+    await websocket.accept()
+    if session_id not in posture_checkers:
+        owner = await session_bus.owner(session_id)
+        reason = "Session is served by another worker" if owner else "Session not found"
+        await websocket.close(code=4404, reason=reason)
+        return
+    
+    subscriber = live_view.subscribe(session_id, websocket, max_fps)
+    if subscriber is None:
+        await websocket.close(code=1013, reason="Too many observers for this session")
+        return
+    logger.info(f"Observer attached to session: {session_id}")
+    update_priority(session_id)
+    
+    try:
+        checker = posture_checkers[session_id]
+        subscriber.offer(json.dumps({
+            "type": "watch_started",
+            "data": {
+                "session_id": session_id,
+                "current_exercise": checker.current_exercise.replace('_', ' ').title(),
+                "max_fps": 1.0 / subscriber.min_interval
+            }
+        }))
+        # Observers only listen; reading keeps disconnects visible
+        while not subscriber.closed:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await live_view.unsubscribe(subscriber)
+        update_priority(session_id)
+        logger.info(f"Observer detached from session: {session_id}")
+
+@app.get("/session/{session_id}/preview")
+async def preview_session(session_id: str, max_fps: Optional[float] = None, quality: Optional[int] = None):
+    """MJPEG stream of a session's annotated frames at the viewer's own rate and JPEG quality."""
+    checker = posture_checkers.get(session_id)
+    if checker is None:
+        owner = await session_bus.owner(session_id)
+        raise HTTPException(status_code=404,
+                            detail="Session is served by another worker" if owner else "Session not found")
+    
+    viewer = preview_hub.subscribe(session_id, max_fps, quality)
+    if viewer is None:
+        raise HTTPException(status_code=503, detail="Too many preview viewers for this session")
+    # The checker draws frames for the preview only while it has viewers
+    checker.on_annotated_frame = lambda frame: preview_hub.publish(session_id, frame)
+    
+    async def body():
+        try:
+            async for part in preview_hub.stream(viewer):
+                yield part
+        finally:
+            if not preview_hub.watching(session_id):
+                checker.on_annotated_frame = None
+    
+    return StreamingResponse(
+        body(),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def finish_frame(session_id: str, result: Dict, started: float):
+    """Deliver a frame's result and update the session's flow control advice."""
+    send_analysis_result(session_id, result)
+    advice = flow_control.record(session_id, (time.perf_counter() - started) * 1000)
+    if advice is not None:
+        connection_manager.send(session_id, {"type": "flow_control", "data": advice})
+
+def start_pipeline(session_id: str, checker: "PhysiotherapyPostureChecker") -> bool:
+    """Run a session's frames through pipelined stages; not available with inference workers."""
+    if inference_pool is not None:
+        return False
+    if session_id not in frame_pipelines:
+        # Inference waits for the session's scheduler turn like any other frame
+        schedule = (lambda work: frame_scheduler.run(session_id, work)) if frame_scheduler.enabled else None
+        frame_pipelines[session_id] = FramePipeline(
+            checker, lambda result, started: finish_frame(session_id, result, started), schedule=schedule
+        )
+    return True
+
+async def stop_pipeline(session_id: str, drain: bool = False):
+    pipeline = frame_pipelines.pop(session_id, None)
+    if pipeline is not None:
+        if drain:
+            # Results already in the pipeline go out before anything that follows
+            await pipeline.drain()
+        await pipeline.close()
+
+def send_analysis_result(session_id: str, result: Dict):
+    """Queue an analysis result for the patient and offer it to observers."""
+    response = {
+        "type": "analysis_result",
+        "data": result
+    }
+    encoder = result_encoders.get(session_id)
+    if encoder is None or encoder.passthrough:
+        # Serialised once for the patient and every observer
+        response_text = json.dumps(response)
+        connection_manager.send_text(session_id, response_text)
+        live_view.publish(session_id, response_text)
+        return
+    
+    connection_manager.send(session_id, {"type": "analysis_result", "data": encoder.encode(result)})
+    if live_view.watching(session_id):
+        # Observers always get whole results
+        live_view.publish(session_id, json.dumps(response))
+
+async def analyse_in_worker(session_id: str, checker: "PhysiotherapyPostureChecker",
+                            frame_data: str, frame_id=None) -> Optional[Dict]:
+    """Run pose inference for a frame in a worker process and score it here."""
+    def score(landmarks, annotated_jpeg, pose_reused):
+        # Runs while the worker's output is still in its shared-memory slot
+        checker.motion_gate.record(pose_reused)
+        if preview_hub.watching(session_id):
+            # Already encoded by the worker, so previews get its quality
+            preview_hub.publish(session_id, annotated_jpeg.tobytes())
+        if not checker.include_annotated_frame:
+            annotated_jpeg = None
+        return checker.build_frame_result(landmarks, annotated_jpeg, pose_reused)
+    
+    try:
+        return await inference_pool.infer(session_id, checker.current_exercise,
+                                          checker.decode_base64(frame_data), score)
+    except (InferenceBusy, WorkerCrashed) as e:
+        # The frame is dropped; the client carries on with the next one
+        drop_frame(session_id, str(e), frame_id)
+        return None
+    except RuntimeError as e:
+        return checker.frame_error(str(e), "Could not process frame")
+
+def drop_frame(session_id: str, reason: str, frame_id=None):
+    """Tell the client a frame will not be analysed; not an error, so its display is left alone."""
+    message = {"type": "frame_dropped", "data": {"reason": reason}}
+    if frame_id is not None:
+        message["data"]["frame_id"] = frame_id
+    connection_manager.send(session_id, message)
+
+async def analyse_frame(session_id: str, checker: "PhysiotherapyPostureChecker", frame_data: str, frame_id=None):
+    """Analyse a frame the scheduler has dispatched and deliver its result."""
+    started = time.perf_counter()
+    if inference_pool is None:
+        # Off the event loop, so other sessions' messages are read meanwhile
+        result = await asyncio.to_thread(checker.process_frame_base64, frame_data)
+    else:
+        result = await analyse_in_worker(session_id, checker, frame_data, frame_id)
+        if result is None:
+            return
+    if frame_id is not None:
+        result["frame_id"] = frame_id
+    finish_frame(session_id, result, started)
 
 async def handle_websocket_message(websocket: WebSocket, session_id: str, message: Dict):
     """Handle different types of WebSocket messages."""
@@ -179,7 +726,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
     
     if session_id not in posture_checkers:
         error_msg = {"type": "error", "data": {"error": "Session not found"}}
-        await websocket.send_text(json.dumps(error_msg))
+        connection_manager.send(session_id, error_msg)
         return
     
     checker = posture_checkers[session_id]
@@ -188,28 +735,61 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
         if message_type == "frame":
             # Process video frame
             frame_data = data.get("frame")
+            # Echoed on the frame's result or drop, so clients can match answers to frames
+            frame_id = data.get("frame_id")
             if not frame_data:
                 error_msg = {"type": "error", "data": {"error": "No frame data provided"}}
                 #logger.warning(f"Frame data missing in session {session_id}")
-                await websocket.send_text(json.dumps(error_msg))
+                connection_manager.send(session_id, error_msg)
                 return
             
+            # Landmarks are only listed for clients at full verbosity and for observers
+            checker.include_landmarks = result_encoders[session_id].verbosity == "full" or live_view.watching(session_id)
+            
             # Analyze posture
             #logger.info(f"Processing frame for session {session_id}")
-            result = checker.process_frame_base64(frame_data)
-            # Send result back to client
-            response = {
-                "type": "analysis_result",
-                "data": result
-            }
-            await websocket.send_text(json.dumps(response))
+            started = time.perf_counter()
+            pipeline = frame_pipelines.get(session_id)
+            if pipeline is not None:
+                # Answered by the pipeline's last stage, in order
+                await pipeline.submit(frame_data, started, frame_id)
+                return
+            if frame_scheduler.enabled:
+                # Answered when the session's turn comes; reading its next message does not wait
+                frame_scheduler.submit(session_id, lambda: analyse_frame(session_id, checker, frame_data, frame_id),
+                                       lambda: drop_frame(session_id, "Superseded by a newer frame", frame_id))
+                return
+            # Unscheduled: analysed now, still off the event loop so other sessions keep moving
+            await analyse_frame(session_id, checker, frame_data, frame_id)
+        
+        elif message_type == "landmarks":
+            # Pose already detected on the client: score it without touching images
+            try:
+                values = decode_landmarks(data.get("landmarks") or [])
+            except (TypeError, ValueError) as e:
+                error_msg = {"type": "error", "data": {"error": f"Invalid landmarks: {e}"}}
+                connection_manager.send(session_id, error_msg)
+                return
+            
+            result = checker.process_landmarks(values)
+            send_analysis_result(session_id, result)
+        
+        elif message_type == "heartbeat_ack":
+            # Receiving it was the point; the reaper has already seen the client is alive
+            pass
+        
+        elif message_type == "ack":
+            # The client has applied this result; later deltas build on it
+            encoder = result_encoders.get(session_id)
+            if encoder is not None and encoder.delta:
+                encoder.ack(data.get("seq"))
         
         elif message_type == "change_exercise":
             # Change current exercise
             exercise_name = data.get("exercise_name")
             if not exercise_name:
                 error_msg = {"type": "error", "data": {"error": "Exercise name required"}}
-                await websocket.send_text(json.dumps(error_msg))
+                connection_manager.send(session_id, error_msg)
                 return
             
             success = checker.change_exercise(exercise_name)
@@ -222,7 +802,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "message": "Exercise changed successfully" if success else "Invalid exercise name"
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "get_exercises":
             # Get available exercises
@@ -234,7 +814,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "current_exercise": checker.current_exercise.replace('_', ' ').title()
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "reload_exercises":
             # Reload exercises from config file
@@ -247,7 +827,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "message": "Exercises reloaded from configuration file"
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "get_session_stats":
             # Get session statistics
@@ -255,13 +835,18 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                 "pose_history": checker.pose_history[-10:] if len(checker.pose_history) > 0 else [],
                 "current_exercise": checker.current_exercise.replace('_', ' ').title(),
                 "feedback_cooldown": checker.feedback_cooldown,
-                "correct_pose_threshold": checker.correct_pose_threshold
+                "correct_pose_threshold": checker.correct_pose_threshold,
+                "motion_gate": checker.motion_gate.stats(),
+                "flow_control": flow_control.session_stats(session_id),
+                "pipeline": frame_pipelines[session_id].stats() if session_id in frame_pipelines else None,
+                "scheduling": frame_scheduler.session_stats(session_id),
+                "results": result_encoders[session_id].stats() if session_id in result_encoders else None
             }
             response = {
                 "type": "session_stats",
                 "data": stats
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "update_settings":
             # Update analysis settings
@@ -274,15 +859,38 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
             if cooldown is not None and cooldown >= 0:
                 checker.max_feedback_cooldown = int(cooldown)
             
+            include_annotated_frame = data.get("include_annotated_frame")
+            if include_annotated_frame is not None:
+                checker.include_annotated_frame = bool(include_annotated_frame)
+            
+            encoder = result_encoders[session_id]
+            verbosity = data.get("verbosity", encoder.verbosity)
+            delta = data.get("delta", encoder.delta)
+            if verbosity in VERBOSITY_LEVELS and (verbosity, bool(delta)) != (encoder.verbosity, encoder.delta):
+                encoder.configure(verbosity, bool(delta))
+            
+            pipelined = data.get("pipelined")
+            if pipelined:
+                # Frames already waiting for their turn would run alongside the pipeline's
+                await frame_scheduler.clear(session_id, answer=True)
+                start_pipeline(session_id, checker)
+            elif pipelined is not None:
+                await stop_pipeline(session_id, drain=True)
+            
             response = {
                 "type": "settings_updated",
                 "data": {
                     "correct_pose_threshold": checker.correct_pose_threshold,
                     "max_feedback_cooldown": checker.max_feedback_cooldown,
+                    "pipelined": session_id in frame_pipelines,
+                    "include_annotated_frame": checker.include_annotated_frame,
+                    "verbosity": encoder.verbosity,
+                    "delta": encoder.delta,
+                    "priority": frame_scheduler.priority(session_id),
                     "message": "Settings updated successfully"
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "ping":
             # Health check / keepalive
@@ -295,7 +903,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "current_exercise": checker.current_exercise.replace('_', ' ').title()
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "start_recording":
             # Start recording session data (could be extended for data persistence)
@@ -307,7 +915,7 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "message": "Session recording started"
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         elif message_type == "stop_recording":
             # Stop recording session data
@@ -319,14 +927,14 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
                     "message": "Session recording stopped"
                 }
             }
-            await websocket.send_text(json.dumps(response))
+            connection_manager.send(session_id, response)
         
         else:
             error_msg = {
                 "type": "error", 
                 "data": {"error": f"Unknown message type: {message_type}"}
             }
-            await websocket.send_text(json.dumps(error_msg))
+            connection_manager.send(session_id, error_msg)
     
     except Exception as e:
         logger.error(f"Error processing message type '{message_type}': {e}")
@@ -334,48 +942,85 @@ async def handle_websocket_message(websocket: WebSocket, session_id: str, messag
             "type": "error",
             "data": {"error": f"Processing error: {str(e)}"}
         }
-        await websocket.send_text(json.dumps(error_msg))
+        connection_manager.send(session_id, error_msg)
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness probe: the process is up and answering requests."""
     return {
         "status": "healthy",
-        "active_sessions": len(active_connections),
+        "active_sessions": len(connection_manager),
         "active_checkers": len(posture_checkers),
+        "worker_id": session_bus.worker_id,
+        "capacity": admission.capacity(),
         "server": "Physiotherapy Posture Analysis API",
         "version": "1.0.0"
     }
 
+# Readiness endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until warm-up has finished and again while shutting down."""
+    if not app.state.ready:
+        detail = f"Warm-up failed: {app.state.warmup_error}" if app.state.warmup_error else "Warming up"
+        raise HTTPException(status_code=503, detail=detail)
+    return {
+        "status": "ready",
+        "checker_pool": checker_pool.stats(),
+        "inference": inference_pool.stats() if inference_pool is not None else None
+    }
+
 # Stats endpoint
 @app.get("/stats")
 async def get_stats():
-    """Get server statistics."""
+    """Get server statistics, merged across every worker."""
+    replies = await session_bus.call_all("stats", {}, SESSION_BUS_TIMEOUT)
+    
     session_stats = {}
-    for session_id, checker in posture_checkers.items():
-        session_stats[session_id] = {
-            "current_exercise": checker.current_exercise,
-            "pose_history_length": len(checker.pose_history),
-            "recent_scores": checker.pose_history[-5:] if checker.pose_history else []
+    workers = {}
+    for worker_id, reply in replies.items():
+        session_stats.update(reply["session_details"])
+        workers[worker_id] = {
+            "active_connections": reply["active_connections"],
+            "active_sessions": len(reply["session_details"]),
+            "outbound": reply["outbound"],
+            "live_view": reply["live_view"],
+            "inference": reply.get("inference"),
+            "flow_control": reply.get("flow_control"),
+            "preview": reply.get("preview"),
+            "parked_sessions": reply.get("parked_sessions"),
+            "reaper": reply.get("reaper"),
+            "pose_graphs_open": reply.get("pose_graphs_open"),
+            "rss_bytes": reply.get("rss_bytes"),
+            "admission": reply.get("admission"),
+            "scheduler": reply.get("scheduler")
         }
     
     return {
-        "active_connections": len(active_connections),
-        "active_sessions": len(posture_checkers),
-        "sessions": list(posture_checkers.keys()),
-        "session_details": session_stats
+        "active_connections": sum(w["active_connections"] for w in workers.values()),
+        "active_sessions": len(session_stats),
+        "sessions": list(session_stats.keys()),
+        "session_details": session_stats,
+        "workers": workers
     }
 
+# Model memory endpoint
+@app.get("/stats/model-memory")
+async def get_model_memory():
+    """Report this worker's shared vs private memory for the mapped recommender models."""
+    report = model_memory_report(MODEL_ARTIFACT_DIR)
+    report["model_loaded"] = _recommender is not None
+    report["model_version"] = _recommender.model_version if _recommender else None
+    return report
+
 # Reload exercises endpoint
 @app.post("/reload-exercises")
 async def reload_all_exercises():
-    """Reload exercises for all active sessions."""
+    """Reload exercises for all active sessions on every worker."""
     try:
-        reloaded_sessions = []
-        for session_id, checker in posture_checkers.items():
-            checker.reload_exercises()
-            reloaded_sessions.append(session_id)
+        replies = await session_bus.call_all("reload_exercises", {}, SESSION_BUS_TIMEOUT)
+        reloaded_sessions = [sid for reply in replies.values() for sid in reply["affected_sessions"]]
         
         return {
             "success": True,
@@ -398,82 +1043,150 @@ async def broadcast_message(message: str):
         }
     }
     
-    disconnected_sessions = []
-    for session_id, websocket in active_connections.items():
-        try:
-            await websocket.send_text(json.dumps(broadcast_data))
-        except Exception as e:
-            logger.warning(f"Failed to send broadcast to session {session_id}: {e}")
-            disconnected_sessions.append(session_id)
-    
-    # Clean up disconnected sessions
-    for session_id in disconnected_sessions:
-        if session_id in active_connections:
-            del active_connections[session_id]
-        if session_id in posture_checkers:
-            posture_checkers[session_id].close()
-            del posture_checkers[session_id]
+    # Every worker delivers to its own connections; evicted clients clean up on close
+    replies = await session_bus.call_all(
+        "broadcast", {"message": broadcast_data}, BROADCAST_DEADLINE + SESSION_BUS_TIMEOUT
+    )
+    delivered = [sid for reply in replies.values() for sid in reply["delivered"]]
+    evicted = [sid for reply in replies.values() for sid in reply["evicted"]]
     
     return {
         "success": True,
-        "message": f"Broadcast sent to {len(active_connections)} sessions",
-        "disconnected_sessions": disconnected_sessions
+        "message": f"Broadcast sent to {len(delivered)} sessions",
+        "disconnected_sessions": evicted
     }
 
 @app.post("/process_report")
 async def process_report(file: UploadFile = File(...)):
-    # Read PDF into memory
-    pdf_bytes = await file.read()
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    report_text = " ".join([page.extract_text() for page in reader.pages if page.extract_text()])
+    """Recommend exercises for an uploaded medical report PDF."""
+    # Spool to disk so page workers can open the PDF without it being pickled to them
+    pdf_path, pdf_digest = await asyncio.to_thread(spool_to_disk, file.file)
+    try:
+        recommender = await asyncio.to_thread(get_recommender)
+        cache_key = ReportResultCache.make_key(
+            pdf_digest, recommender.model_version, recommender.catalog_version
+        )
 
-    recommender = MedicalExerciseRecommendationSystem()
-    recommender.load_available_exercises("exercises.txt")
-        
-    # Train models
-    recommender.train_models()
-    
-    # Extract medical features
-    medical_features = recommender.extract_medical_features(report_text)
-    
-    # Get recommendations
-    recommendations = recommender.predict_exercise_recommendations(medical_features)
-    revised_recommendations = []
-    for name, details in recommendations.items():
-        revised_recommendations.append({
-            "name": name,
-            "sets": details["parameters"]["sets"], 
-            "reps": details["parameters"]["reps_per_set"],
-            "duration": details["parameters"]["duration_seconds"],
-            "confidence": details["recommendation_confidence"]
-        })
+        result = await asyncio.to_thread(report_cache.get, cache_key)
+        if result is None:
+            in_flight = _reports_in_flight.get(cache_key)
+            if in_flight is not None:
+                result = await asyncio.shield(in_flight)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                _reports_in_flight[cache_key] = future
+                try:
+                    result = await asyncio.to_thread(analyse_report, pdf_path, recommender)
+                    await asyncio.to_thread(report_cache.put, cache_key, result)
+                    future.set_result(result)
+                except Exception as e:
+                    future.set_exception(e)
+                    future.exception()  # retrieved here even if no retry is waiting
+                    raise
+                finally:
+                    del _reports_in_flight[cache_key]
+                    if not future.done():
+                        future.cancel()
+    finally:
+        os.remove(pdf_path)
+    return {"success": True, "result": result}
 
-    # Sort by confidence (descending)
-    revised_recommendations.sort(key=lambda x: x["confidence"], reverse=True)
+@app.post("/process_reports/batch")
+async def process_report_batch(files: List[UploadFile] = File(...)):
+    """Recommend exercises for many report PDFs, streamed back as JSON lines."""
+    labels = {}
+    try:
+        for upload in files:
+            pdf_path, _ = await asyncio.to_thread(spool_to_disk, upload.file)
+            labels[pdf_path] = upload.filename
+        recommender = await asyncio.to_thread(get_recommender)
+    except BaseException:
+        _remove_files(list(labels))
+        raise
 
-    # Pick top 3
-    top3_recommendations = revised_recommendations[:3]
+    def records():
+        # Runs in Starlette's threadpool, one record per iteration.
+        # Extraction shares the page pool, so concurrent batches cannot oversubscribe the host.
+        for record in run_batch(list(labels), recommender, labels=labels, pool=get_page_pool()):
+            yield json.dumps(record) + "\n"
 
-    
-    # Create final result
-    result = {
-        # 'patient_summary': {
-        #     'age': medical_features.get('age', 'Unknown'),
-        #     'severity_level': medical_features.get('severity', 'Unknown'),
-        #     'functional_level': medical_features.get('functional_level', 'Unknown'),
-        #     'identified_conditions': list(medical_features.get('condition_scores', {}).keys()),
-        #     'limitations': medical_features.get('limitations', [])
-        # },
-        # 'medical_analysis': {
-        #     'text_length': medical_features.get('medical_text_length', 0),
-        #     'keywords_found': medical_features.get('medical_keywords_count', 0),
-        #     'primary_conditions': medical_features.get('condition_scores', {})
-        # },
-        'available_exercises_count': len(recommender.available_exercises),
-        'recommended_exercises': top3_recommendations,
-        'total_recommendations': len(recommendations)
+    # Runs once the response ends, even if the client left before the body started
+    return StreamingResponse(records(), media_type="application/x-ndjson",
+                             background=BackgroundTask(_remove_files, list(labels)))
+
+@app.post("/jobs/report", status_code=202)
+async def submit_report_job(file: UploadFile = File(...)):
+    """Queue a medical report for analysis and return its job id immediately."""
+    pdf_path, pdf_digest = await asyncio.to_thread(spool_to_disk, file.file)
+    try:
+        job = report_jobs.submit(pdf_path, pdf_digest)
+    except QueueFullError as e:
+        os.remove(pdf_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "queue_depth": report_jobs.queue_depth()
+    }
+
+@app.get("/jobs/metrics")
+async def get_job_metrics():
+    """Queue depth, job outcomes and queue-wait / run-time latencies."""
+    return report_jobs.metrics()
+
+@app.get("/jobs/{job_id}")
+async def get_report_job(job_id: str):
+    """Poll a report job for progress and, once finished, its recommendations."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_report_job(job_id: str):
+    """Server-sent events with a job snapshot after every page and at completion."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for snapshot in report_jobs.watch(job):
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.delete("/jobs/{job_id}")
+async def cancel_report_job(job_id: str):
+    """Cancel a queued or running report job."""
+    job = report_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job.job_id, "status": job.status, "cancel_requested": job.cancel_event.is_set()}
+
+@app.get("/report-cache/stats")
+async def get_report_cache_stats():
+    """Hit/miss counters and size of the report result cache."""
+    return report_cache.stats()
+
+@app.post("/report-cache/invalidate")
+async def invalidate_report_cache():
+    """Drop every cached report result."""
+    removed = await asyncio.to_thread(report_cache.invalidate)
+    return {"success": True, "removed": removed}
+
+@app.post("/model/reload")
+async def reload_model():
+    """Map freshly exported model artifacts on every worker and drop results cached for older models."""
+    replies = await session_bus.call_all("reload_model", {}, SESSION_BUS_TIMEOUT)
+    local = replies[session_bus.worker_id]
+    return {
+        "success": True,
+        "model_version": local["model_version"],
+        "catalog_version": local["catalog_version"],
+        "invalidated_results": sum(reply["invalidated_results"] for reply in replies.values()),
+        "workers": {worker_id: reply["model_version"] for worker_id, reply in replies.items()}
     }
-    return {"success": True, "result": result}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,29 @@
+"""Pose landmarks sent by clients that run pose detection on-device.
+
+Kept free of OpenCV and MediaPipe so the server can accept landmarks without
+loading the image pipeline.
+"""
+import numpy as np
+
+# (x, y, z, visibility) for each of MediaPipe's 33 pose landmarks
+LANDMARK_COUNT = 33
+LANDMARK_VALUES = 4
+
+
+def decode_landmarks(payload) -> np.ndarray:
+    """Decode client-computed landmarks into a (33, 4) array.
+
+    Accepts packed little-endian float32 bytes, a flat list of 132 numbers, a
+    list of 33 [x, y, z, visibility] lists, or a list of 33 dicts with those keys.
+    """
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        values = np.frombuffer(payload, dtype='<f4')
+    elif payload and isinstance(payload[0], dict):
+        values = np.array([[lm.get('x', 0.0), lm.get('y', 0.0), lm.get('z', 0.0), lm.get('visibility', 0.0)]
+                           for lm in payload], dtype=np.float32)
+    else:
+        values = np.asarray(payload, dtype=np.float32)
+
+    if values.size != LANDMARK_COUNT * LANDMARK_VALUES:
+        raise ValueError(f"Expected {LANDMARK_COUNT} landmarks of {LANDMARK_VALUES} values, got {values.size} values")
+    return values.reshape(LANDMARK_COUNT, LANDMARK_VALUES)
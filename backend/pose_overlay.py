@@ -0,0 +1,75 @@
+"""Skeleton overlay drawn straight from a (33, 4) landmark array.
+
+``mp_drawing.draw_landmarks`` looks up a drawing style per landmark and issues
+two ``cv2.circle`` calls per joint and one ``cv2.line`` per bone from Python on
+every frame.  This renderer resolves the styles once, converts all landmarks
+to pixels in one array operation and draws every bone with a single
+``cv2.polylines`` call.  Joints are drawn as zero-length polylines, whose round
+caps make dots, one call per colour.  Joints of rules that fail get a red halo
+in one more call, however many there are.
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Color = Tuple[int, int, int]
+
+# Same cut-off MediaPipe's drawing utilities use
+VISIBILITY_THRESHOLD = 0.5
+BONE_COLOR: Color = (224, 224, 224)
+BONE_THICKNESS = 2
+JOINT_BORDER_COLOR: Color = (255, 255, 255)
+JOINT_BORDER_SIZE = 9
+JOINT_SIZE = 5
+HIGHLIGHT_COLOR: Color = (0, 0, 255)
+HIGHLIGHT_SIZE = 15
+
+
+class PoseOverlayRenderer:
+    """Bones, joints and failed-rule highlights for one landmark layout."""
+
+    def __init__(self, connections: Iterable[Tuple[int, int]], joint_colors: Sequence[Color]):
+        self.connections = np.array(sorted(connections), dtype=np.intp)
+        # Landmark indices grouped by colour, so each colour is one draw call
+        groups = {}
+        for index, color in enumerate(joint_colors):
+            groups.setdefault(tuple(color), []).append(index)
+        self.joint_groups: List[Tuple[Color, np.ndarray]] = [
+            (color, np.array(indices, dtype=np.intp)) for color, indices in groups.items()
+        ]
+
+    @classmethod
+    def from_mediapipe(cls, mp_pose, mp_drawing_styles) -> "PoseOverlayRenderer":
+        """Use MediaPipe's pose connections and default per-landmark colours."""
+        style = mp_drawing_styles.get_default_pose_landmarks_style()
+        colors = [style[landmark].color for landmark in sorted(style, key=int)]
+        return cls(mp_pose.POSE_CONNECTIONS, colors)
+
+    @staticmethod
+    def _dots(frame: np.ndarray, points: np.ndarray, color: Color, size: int):
+        # A two-point polyline on one spot is a filled dot of diameter ``size``
+        cv2.polylines(frame, np.repeat(points[:, None, :], 2, axis=1), False, color, size)
+
+    def draw(self, frame: np.ndarray, landmarks: np.ndarray, highlight: Sequence[int] = ()) -> np.ndarray:
+        """Draw visible landmarks onto ``frame`` in place; ``highlight`` lists joints to mark."""
+        height, width = frame.shape[:2]
+        xy = landmarks[:, :2]
+        visible = (landmarks[:, 3] >= VISIBILITY_THRESHOLD) & np.all((xy >= 0) & (xy <= 1), axis=1)
+        if not visible.any():
+            return frame
+        points = np.minimum(xy * (width, height), (width - 1, height - 1)).astype(np.int32)
+
+        bones = self.connections[visible[self.connections].all(axis=1)]
+        if len(bones):
+            cv2.polylines(frame, points[bones], False, BONE_COLOR, BONE_THICKNESS)
+
+        highlighted = [index for index in highlight if visible[index]]
+        if highlighted:
+            self._dots(frame, points[highlighted], HIGHLIGHT_COLOR, HIGHLIGHT_SIZE)
+        self._dots(frame, points[visible], JOINT_BORDER_COLOR, JOINT_BORDER_SIZE)
+        for color, indices in self.joint_groups:
+            shown = indices[visible[indices]]
+            if len(shown):
+                self._dots(frame, points[shown], color, JOINT_SIZE)
+        return frame
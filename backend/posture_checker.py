@@ -2,11 +2,14 @@ import cv2
 import numpy as np
 import mediapipe as mp
 import math
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Sequence, Tuple, Optional
 from dataclasses import dataclass
 import base64
 import json
 from exercise_parser import ExerciseParser, PostureRule
+from frame_gate import MotionGate
+from frame_decode import decode_jpeg
+from pose_overlay import PoseOverlayRenderer
 
 @dataclass
 class PostureScore:
@@ -25,14 +28,25 @@ class PhysiotherapyPostureChecker:
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # Drawing styles resolved once instead of on every frame
+        self.overlay = PoseOverlayRenderer.from_mediapipe(self.mp_pose, self.mp_drawing_styles)
         
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        )
+        # Built on first image; sessions that send landmarks never need it
+        self._pose = None
+        # Near-identical frames reuse the last pose instead of running inference
+        self.motion_gate = MotionGate()
+        self._last_pose_results = None
+        # RGB copy of the current frame for MediaPipe, reused while the frame size stays the same
+        self._rgb_buffer: Optional[np.ndarray] = None
+        
+        # Whether results carry the annotated frame; a preview stream can take it instead
+        self.include_annotated_frame = True
+        # Receives each annotated BGR frame while a preview stream is watching
+        self.on_annotated_frame: Optional[Callable[[np.ndarray], None]] = None
+        # Whether results list every landmark; clients at lower verbosity do not use them
+        self.include_landmarks = True
+        # Last feedback text per rule, rebuilt only when its outcome or rounded angle changes
+        self._rule_feedback: Dict[int, Tuple[PostureRule, str, Optional[float], str, str]] = {}
         
         # Define landmark indices for easier access
         self.landmark_names = {
@@ -59,6 +73,24 @@ class PhysiotherapyPostureChecker:
         self.feedback_cooldown = 0
         self.max_feedback_cooldown = 300  # frames between audio feedback
         
+    @property
+    def pose(self):
+        """MediaPipe pose graph, created on first use."""
+        if self._pose is None:
+            self._pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=1,
+                enable_segmentation=False,
+                min_detection_confidence=0.7,
+                min_tracking_confidence=0.7
+            )
+        return self._pose
+    
+    @property
+    def pose_graph_open(self) -> bool:
+        """Whether this checker currently holds a MediaPipe pose graph."""
+        return self._pose is not None
+    
     def calculate_angle(self, p1: Tuple[float, float], p2: Tuple[float, float], 
                        p3: Tuple[float, float]) -> float:
         """Calculate angle between three points."""
@@ -89,12 +121,21 @@ class PhysiotherapyPostureChecker:
         
         return landmarks
     
+    def landmarks_from_array(self, values: np.ndarray) -> Dict[str, Tuple[float, float]]:
+        """Build the landmark dict from a (33, 4) array laid out like ``landmark_names``."""
+        landmarks = {}
+        for name, idx in self.landmark_names.items():
+            x, y, _, visibility = values[idx]
+            if visibility > 0.5:  # Only use visible landmarks
+                landmarks[name] = (float(x), float(y))
+        return landmarks
+    
     def evaluate_posture_rule(self, landmarks: Dict[str, Tuple[float, float]], 
                              rule: PostureRule) -> Tuple[float, str, str]:
         """Evaluate a single posture rule."""
         # Check if all required landmarks are available
         if not all(joint in landmarks for joint in [rule.joint1, rule.joint2, rule.joint3]):
-            return 0.0, f"Cannot evaluate: {rule.description} (landmarks not visible)", "Position yourself so I can see you better"
+            return (0.0, *self.rule_feedback(rule, "hidden", None))
         
         # Calculate angle
         p1 = landmarks[rule.joint1]
@@ -107,30 +148,47 @@ class PhysiotherapyPostureChecker:
         min_angle, max_angle = rule.angle_range
         
         if min_angle <= current_angle <= max_angle:
-            score = 1.0
-            visual_feedback = f"✓ {rule.description} (angle: {current_angle:.1f}°)"
+            return (1.0, *self.rule_feedback(rule, "met", current_angle))
+        
+        # Score based on how close to acceptable range
+        max_distance = max(abs(current_angle - min_angle), abs(current_angle - max_angle))
+        score = max(0.0, 1.0 - (max_distance / 90.0))  # Normalize by 90 degrees
+        outcome = "low" if current_angle < min_angle else "high"
+        return (score, *self.rule_feedback(rule, outcome, current_angle))
+    
+    def rule_feedback(self, rule: PostureRule, outcome: str, angle: Optional[float]) -> Tuple[str, str]:
+        """Visual and audio feedback for a rule's outcome, reused until it or the angle shown changes."""
+        shown_angle = round(angle, 1) if angle is not None else None
+        cached = self._rule_feedback.get(id(rule))
+        if cached is not None and cached[0] is rule and cached[1] == outcome and cached[2] == shown_angle:
+            return cached[3], cached[4]
+        
+        min_angle, max_angle = rule.angle_range
+        if outcome == "hidden":
+            visual_feedback = f"Cannot evaluate: {rule.description} (landmarks not visible)"
+            audio_feedback = "Position yourself so I can see you better"
+        elif outcome == "met":
+            visual_feedback = f"✓ {rule.description} (angle: {shown_angle:.1f}°)"
             audio_feedback = f"Good! {rule.description}"
-        else:
+        elif outcome == "low":
             # Calculate how far off the angle is
-            if current_angle < min_angle:
-                distance = min_angle - current_angle
-                visual_feedback = f"✗ {rule.description} - increase angle by {distance:.1f}° (current: {current_angle:.1f}°)"
-                audio_feedback = f"Increase the angle. {rule.description}"
-            else:
-                distance = current_angle - max_angle
-                visual_feedback = f"✗ {rule.description} - decrease angle by {distance:.1f}° (current: {current_angle:.1f}°)"
-                audio_feedback = f"Decrease the angle. {rule.description}"
-            
-            # Score based on how close to acceptable range
-            max_distance = max(abs(current_angle - min_angle), abs(current_angle - max_angle))
-            score = max(0.0, 1.0 - (max_distance / 90.0))  # Normalize by 90 degrees
+            distance = min_angle - shown_angle
+            visual_feedback = f"✗ {rule.description} - increase angle by {distance:.1f}° (current: {shown_angle:.1f}°)"
+            audio_feedback = f"Increase the angle. {rule.description}"
+        else:
+            distance = shown_angle - max_angle
+            visual_feedback = f"✗ {rule.description} - decrease angle by {distance:.1f}° (current: {shown_angle:.1f}°)"
+            audio_feedback = f"Decrease the angle. {rule.description}"
         
-        return score, visual_feedback, audio_feedback
+        self._rule_feedback[id(rule)] = (rule, outcome, shown_angle, visual_feedback, audio_feedback)
+        return visual_feedback, audio_feedback
     
     def evaluate_posture(self, pose_results) -> PostureScore:
         """Evaluate current posture against exercise rules."""
-        landmarks = self.extract_landmarks(pose_results)
-        
+        return self.evaluate_landmarks(self.extract_landmarks(pose_results))
+    
+    def evaluate_landmarks(self, landmarks: Optional[Dict[str, Tuple[float, float]]]) -> PostureScore:
+        """Evaluate visible landmark positions against the current exercise's rules."""
         if not landmarks:
             return PostureScore(
                 overall_score=0.0,
@@ -194,68 +252,161 @@ class PhysiotherapyPostureChecker:
             audio_feedback=audio_feedback
         )
     
+    @staticmethod
+    def decode_base64(frame_base64: str) -> bytes:
+        """Strip an optional data-URL prefix and decode the JPEG bytes."""
+        return base64.b64decode(frame_base64.split(',')[1] if ',' in frame_base64 else frame_base64)
+    
+    def decode_frame(self, frame_base64: str) -> Optional[np.ndarray]:
+        """Decode a base64 JPEG into a BGR frame at inference size; None if it is not a valid image."""
+        return decode_jpeg(self.decode_base64(frame_base64))
+    
+    def detect_pose(self, frame: np.ndarray):
+        """Run pose inference on a BGR frame, or reuse the last result if it has barely changed."""
+        # Reuse the last pose while the frame has barely changed since its inference
+        pose_reused = self.motion_gate.should_skip(frame)
+        if pose_reused:
+            return self._last_pose_results, True
+        
+        # Convert to RGB for MediaPipe, which copies its input, so the buffer can be reused
+        if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+            self._rgb_buffer = np.empty_like(frame)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        
+        # Process pose
+        results = self.pose.process(rgb_frame)
+        self._last_pose_results = results
+        return results, False
+    
+    def landmark_array(self, pose_results) -> Optional[np.ndarray]:
+        """All 33 detected landmarks as a (33, 4) array, or None when no pose was found."""
+        if not pose_results.pose_landmarks:
+            return None
+        return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_results.pose_landmarks.landmark],
+                        dtype=np.float32)
+    
+    def score_landmarks(self, landmarks: Optional[np.ndarray]) -> PostureScore:
+        """Evaluate a (33, 4) landmark array, or no pose, against the current exercise."""
+        return self.evaluate_landmarks(self.landmarks_from_array(landmarks) if landmarks is not None else None)
+    
+    def failed_rule_joints(self, score: PostureScore) -> List[int]:
+        """Landmark indices of the joints in rules that were not met."""
+        joints = set()
+        rules = self.exercise_parser.get_exercise_rules(score.exercise_name)
+        for i, rule in enumerate(rules):
+            if score.individual_scores.get(f"rule_{i}", 1.0) < 1.0:
+                for joint in (rule.joint1, rule.joint2, rule.joint3):
+                    if joint in self.landmark_names:
+                        joints.add(self.landmark_names[joint])
+        return sorted(joints)
+    
+    def annotate_frame(self, frame: np.ndarray, landmarks: Optional[np.ndarray],
+                       score: Optional[PostureScore] = None) -> Optional[np.ndarray]:
+        """Draw the detected pose onto ``frame`` for whoever wants it; JPEG-encoded if results include it."""
+        preview = self.on_annotated_frame
+        if not self.include_annotated_frame and preview is None:
+            return None
+        highlight = self.failed_rule_joints(score) if score is not None else ()
+        annotated_frame = self.draw_pose_landmarks(frame, landmarks, highlight)
+        if preview is not None:
+            preview(annotated_frame)
+        if not self.include_annotated_frame:
+            return None
+        _, buffer = cv2.imencode('.jpg', annotated_frame)
+        return buffer
+    
+    @staticmethod
+    def frame_error(error: str, feedback: str) -> Dict:
+        """Response for a frame that could not be analysed."""
+        return {
+            "error": error,
+            "success": False,
+            "score": 0.0,
+            "feedback": feedback
+        }
+    
+    def build_frame_result(self, landmarks: Optional[np.ndarray], annotated_jpeg,
+                           pose_reused: bool, score: Optional[PostureScore] = None) -> Dict:
+        """Score detected landmarks, unless already scored, and shape the response for one frame."""
+        landmarks_data = []
+        if landmarks is not None and self.include_landmarks:
+            for x, y, z, visibility in landmarks.tolist():
+                landmarks_data.append({
+                    "x": x,
+                    "y": y,
+                    "z": z,
+                    "visibility": visibility
+                })
+        
+        # Evaluate posture
+        if score is None:
+            score = self.score_landmarks(landmarks)
+        audio_feedback = self.record_score(score)
+        
+        result = {
+            "success": True,
+            "score": score.overall_score,
+            "is_correct": score.is_correct,
+            "exercise_name": score.exercise_name,
+            "feedback_messages": score.feedback_messages,
+            "audio_feedback": audio_feedback,
+            "individual_scores": score.individual_scores,
+            "landmarks": landmarks_data,
+            "pose_reused": pose_reused
+        }
+        if annotated_jpeg is not None:
+            # Encode annotated frame to base64
+            annotated_base64 = base64.b64encode(annotated_jpeg).decode('utf-8')
+            result["annotated_frame"] = f"data:image/jpeg;base64,{annotated_base64}"
+        return result
+    
     def process_frame_base64(self, frame_base64: str) -> Dict:
         """Process a base64 encoded frame and return analysis results."""
         try:
             # Decode base64 frame
-            frame_data = base64.b64decode(frame_base64.split(',')[1] if ',' in frame_base64 else frame_base64)
-            nparr = np.frombuffer(frame_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
+            frame = self.decode_frame(frame_base64)
             if frame is None:
-                return {
-                    "error": "Invalid frame data",
-                    "score": 0.0,
-                    "feedback": "Could not process frame"
-                }
-            
-            # Convert to RGB for MediaPipe
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                return self.frame_error("Invalid frame data", "Could not process frame")
             
-            # Process pose
-            results = self.pose.process(rgb_frame)
-
-            landmarks_data = []
-            if results.pose_landmarks:
-                for lm in results.pose_landmarks.landmark:
-                    landmarks_data.append({
-                        "x": lm.x,
-                        "y": lm.y,
-                        "z": lm.z,
-                        "visibility": lm.visibility
-                    })
-
+            results, pose_reused = self.detect_pose(frame)
+            landmarks = self.landmark_array(results)
             
-            # Evaluate posture
-            score = self.evaluate_posture(results)
+            # Score first so the overlay can highlight joints of failed rules
+            score = self.score_landmarks(landmarks)
+            buffer = self.annotate_frame(frame, landmarks, score)
             
-            # Update pose history
-            self.pose_history.append(score.overall_score)
-            if len(self.pose_history) > self.max_history:
-                self.pose_history.pop(0)
-            
-            # Update feedback cooldown
-            if self.feedback_cooldown > 0:
-                self.feedback_cooldown -= 1
-            
-            # Determine if we should provide audio feedback
-            should_provide_audio = (
-                self.feedback_cooldown == 0 and 
-                (not score.is_correct or score.overall_score == 1.0)
-            )
+            return self.build_frame_result(landmarks, buffer, pose_reused, score)
             
-            if should_provide_audio:
-                self.feedback_cooldown = self.max_feedback_cooldown
-                audio_feedback = score.audio_feedback
-            else:
-                audio_feedback = None
-            
-            # Create annotated frame
-            annotated_frame = self.draw_pose_landmarks(frame, results)
-            
-            # Encode annotated frame back to base64
-            _, buffer = cv2.imencode('.jpg', annotated_frame)
-            annotated_base64 = base64.b64encode(buffer).decode('utf-8')
+        except Exception as e:
+            return self.frame_error(str(e), "Error processing frame")
+    
+    def record_score(self, score: PostureScore) -> Optional[str]:
+        """Update pose history and feedback cooldown; return audio feedback if it is due."""
+        # Update pose history
+        self.pose_history.append(score.overall_score)
+        if len(self.pose_history) > self.max_history:
+            self.pose_history.pop(0)
+        
+        # Update feedback cooldown
+        if self.feedback_cooldown > 0:
+            self.feedback_cooldown -= 1
+        
+        # Determine if we should provide audio feedback
+        should_provide_audio = (
+            self.feedback_cooldown == 0 and 
+            (not score.is_correct or score.overall_score == 1.0)
+        )
+        
+        if should_provide_audio:
+            self.feedback_cooldown = self.max_feedback_cooldown
+            return score.audio_feedback
+        return None
+    
+    def process_landmarks(self, values: np.ndarray) -> Dict:
+        """Score landmarks computed on the client; no image decode, inference or drawing."""
+        try:
+            score = self.evaluate_landmarks(self.landmarks_from_array(values))
+            audio_feedback = self.record_score(score)
             
             return {
                 "success": True,
@@ -264,9 +415,7 @@ class PhysiotherapyPostureChecker:
                 "exercise_name": score.exercise_name,
                 "feedback_messages": score.feedback_messages,
                 "audio_feedback": audio_feedback,
-                "annotated_frame": f"data:image/jpeg;base64,{annotated_base64}",
-                "individual_scores": score.individual_scores,
-                "landmarks": landmarks_data
+                "individual_scores": score.individual_scores
             }
             
         except Exception as e:
@@ -274,16 +423,14 @@ class PhysiotherapyPostureChecker:
                 "error": str(e),
                 "success": False,
                 "score": 0.0,
-                "feedback": "Error processing frame"
+                "feedback": "Error processing landmarks"
             }
     
-    def draw_pose_landmarks(self, frame: np.ndarray, results) -> np.ndarray:
-        """Draw pose landmarks on the frame."""
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-            )
+    def draw_pose_landmarks(self, frame: np.ndarray, landmarks: Optional[np.ndarray],
+                            highlight: Sequence[int] = ()) -> np.ndarray:
+        """Draw pose landmarks on the frame, marking the ``highlight`` joints."""
+        if landmarks is not None:
+            self.overlay.draw(frame, landmarks, highlight)
         return frame
     
     def change_exercise(self, exercise_name: str) -> bool:
@@ -298,6 +445,16 @@ class PhysiotherapyPostureChecker:
             return True
         return False
     
+    def warm_up(self):
+        """Run one synthetic frame through the pipeline, then reset tracking state."""
+        # The first inference initialises the MediaPipe graph and its TFLite delegate
+        blank = np.zeros((480, 640, 3), dtype=np.uint8)
+        _, buffer = cv2.imencode('.jpg', blank)
+        self.process_frame_base64(base64.b64encode(buffer).decode('utf-8'))
+        self.pose_history = []
+        self.feedback_cooldown = 0
+        self.motion_gate = MotionGate()
+    
     def get_available_exercises(self) -> List[str]:
         """Get list of available exercises."""
         return [name.replace('_', ' ').title() for name in self.exercise_parser.get_exercise_names()]
@@ -305,11 +462,13 @@ class PhysiotherapyPostureChecker:
     def reload_exercises(self):
         """Reload exercises from configuration file."""
         self.exercise_parser.reload_exercises()
+        self._rule_feedback.clear()
     
     def close(self):
         """Clean up resources."""
-        if hasattr(self, 'pose') and self.pose:
-            self.pose.close()
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
 
 # Example usage for testing
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""MJPEG preview of a session's annotated frames over plain HTTP.
+
+The analysis WebSocket can leave the annotated frame out of its results and
+stay small; anyone who wants to see it opens
+``GET /session/{id}/preview`` instead, a ``multipart/x-mixed-replace`` stream
+that browsers show in an ``<img>`` tag.  Each viewer picks its own frame rate
+and JPEG quality.  Frames are only drawn and encoded while a viewer is
+connected, each frame is encoded at most once per quality, and a slow viewer
+skips to the newest frame instead of queueing.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, Optional, Set, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MAX_FPS = float(os.environ.get("PREVIEW_MAX_FPS", "10"))
+PREVIEW_JPEG_QUALITY = int(os.environ.get("PREVIEW_JPEG_QUALITY", "70"))
+PREVIEW_MAX_VIEWERS = int(os.environ.get("PREVIEW_MAX_VIEWERS", "4"))
+BOUNDARY = "frame"
+
+# A BGR frame to encode, or JPEG bytes that are already encoded
+PreviewFrame = Union[np.ndarray, bytes]
+
+
+class PreviewViewer:
+    """One open preview response."""
+
+    def __init__(self, session_id: str, max_fps: float, quality: int):
+        self.session_id = session_id
+        self.min_interval = 1.0 / max_fps
+        self.quality = quality
+        self.closed = False
+        self.sent = 0
+        self.wake = asyncio.Event()
+
+
+class _SessionPreview:
+    def __init__(self):
+        self.viewers: Set[PreviewViewer] = set()
+        self.sequence = 0
+        self.latest: Optional[PreviewFrame] = None
+        # quality -> (sequence, JPEG) of the newest frame encoded at that quality
+        self.encoded: Dict[int, Tuple[int, bytes]] = {}
+
+
+class PreviewHub:
+    """Latest annotated frame per watched session, encoded on demand for its viewers."""
+
+    def __init__(self, max_fps: float = PREVIEW_MAX_FPS, quality: int = PREVIEW_JPEG_QUALITY,
+                 max_viewers: int = PREVIEW_MAX_VIEWERS):
+        self.max_fps = max_fps
+        self.quality = quality
+        self.max_viewers = max_viewers
+        self.sessions: Dict[str, _SessionPreview] = {}
+        self.frames_encoded = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, session_id: str, max_fps: Optional[float] = None,
+                  quality: Optional[int] = None) -> Optional[PreviewViewer]:
+        """Add a viewer; None if the session already has the maximum."""
+        self._loop = asyncio.get_running_loop()
+        preview = self.sessions.setdefault(session_id, _SessionPreview())
+        if len(preview.viewers) >= self.max_viewers:
+            return None
+        fps = min(max_fps, self.max_fps) if max_fps and max_fps > 0 else self.max_fps
+        viewer = PreviewViewer(session_id, fps, max(1, min(100, quality or self.quality)))
+        preview.viewers.add(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer: PreviewViewer):
+        viewer.closed = True
+        preview = self.sessions.get(viewer.session_id)
+        if preview is not None:
+            preview.viewers.discard(viewer)
+            if not preview.viewers:
+                del self.sessions[viewer.session_id]
+
+    def watching(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+    def publish(self, session_id: str, frame: PreviewFrame):
+        """Offer a session's newest annotated frame. Safe to call from any thread."""
+        if self._loop is not None and session_id in self.sessions:
+            self._loop.call_soon_threadsafe(self._store, session_id, frame)
+
+    def _store(self, session_id: str, frame: PreviewFrame):
+        preview = self.sessions.get(session_id)
+        if preview is None:
+            return
+        preview.sequence += 1
+        preview.latest = frame
+        for viewer in preview.viewers:
+            viewer.wake.set()
+
+    def end_session(self, session_id: str):
+        """Finish every preview response of a session that has ended."""
+        preview = self.sessions.pop(session_id, None)
+        if preview is not None:
+            for viewer in preview.viewers:
+                viewer.closed = True
+                viewer.wake.set()
+
+    async def _encode(self, preview: _SessionPreview, quality: int) -> bytes:
+        sequence, frame = preview.sequence, preview.latest
+        if not isinstance(frame, np.ndarray):
+            return frame
+        cached = preview.encoded.get(quality)
+        if cached is not None and cached[0] == sequence:
+            return cached[1]
+
+        import cv2
+        _, buffer = await asyncio.to_thread(cv2.imencode, '.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        jpeg = buffer.tobytes()
+        preview.encoded[quality] = (sequence, jpeg)
+        self.frames_encoded += 1
+        return jpeg
+
+    async def stream(self, viewer: PreviewViewer) -> AsyncIterator[bytes]:
+        """Multipart body parts for one viewer, until it disconnects or the session ends."""
+        next_send = 0.0
+        try:
+            while True:
+                await viewer.wake.wait()
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    # Frames published meanwhile replace the one that woke us
+                    await asyncio.sleep(delay)
+                viewer.wake.clear()
+                preview = self.sessions.get(viewer.session_id)
+                if viewer.closed or preview is None:
+                    return
+                jpeg = await self._encode(preview, viewer.quality)
+                next_send = time.monotonic() + viewer.min_interval
+                viewer.sent += 1
+                yield (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                       f"Content-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg + b"\r\n"
+        finally:
+            self.unsubscribe(viewer)
+
+    def stats(self) -> Dict:
+        viewers = [v for preview in self.sessions.values() for v in preview.viewers]
+        return {
+            "watched_sessions": len(self.sessions),
+            "viewers": len(viewers),
+            "frames_encoded": self.frames_encoded,
+            "frames_sent": sum(v.sent for v in viewers),
+            "max_fps": self.max_fps
+        }
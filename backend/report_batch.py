@@ -0,0 +1,179 @@
+"""Bulk exercise recommendations for whole folders of referral PDFs.
+
+PDF text and medical features are extracted in a process pool, one report per
+task, with the same per-page time limit as the server's extraction.  Finished reports are scored in micro-batches, each as a single
+patients x exercises feature matrix against one loaded model.  Each record is
+emitted as soon as its batch is scored.
+
+    python report_batch.py referrals/ -o recommendations.jsonl --workers 8
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+from report_pipeline import summarise_recommendations
+from report_reader.pdf_extract import PDF_PAGE_TIMEOUT, iter_page_texts
+from report_reader.report_parser import MedicalExerciseRecommendationSystem, load_recommender
+
+# Per worker process: feature extraction only needs the keyword vocabularies
+_worker_recommender: Optional[MedicalExerciseRecommendationSystem] = None
+
+
+def _featurise_report(pdf_path: str, page_timeout: float = PDF_PAGE_TIMEOUT) -> Dict:
+    """Extract one report's medical features inside a pool worker."""
+    global _worker_recommender
+    if _worker_recommender is None:
+        _worker_recommender = MedicalExerciseRecommendationSystem()
+
+    started = time.perf_counter()
+    try:
+        # Reports are already spread across processes, so pages stay sequential here;
+        # pool tasks run on the worker's main thread, where each page is still timed
+        texts = iter_page_texts(pdf_path, page_timeout=page_timeout, parallel_min_pages=sys.maxsize)
+        pages = (text for text in texts if text)
+        features = _worker_recommender.extract_medical_features_from_pages(pages)
+        error = None
+    except Exception as e:
+        features = None
+        error = str(e)
+
+    return {
+        "file": pdf_path,
+        "features": features,
+        "error": error,
+        "featurise_ms": (time.perf_counter() - started) * 1000
+    }
+
+
+def find_reports(directory: str) -> List[str]:
+    """Return the PDF files in a directory, sorted by name."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def run_batch(pdf_paths: List[str], recommender: MedicalExerciseRecommendationSystem,
+              workers: Optional[int] = None, batch_size: int = 64,
+              max_batch_wait: float = 0.5, labels: Optional[Dict[str, str]] = None,
+              pool: Optional[Executor] = None, page_timeout: float = PDF_PAGE_TIMEOUT) -> Iterator[Dict]:
+    """Yield one result record per report, in completion order.
+
+    ``labels`` maps a PDF path to the name reported in its record (default: the file name).
+    Extraction runs in ``pool`` when given, which is left running; otherwise in a
+    pool of ``workers`` processes started for this batch.  A page that takes longer
+    than ``page_timeout`` seconds is skipped.
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                 mp_context=multiprocessing.get_context("spawn")) as own_pool:
+            yield from run_batch(pdf_paths, recommender, batch_size=batch_size,
+                                 max_batch_wait=max_batch_wait, labels=labels, pool=own_pool,
+                                 page_timeout=page_timeout)
+        return
+
+    started = time.perf_counter()
+    pending_scores: List[Dict] = []
+    first_pending_at = 0.0
+    labels = labels or {}
+
+    def label(path: str) -> str:
+        return labels.get(path, os.path.basename(path))
+
+    def score(featurised: List[Dict]) -> Iterator[Dict]:
+        score_started = time.perf_counter()
+        all_recommendations = recommender.predict_exercise_recommendations_batch(
+            [item["features"] for item in featurised]
+        )
+        score_ms = (time.perf_counter() - score_started) * 1000
+        for item, recommendations in zip(featurised, all_recommendations):
+            yield {
+                "file": label(item["file"]),
+                "success": True,
+                "result": summarise_recommendations(recommender, recommendations),
+                "timing": {
+                    "featurise_ms": round(item["featurise_ms"], 2),
+                    "score_ms": round(score_ms / len(featurised), 3),
+                    "score_batch_size": len(featurised),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+                }
+            }
+
+    futures = {pool.submit(_featurise_report, path, page_timeout) for path in pdf_paths}
+    try:
+        while futures:
+            timeout = None
+            if pending_scores:
+                timeout = max(0.0, first_pending_at + max_batch_wait - time.perf_counter())
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = future.result()
+                if item["error"] is not None:
+                    yield {
+                        "file": label(item["file"]),
+                        "success": False,
+                        "error": item["error"],
+                        "timing": {"featurise_ms": round(item["featurise_ms"], 2)}
+                    }
+                    continue
+                if not pending_scores:
+                    first_pending_at = time.perf_counter()
+                pending_scores.append(item)
+
+            # Score when the batch is full, has waited long enough, or nothing is left
+            if pending_scores and (
+                len(pending_scores) >= batch_size or not futures
+                or time.perf_counter() - first_pending_at >= max_batch_wait
+            ):
+                yield from score(pending_scores)
+                pending_scores = []
+    finally:
+        # An abandoned batch does not keep a shared pool busy
+        for future in futures:
+            future.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend exercises for a folder of referral PDFs")
+    parser.add_argument("directory", help="Directory containing referral PDFs")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Reports scored per model call")
+    parser.add_argument("--page-timeout", type=float, default=PDF_PAGE_TIMEOUT,
+                        help="Seconds allowed per PDF page before it is skipped")
+    parser.add_argument("--artifacts", default=os.environ.get("MODEL_ARTIFACT_DIR", "model_artifacts"),
+                        help="Memory-mapped model artifact directory")
+    parser.add_argument("--exercises", default="exercises.txt", help="Exercise catalog file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    pdf_paths = find_reports(args.directory)
+    recommender = load_recommender(args.artifacts, args.exercises)
+
+    started = time.perf_counter()
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    succeeded = 0
+    try:
+        for record in run_batch(pdf_paths, recommender, args.workers, args.batch_size,
+                                page_timeout=args.page_timeout):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            succeeded += record["success"]
+    finally:
+        if args.output:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {len(pdf_paths)} reports ({succeeded} succeeded) in {elapsed:.2f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Content-addressed cache for medical report analysis results.
+
+Keys combine the SHA-256 of the uploaded PDF with the recommender model version
+and the exercise catalog version, so a re-uploaded report is only served from
+cache while both are unchanged.  Results live in a size-limited in-memory LRU
+and, optionally, as JSON files in a directory that survives restarts.  The disk
+tier has its own size limit and drops the least recently used files (by mtime,
+which a disk hit refreshes) once it is exceeded.  A file that does not parse is
+treated as a miss and removed.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReportResultCache:
+    """Two-level (memory LRU, optional disk) store of ``/process_report`` results."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Estimate of the disk tier's size; other workers may share the directory,
+        # so it is re-measured from the directory whenever it crosses the limit
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "corrupt": 0,
+            "invalidated": 0,
+        }
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def version_prefix(model_version: str, catalog_version: str) -> str:
+        """Prefix shared by every key produced by one model and catalog."""
+        return f"{model_version}-{catalog_version}-"
+
+    @classmethod
+    def make_key(cls, pdf_digest: str, model_version: str, catalog_version: str) -> str:
+        return cls.version_prefix(model_version, catalog_version) + pdf_digest
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached result, promoting disk hits into memory."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(payload)
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                payload = None
+            except OSError as e:
+                logger.warning(f"Error reading cached report {key}: {e}")
+                payload = None
+
+            if payload is not None:
+                try:
+                    result = json.loads(payload)
+                except ValueError as e:
+                    # Truncated or corrupted on disk; rebuild it rather than fail the request
+                    logger.warning(f"Discarding unreadable cached report {key}: {e}")
+                    self._remove_disk_file(self._disk_path(key))
+                    with self._lock:
+                        self.counters["corrupt"] += 1
+                        self.counters["misses"] += 1
+                    return None
+
+                try:
+                    os.utime(self._disk_path(key))
+                except OSError:
+                    pass
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                    self._remember(key, payload)
+                return result
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, result: Dict):
+        """Store a result in memory and, if enabled, on disk."""
+        payload = json.dumps(result).encode('utf-8')
+        with self._lock:
+            self.counters["stores"] += 1
+            self._remember(key, payload)
+
+        if self.disk_dir:
+            # Write-then-rename so a crash never leaves a truncated entry behind
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                logger.warning(f"Error writing cached report {key}: {e}")
+                return
+
+            with self._lock:
+                self._disk_bytes += len(payload)
+                over_limit = self._disk_bytes > self.disk_max_bytes
+            if over_limit:
+                self._trim_disk()
+
+    def _disk_files(self) -> List[Tuple[str, int, int]]:
+        """(path, size, mtime) of every cached result file on disk."""
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((path, info.st_size, info.st_mtime_ns))
+        return files
+
+    def _remove_disk_file(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            # Already removed by another worker sharing the directory
+            return False
+        except OSError as e:
+            logger.warning(f"Error removing cached report {os.path.basename(path)}: {e}")
+            return False
+
+    def _trim_disk(self):
+        """Delete the least recently used files until the disk tier fits its limit."""
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for path, size, _ in files:
+            if total <= self.disk_max_bytes:
+                break
+            if self._remove_disk_file(path):
+                evicted += 1
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+            self.counters["disk_evictions"] += evicted
+
+    def _remember(self, key: str, payload: bytes):
+        """Insert into the memory LRU and evict down to the size limit. Lock held."""
+        if len(payload) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = payload
+        self._bytes += len(payload)
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.counters["evictions"] += 1
+
+    def invalidate(self, keep_prefix: Optional[str] = None) -> int:
+        """Drop every entry, or only those whose key does not start with ``keep_prefix``."""
+        def is_stale(key: str) -> bool:
+            return keep_prefix is None or not key.startswith(keep_prefix)
+
+        # A key held in memory and on disk is one cached result, counted once
+        removed_keys = set()
+        with self._lock:
+            for key in [k for k in self._entries if is_stale(k)]:
+                self._bytes -= len(self._entries.pop(key))
+                removed_keys.add(key)
+
+        if self.disk_dir:
+            for path, size, _ in self._disk_files():
+                key = os.path.basename(path)[:-len(".json")]
+                if is_stale(key) and self._remove_disk_file(path):
+                    removed_keys.add(key)
+                    with self._lock:
+                        self._disk_bytes -= size
+
+        removed = len(removed_keys)
+        with self._lock:
+            self._disk_bytes = max(self._disk_bytes, 0)
+            self.counters["invalidated"] += removed
+        logger.info(f"Invalidated {removed} cached report results")
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": bool(self.disk_dir),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
@@ -0,0 +1,301 @@
+"""Background job queue for medical report analysis.
+
+A submitted report gets a job id straight away.  Jobs wait in FIFO order for
+one of ``max_running`` slots, then do their heavy work in one of at most
+``max_running`` worker processes kept for report jobs.  A job that runs out of
+time or is cancelled has its worker killed, so a hung extraction cannot hold
+its slot, and a fresh worker is started for a later job.  Progress is
+published per page to anyone polling ``snapshot()`` or following ``watch()``.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled", "timed_out")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+def _job_worker_main(connection):
+    """Run the job work the parent sends until the pipe closes."""
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        _, target, args = message
+
+        def on_progress(pages_done: int, pages_total: int):
+            connection.send(("progress", pages_done, pages_total))
+
+        try:
+            result = target(*args, on_progress)
+        except Exception as e:
+            connection.send(("failed", str(e)))
+        else:
+            connection.send(("done", result))
+
+
+class _JobWorker:
+    """One report job process and the parent's end of its pipe."""
+
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_job_worker_main, args=(child,),
+                                       name="report-job-worker", daemon=True)
+        self.process.start()
+        child.close()
+
+    async def kill(self):
+        """Stop the process whatever it is doing and wait until it has gone."""
+        self.process.kill()
+        while self.process.is_alive():
+            await asyncio.sleep(0.01)
+        self.connection.close()
+
+
+class ReportJob:
+    """State of one submitted report."""
+
+    def __init__(self, pdf_path: str, pdf_digest: str):
+        self.job_id = str(uuid.uuid4())
+        self.pdf_path = pdf_path
+        self.pdf_digest = pdf_digest
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.pages_total: Optional[int] = None
+        self.pages_done = 0
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def notify(self):
+        """Wake everyone watching this job. Must run on the event loop."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+def _percentiles(samples) -> Dict:
+    if not samples:
+        return {"count": 0, "p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": ordered[int(0.50 * (len(ordered) - 1))],
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1]
+    }
+
+
+class ReportJobManager:
+    """Bounded queue of report jobs with cancellation, time limits and metrics."""
+
+    def __init__(self, runner: Callable[[ReportJob, Callable[..., Awaitable[Dict]]], Awaitable[Dict]],
+                 max_running: int = 2, max_queued: int = 32,
+                 time_limit: float = 120.0, retention_seconds: float = 600.0,
+                 on_finished: Optional[Callable[[ReportJob], None]] = None):
+        # runner(job, run_in_worker) -> result dict, on the event loop.  Its heavy part is
+        # run_in_worker(target, *args), which calls target(*args, on_progress) in a worker process.
+        self.runner = runner
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.time_limit = time_limit
+        self.retention_seconds = retention_seconds
+        self.on_finished = on_finished
+        self.jobs: Dict[str, ReportJob] = {}
+        self._slots = asyncio.Semaphore(max_running)
+        self._queue_waits = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+        self.counters = {state: 0 for state in TERMINAL_STATES}
+        self.counters["rejected"] = 0
+        self.counters["workers_killed"] = 0
+        # Spawned so workers start without the server's threads and sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._idle_workers: List[_JobWorker] = []
+
+    def queue_depth(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == "queued")
+
+    def running(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == "running")
+
+    def submit(self, pdf_path: str, pdf_digest: str) -> ReportJob:
+        """Queue a report for analysis; raises QueueFullError when saturated."""
+        self._prune()
+        if self.queue_depth() >= self.max_queued:
+            self.counters["rejected"] += 1
+            raise QueueFullError(f"Report queue is full ({self.max_queued} waiting)")
+
+        job = ReportJob(pdf_path, pdf_digest)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        self._prune()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ReportJob]:
+        """Stop a job; queued jobs never start, running ones have their worker killed."""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.task:
+            job.task.cancel()
+        return job
+
+    async def watch(self, job: ReportJob) -> AsyncIterator[Dict]:
+        """Yield a snapshot now and after every change until the job finishes."""
+        while True:
+            changed = job._changed
+            yield job.snapshot()
+            if job.finished:
+                return
+            await changed.wait()
+
+    async def _run(self, job: ReportJob):
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                self._queue_waits.append(job.started_at - job.created_at)
+                job.notify()
+
+                async def run_in_worker(target: Callable, *args) -> Dict:
+                    return await self._run_in_worker(job, target, args)
+
+                try:
+                    # On timeout the runner is cancelled, which kills its worker before this returns
+                    job.result = await asyncio.wait_for(self.runner(job, run_in_worker), self.time_limit)
+                    job.status = "succeeded"
+                except asyncio.TimeoutError:
+                    job.status = "timed_out"
+                    job.error = f"Report analysis exceeded {self.time_limit:.0f}s"
+                finally:
+                    self._run_times.append(time.time() - job.started_at)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Report job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self.counters[job.status] += 1
+            if self.on_finished:
+                self.on_finished(job)
+            job.notify()
+
+    async def _run_in_worker(self, job: ReportJob, target: Callable, args: tuple) -> Dict:
+        """Run ``target(*args, on_progress)`` in an idle worker, killing it if the job stops waiting."""
+        worker = self._idle_workers.pop() if self._idle_workers else _JobWorker(self._context)
+        try:
+            result = await self._exchange(job, worker, target, args)
+        except asyncio.CancelledError:
+            # Timed out or cancelled: whatever the worker is stuck in, it does not hold the slot
+            self.counters["workers_killed"] += 1
+            await worker.kill()
+            raise
+        except Exception:
+            if worker.process.is_alive():
+                self._idle_workers.append(worker)
+            else:
+                await worker.kill()
+            raise
+        self._idle_workers.append(worker)
+        return result
+
+    @staticmethod
+    async def _exchange(job: ReportJob, worker: _JobWorker, target: Callable, args: tuple) -> Dict:
+        """Send one call to a worker and follow its progress until it answers."""
+        loop = asyncio.get_running_loop()
+        outcome = loop.create_future()
+
+        def readable():
+            try:
+                while not outcome.done() and worker.connection.poll():
+                    kind, *payload = worker.connection.recv()
+                    if kind == "progress":
+                        job.pages_done, job.pages_total = payload
+                        job.notify()
+                    elif kind == "done":
+                        outcome.set_result(payload[0])
+                    else:
+                        outcome.set_exception(RuntimeError(payload[0]))
+            except (EOFError, OSError):
+                if not outcome.done():
+                    outcome.set_exception(RuntimeError("Report worker exited unexpectedly"))
+
+        # Read on the event loop rather than holding a thread per running job
+        fd = worker.connection.fileno()
+        loop.add_reader(fd, readable)
+        try:
+            worker.connection.send(("run", target, args))
+            return await outcome
+        finally:
+            loop.remove_reader(fd)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def metrics(self) -> Dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "running": self.running(),
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "jobs_retained": len(self.jobs),
+            "idle_workers": len(self._idle_workers),
+            "totals": dict(self.counters),
+            "queue_wait_seconds": _percentiles(self._queue_waits),
+            "run_seconds": _percentiles(self._run_times)
+        }
+
+    async def shutdown(self):
+        """Cancel every unfinished job, wait for them to stop and stop the idle workers."""
+        tasks = []
+        for job in list(self.jobs.values()):
+            if not job.finished:
+                self.cancel(job.job_id)
+                if job.task:
+                    tasks.append(job.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        workers, self._idle_workers = self._idle_workers, []
+        for worker in workers:
+            await worker.kill()
@@ -0,0 +1,97 @@
+"""Medical report analysis shared by the report endpoints."""
+import hashlib
+import sys
+import tempfile
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+from report_reader.pdf_extract import PDF_PARALLEL_MIN_PAGES, iter_page_texts
+from report_reader.report_parser import MedicalExerciseRecommendationSystem, load_recommender
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Per report job worker process: the recommender it mapped last
+_worker_recommender: Optional[MedicalExerciseRecommendationSystem] = None
+
+
+def spool_to_disk(source: BinaryIO) -> Tuple[str, str]:
+    """Copy an uploaded file to a temporary PDF on disk; return its path and SHA-256."""
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(prefix="report-", suffix=".pdf", delete=False) as target:
+        while True:
+            chunk = source.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            target.write(chunk)
+        return target.name, digest.hexdigest()
+
+
+def summarise_recommendations(recommender: MedicalExerciseRecommendationSystem,
+                              recommendations: Dict) -> Dict:
+    """Shape recommendations into the top-3 response returned by /process_report."""
+    revised_recommendations = []
+    for name, details in recommendations.items():
+        revised_recommendations.append({
+            "name": name,
+            "sets": details["parameters"]["sets"],
+            "reps": details["parameters"]["reps_per_set"],
+            "duration": details["parameters"]["duration_seconds"],
+            "confidence": details["recommendation_confidence"]
+        })
+
+    # Sort by confidence (descending) and pick top 3
+    revised_recommendations.sort(key=lambda x: x["confidence"], reverse=True)
+
+    return {
+        'available_exercises_count': len(recommender.available_exercises),
+        'recommended_exercises': revised_recommendations[:3],
+        'total_recommendations': len(recommendations)
+    }
+
+
+def analyse_report(pdf_path: str, recommender: MedicalExerciseRecommendationSystem,
+                   on_progress: Optional[Callable[[int, int], None]] = None,
+                   parallel: bool = True) -> Dict:
+    """Extract, featurise and score one report PDF. Blocking; run it off the event loop.
+
+    ``on_progress(pages_done, pages_total)`` is called after each page; it may
+    raise to abandon the report, which also cancels any pages still queued.
+    Without ``parallel`` pages are extracted in the calling process, which must
+    then call this on its main thread for the page time limit to apply.
+    """
+    pages_total = 0
+
+    def counted(page_count: int):
+        nonlocal pages_total
+        pages_total = page_count
+
+    def page_texts():
+        # Pages stream into the keyword scan as soon as each one is extracted
+        parallel_min_pages = PDF_PARALLEL_MIN_PAGES if parallel else sys.maxsize
+        texts = iter_page_texts(pdf_path, parallel_min_pages=parallel_min_pages, on_page_count=counted)
+        for index, text in enumerate(texts):
+            if on_progress:
+                on_progress(index + 1, pages_total)
+            if text:
+                yield text
+
+    medical_features = recommender.extract_medical_features_from_pages(page_texts())
+    recommendations = recommender.predict_exercise_recommendations(medical_features)
+    return summarise_recommendations(recommender, recommendations)
+
+
+def analyse_report_in_worker(pdf_path: str, artifact_dir: str, exercises_file: str,
+                             model_version: str, catalog_version: str,
+                             on_progress: Callable[[int, int], None]) -> Tuple[Dict, str, str]:
+    """Analyse a report inside a report job worker, with the model and catalog the server expects.
+
+    Returns the result with the model and catalog versions that produced it.
+    """
+    global _worker_recommender
+    recommender = _worker_recommender
+    if recommender is None or (recommender.model_version, recommender.catalog_version) \
+            != (model_version, catalog_version):
+        recommender = _worker_recommender = load_recommender(artifact_dir, exercises_file)
+    # The job already has a process of its own, so its pages stay in it
+    result = analyse_report(pdf_path, recommender, on_progress, parallel=False)
+    return result, recommender.model_version, recommender.catalog_version
@@ -0,0 +1,113 @@
+"""Single-pass, whole-word phrase matching over streamed report text.
+
+All phrases of a vocabulary are compiled once into one regular expression,
+and the text is scanned once with it, instead of once per phrase.  That is far
+fewer passes, but not a trie: ``re`` still tries the alternatives one by one
+at each word start, so the cost per word still grows with the vocabulary.
+The lookahead is zero-width, which keeps overlapping phrases ("limited range"
+and "range of motion") countable.  Phrases that start at the same word
+("moderate" inside "moderate assistance") are credited through a prefix table.
+
+Phrases match whole words only, so plurals and other inflections do not count:
+"knees" no longer matches "knee", nor "shoulders" "shoulder", as the old
+substring search did.  That changes which recommendations some reports get.
+"""
+import re
+from collections import Counter
+from itertools import takewhile
+from typing import Dict, Iterable, List, Optional, Pattern
+
+# Characters kept between chunks so phrases spanning a page break still match
+_CARRY_SLACK = 64
+
+
+class KeywordMatcher:
+    """A compiled vocabulary of phrases matched on word boundaries."""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = sorted({p.lower() for p in phrases}, key=len, reverse=True)
+        tokens = {p: p.split() for p in self.phrases}
+
+        # Longest alternatives first, so the longest phrase wins at each word start
+        alternatives = "|".join(r"\s+".join(map(re.escape, tokens[p])) for p in self.phrases)
+        self.pattern = re.compile(rf"\b(?=({alternatives})\b)")
+
+        # Shorter phrases that are whole-word prefixes of a longer one
+        self._implied: Dict[str, List[str]] = {
+            phrase: [
+                other for other in self.phrases
+                if len(tokens[other]) < len(tokens[phrase])
+                and tokens[phrase][:len(tokens[other])] == tokens[other]
+            ]
+            for phrase in self.phrases
+        }
+        self._canonical = {" ".join(tokens[p]): p for p in self.phrases}
+        self.max_phrase_length = max((len(p) for p in self.phrases), default=0)
+
+    def credit(self, matched_text: str) -> List[str]:
+        """Return every phrase matched by one hit: the phrase and its prefixes."""
+        phrase = self._canonical[" ".join(matched_text.split())]
+        return [phrase] + self._implied[phrase]
+
+    def stream(self, captures: Optional[Dict[str, Pattern]] = None) -> "KeywordStream":
+        """Start a streaming scan; ``captures`` are extra patterns whose first match is kept."""
+        return KeywordStream(self, captures or {})
+
+    def count(self, text: str) -> Counter:
+        """Count phrase occurrences in one piece of text."""
+        stream = self.stream()
+        stream.feed(text)
+        return stream.finish()
+
+
+class KeywordStream:
+    """Incremental scan state; chunks are joined with a single space, like pages."""
+
+    def __init__(self, matcher: KeywordMatcher, captures: Dict[str, Pattern]):
+        self.matcher = matcher
+        self.counts: Counter = Counter()
+        self.captures: Dict[str, Optional[re.Match]] = {name: None for name in captures}
+        self.text_length = 0
+        self._capture_patterns = captures
+        self._carry = ""
+        self._resume = 0
+        self._chunks_seen = 0
+        self._keep = matcher.max_phrase_length + _CARRY_SLACK
+
+    def feed(self, text: str):
+        """Scan the next chunk of text."""
+        text = text.lower()
+        if self._chunks_seen:
+            text = " " + text
+        self._chunks_seen += 1
+        self.text_length += len(text)
+        self._scan(self._carry + text, final=False)
+
+    def finish(self) -> Counter:
+        """Scan whatever is still buffered and return the phrase counts."""
+        self._scan(self._carry, final=True)
+        return self.counts
+
+    def _scan(self, buffer: str, final: bool):
+        start = self._resume
+        # Hits starting near the end may continue in the next chunk; defer them
+        limit = len(buffer) if final else max(start, len(buffer) - self._keep)
+
+        hits = Counter(
+            match.group(1) for match in
+            takewhile(lambda match: match.start() < limit, self.matcher.pattern.finditer(buffer, start))
+        )
+        for matched_text, count in hits.items():
+            for phrase in self.matcher.credit(matched_text):
+                self.counts[phrase] += count
+
+        for name, pattern in self._capture_patterns.items():
+            if self.captures[name] is None:
+                match = pattern.search(buffer, start)
+                if match and match.start() < limit:
+                    self.captures[name] = match
+
+        # Keep one character before the resume point so \b still sees the real word edge
+        context = max(limit - 1, 0)
+        self._carry = "" if final else buffer[context:]
+        self._resume = 0 if final else limit - context
@@ -0,0 +1,307 @@
+"""Memory-mappable storage for the exercise recommendation models.
+
+Pickled scikit-learn forests are rebuilt as private heap objects in every
+process that loads them, so N uvicorn workers hold N copies of the same trees.
+Here each fitted forest is flattened into contiguous node arrays and written as
+``.npy`` files next to a small ``meta.json``.  Loading maps those files
+read-only (``np.load(..., mmap_mode='r')``), so every worker on a host shares
+the same page-cache pages for the model.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+
+class FlatForest:
+    """A fitted random forest stored as one set of node arrays for all trees."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], max_depth: int):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = max_depth
+
+    @staticmethod
+    def flatten(forest, normalize: bool) -> Tuple[Dict[str, np.ndarray], int]:
+        """Concatenate the node arrays of every tree in a fitted sklearn forest."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int32)
+            right = tree.children_right.astype(np.int32)
+            # Leaves keep -1 so they can be recognised after the offset shift
+            left = np.where(left >= 0, left + offset, -1)
+            right = np.where(right >= 0, right + offset, -1)
+            value = tree.value[:, 0, :].astype(np.float64)
+            if normalize:
+                # Per-leaf class probabilities, as DecisionTreeClassifier.predict_proba does
+                totals = value.sum(axis=1, keepdims=True)
+                totals[totals == 0.0] = 1.0
+                value = value / totals
+
+            features.append(tree.feature.astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left.astype(np.int32))
+            rights.append(right.astype(np.int32))
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            'feature': np.concatenate(features),
+            'threshold': np.concatenate(thresholds),
+            'left': np.concatenate(lefts),
+            'right': np.concatenate(rights),
+            'value': np.ascontiguousarray(np.concatenate(values)),
+            'roots': np.array(roots, dtype=np.int32),
+        }
+        return arrays, max_depth
+
+    def apply(self, X) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.tile(np.asarray(self.roots), (X.shape[0], 1))
+
+        for _ in range(self.max_depth + 1):
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+
+        return nodes
+
+    def leaf_mean(self, X) -> np.ndarray:
+        """Average the leaf values over all trees, shape (n_samples, n_outputs)."""
+        return self.value[self.apply(X)].mean(axis=1)
+
+
+class MappedForestClassifier(FlatForest):
+    """Drop-in for ``RandomForestClassifier.predict_proba`` over mapped arrays."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], max_depth: int, classes: List):
+        super().__init__(arrays, max_depth)
+        self.classes_ = np.array(classes)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.leaf_mean(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class MappedForestRegressor(FlatForest):
+    """Drop-in for ``RandomForestRegressor.predict`` over mapped arrays."""
+
+    def predict(self, X) -> np.ndarray:
+        return self.leaf_mean(X)[:, 0]
+
+
+class MappedStandardScaler:
+    """The ``transform`` half of a fitted ``StandardScaler``."""
+
+    def __init__(self, mean: List[float], scale: List[float]):
+        self.mean_ = np.array(mean, dtype=np.float64)
+        self.scale_ = np.array(scale, dtype=np.float64)
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class MappedLabelEncoder:
+    """The ``transform`` half of a fitted ``LabelEncoder``."""
+
+    def __init__(self, classes: List[str]):
+        self.classes_ = np.array(classes)
+
+    def transform(self, values) -> np.ndarray:
+        values = np.asarray(values)
+        indices = np.searchsorted(self.classes_, values)
+        clipped = np.minimum(indices, len(self.classes_) - 1)
+        if len(self.classes_) == 0 or not np.all(self.classes_[clipped] == values):
+            raise ValueError(f"y contains previously unseen labels: {values.tolist()}")
+        return indices
+
+
+def export_models(recommender, directory: str) -> str:
+    """Write a trained recommender as mappable artifacts; return the model version."""
+    forests = {'recommendation': (recommender.recommendation_model, True)}
+    for target, model in recommender.parameter_models.items():
+        forests[target] = (model, False)
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".model-", dir=parent)
+    digest = hashlib.sha256()
+
+    try:
+        forest_meta = {}
+        for name, (model, is_classifier) in forests.items():
+            arrays, max_depth = FlatForest.flatten(model, normalize=is_classifier)
+            for array_name in FOREST_ARRAYS:
+                array = arrays[array_name]
+                np.save(os.path.join(staging, f"{name}.{array_name}.npy"), array)
+                digest.update(array.tobytes())
+            forest_meta[name] = {
+                'kind': 'classifier' if is_classifier else 'regressor',
+                'n_trees': int(len(arrays['roots'])),
+                'max_depth': int(max_depth),
+            }
+            if is_classifier:
+                forest_meta[name]['classes'] = model.classes_.tolist()
+
+        meta = {
+            'format': ARTIFACT_FORMAT_VERSION,
+            'forests': forest_meta,
+            'scaler': {
+                'mean': recommender.scaler.mean_.tolist(),
+                'scale': recommender.scaler.scale_.tolist(),
+            },
+            'label_encoders': {
+                feature: encoder.classes_.tolist()
+                for feature, encoder in recommender.label_encoders.items()
+            },
+            'available_exercises': recommender.available_exercises,
+        }
+        digest.update(json.dumps(meta, sort_keys=True).encode('utf-8'))
+        meta['version'] = digest.hexdigest()[:16]
+
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        # Publish atomically so concurrent workers never map a half-written model
+        if os.path.isdir(directory):
+            retired = f"{directory}.old-{os.getpid()}"
+            os.rename(directory, retired)
+            os.rename(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.rename(staging, directory)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Model artifacts {meta['version']} written to {directory}")
+    return meta['version']
+
+
+def artifact_signature(directory: str) -> Optional[Tuple[int, int]]:
+    """Identify the artifacts currently published in ``directory`` with one ``stat``.
+
+    Publishing replaces the whole directory, so a new export always has a new
+    ``meta.json``.  None if nothing has been published yet.
+    """
+    try:
+        meta = os.stat(os.path.join(directory, META_FILE))
+    except OSError:
+        return None
+    return meta.st_ino, meta.st_mtime_ns
+
+
+def load_mapped_models(directory: str) -> Dict[str, Any]:
+    """Map artifacts read-only; keys mirror the pickled ``model_data`` dict."""
+    with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if meta.get('format') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format: {meta.get('format')}")
+
+    forests = {}
+    for name, info in meta['forests'].items():
+        arrays = {
+            array_name: np.load(os.path.join(directory, f"{name}.{array_name}.npy"), mmap_mode='r')
+            for array_name in FOREST_ARRAYS
+        }
+        if info['kind'] == 'classifier':
+            forests[name] = MappedForestClassifier(arrays, info['max_depth'], info['classes'])
+        else:
+            forests[name] = MappedForestRegressor(arrays, info['max_depth'])
+
+    return {
+        'recommendation_model': forests.pop('recommendation'),
+        'parameter_models': forests,
+        'label_encoders': {
+            feature: MappedLabelEncoder(classes)
+            for feature, classes in meta['label_encoders'].items()
+        },
+        'scaler': MappedStandardScaler(meta['scaler']['mean'], meta['scaler']['scale']),
+        'available_exercises': meta.get('available_exercises', {}),
+        'version': meta['version'],
+    }
+
+
+def model_memory_report(directory: str) -> Dict[str, Any]:
+    """Report this process's resident memory, split into shared and private pages.
+
+    ``model`` covers only the mappings of files under ``directory``; pages shown
+    as shared there are the ones other workers are mapping too.
+    """
+    report = {'pid': os.getpid(), 'available': False}
+    directory = os.path.realpath(directory) + os.sep
+    fields = {
+        'Rss': 'rss', 'Pss': 'pss',
+        'Shared_Clean': 'shared', 'Shared_Dirty': 'shared',
+        'Private_Clean': 'private', 'Private_Dirty': 'private',
+    }
+    process = {'rss': 0, 'pss': 0, 'shared': 0, 'private': 0}
+    model = dict(process)
+    in_model = False
+
+    try:
+        with open('/proc/self/smaps', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                if not parts[0].endswith(':'):
+                    # Mapping header: address perms offset dev inode [path]
+                    in_model = len(parts) >= 6 and parts[5].startswith(directory)
+                    continue
+                key = fields.get(parts[0][:-1])
+                if key is None:
+                    continue
+                size = int(parts[1]) * 1024
+                process[key] += size
+                if in_model:
+                    model[key] += size
+    except OSError:
+        return report
+
+    report.update({
+        'available': True,
+        'process_bytes': process,
+        'model_bytes': model,
+    })
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from report_reader.report_parser import MedicalExerciseRecommendationSystem
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "model_artifacts"
+    recommender = MedicalExerciseRecommendationSystem()
+    recommender.load_available_exercises("exercises.txt")
+    recommender.train_models()
+    print(f"Exported model version {export_models(recommender, target)} to {target}")
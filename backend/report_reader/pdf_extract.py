@@ -0,0 +1,146 @@
+"""Page-by-page text extraction for medical report PDFs.
+
+Every page is extracted exactly once and yielded in page order as soon as it is
+ready, so callers can start analysing the beginning of a report while later
+pages are still being parsed.  Every page gets its own time limit.  Reports with
+many pages are spread over a shared process pool; short reports are read in the
+calling thread, where pool start-up would cost more than it saves.  Only a main
+thread can be interrupted by the timer, so other threads send even short
+reports to the pool.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGE_TIMEOUT = float(os.environ.get("PDF_PAGE_TIMEOUT", "10"))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Per worker process: the reader for the file it extracted from last
+_worker_reader = None
+
+
+class PageTimeout(Exception):
+    """Raised in the extracting thread when one page exceeds its time limit."""
+
+
+def _open_pdf(pdf_path: str):
+    """Open a PDF, importing pypdf on first use rather than at server start-up."""
+    from pypdf import PdfReader
+    return PdfReader(pdf_path)
+
+
+def _on_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _can_time_pages() -> bool:
+    """Whether this thread can be interrupted by an interval timer."""
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+def _extract_with_limit(reader, pdf_path: str, index: int, timeout: float) -> str:
+    """Extract one page on the main thread, giving up after ``timeout`` seconds."""
+    previous = signal.signal(signal.SIGALRM, _on_page_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return reader.pages[index].extract_text() or ""
+    except PageTimeout:
+        logger.warning(f"Page {index + 1} of {pdf_path} exceeded {timeout:.1f}s; skipped")
+        return ""
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page(pdf_path: str, index: int, timeout: float) -> str:
+    """Extract one page inside a pool worker, giving up after ``timeout`` seconds."""
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != pdf_path:
+        _worker_reader = (pdf_path, _open_pdf(pdf_path))
+    # Pool tasks run on the worker's main thread, so the timer can interrupt them
+    return _extract_with_limit(_worker_reader[1], pdf_path, index, timeout)
+
+
+def get_page_pool() -> ProcessPoolExecutor:
+    """Return the process pool shared by all report extractions."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps the workers free of the server's threads and MediaPipe state
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_page_pool():
+    """Stop the shared extraction pool, if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def iter_page_texts(pdf_path: str, page_timeout: float = PDF_PAGE_TIMEOUT,
+                    parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+                    on_page_count: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """Yield the text of every page in order, extracting each page once.
+
+    Pages that fail or run out of time yield an empty string so page numbering
+    stays aligned with the document.  ``on_page_count`` receives the number of
+    pages as soon as the PDF is opened, before the first page is extracted.
+    """
+    reader = _open_pdf(pdf_path)
+    page_count = len(reader.pages)
+    if on_page_count:
+        on_page_count(page_count)
+
+    if _can_time_pages() and (page_count < parallel_min_pages or PDF_WORKERS <= 1):
+        for index in range(page_count):
+            try:
+                yield _extract_with_limit(reader, pdf_path, index, page_timeout)
+            except Exception as e:
+                logger.error(f"Error extracting page {index + 1} of {pdf_path}: {e}")
+                yield ""
+        return
+
+    pool = get_page_pool()
+    pending = deque()
+    next_index = 0
+    # Keep a bounded window in flight so one huge report cannot monopolise the pool
+    window = PDF_WORKERS * 2
+
+    try:
+        while pending or next_index < page_count:
+            while next_index < page_count and len(pending) < window:
+                pending.append(pool.submit(_extract_page, pdf_path, next_index, page_timeout))
+                next_index += 1
+
+            future = pending.popleft()
+            try:
+                # The worker enforces the limit itself; this only guards against a hung worker
+                yield future.result(timeout=page_timeout * 2 + 5)
+            except FutureTimeout:
+                logger.warning(f"Page worker for {pdf_path} stopped responding; page skipped")
+                future.cancel()
+                yield ""
+            except Exception as e:
+                logger.error(f"Error extracting page of {pdf_path}: {e}")
+                yield ""
+    finally:
+        # Reached early when the consumer stops reading (cancelled or timed-out job)
+        for future in pending:
+            future.cancel()
@@ -1,48 +1,82 @@
+import hashlib
 import json
 import re
-import PyPDF2
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
-import pickle
 import os
-from typing import Dict, List, Tuple, Any
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple, Any
+from report_reader.keyword_matcher import KeywordMatcher
+from report_reader.model_store import export_models, load_mapped_models
+from report_reader.pdf_extract import iter_page_texts
 import logging
-import nltk
-from collections import Counter
+
+# pandas and scikit-learn are only needed to train; serving maps exported arrays
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Define medical condition keywords and their associated exercises
+CONDITION_EXERCISE_MAPPING = {
+    'stroke': ['ARM_STRETCH', 'SHOULDER_RAISE', 'LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'LEG_RAISE', 'STANDING_BALANCE'],
+    'shoulder': ['SHOULDER_RAISE', 'ARM_STRETCH', 'LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE'],
+    'arm weakness': ['LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'ARM_STRETCH', 'GRIP_STRENGTH'],
+    'leg weakness': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE', 'WALKING_PRACTICE'],
+    'balance': ['STANDING_BALANCE', 'LEG_RAISE', 'WALKING_PRACTICE'],
+    'mobility': ['WALKING_PRACTICE', 'LEG_RAISE', 'STANDING_BALANCE', 'SQUAT'],
+    'neck': ['NECK_ROTATION'],
+    'posture': ['STANDING_BALANCE', 'SHOULDER_RAISE', 'NECK_ROTATION'],
+    'range of motion': ['ARM_STRETCH', 'SHOULDER_RAISE', 'NECK_ROTATION', 'LEG_RAISE'],
+    'hemiplegia': ['LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'LEG_RAISE', 'STANDING_BALANCE'],
+    'hemiparesis': ['ARM_STRETCH', 'SHOULDER_RAISE', 'LEG_RAISE', 'WALKING_PRACTICE'],
+    'paraplegia': ['ARM_STRETCH', 'SHOULDER_RAISE', 'GRIP_STRENGTH'],
+    'spinal cord': ['ARM_STRETCH', 'SHOULDER_RAISE', 'GRIP_STRENGTH', 'STANDING_BALANCE'],
+    'knee': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE'],
+    'hip': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE'],
+    'gait': ['WALKING_PRACTICE', 'LEG_RAISE', 'STANDING_BALANCE'],
+    'coordination': ['ARM_STRETCH', 'STANDING_BALANCE', 'NECK_ROTATION']
+}
+
+# Checked in order; the first keyword present wins
+SEVERITY_SCORES = {'severe': 1, 'moderate': 2, 'mild': 3, 'slight': 4}
+FUNCTIONAL_INDICATORS = {
+    'independent': 4,
+    'minimal assistance': 3,
+    'moderate assistance': 2,
+    'maximum assistance': 1,
+    'dependent': 1
+}
+
+LIMITATION_KEYWORDS = {
+    'no weight bearing': 'no_weight_bearing',
+    'limited range': 'limited_range',
+    'restricted movement': 'limited_range',
+    'pain': 'pain_present'
+}
+
+AGE_PATTERN = re.compile(r'age[:\s]+(\d+)')
+
+# Every vocabulary above, compiled once into a single-pass matcher
+MEDICAL_KEYWORDS = KeywordMatcher(
+    list(CONDITION_EXERCISE_MAPPING) + list(SEVERITY_SCORES)
+    + list(FUNCTIONAL_INDICATORS) + list(LIMITATION_KEYWORDS)
+)
+
 class MedicalExerciseRecommendationSystem:
     def __init__(self):
         self.available_exercises = {}
         self.recommendation_model = None
         self.parameter_models = {}
-        self.text_vectorizer = TfidfVectorizer(
-            max_features=500,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=2
-        )
         self.label_encoders = {}
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.model_version = None
+        self.catalog_version = None
         
     def read_medical_pdf(self, pdf_path: str) -> str:
         """Extract text content from medical PDF report"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            return "".join(text + "\n" for text in iter_page_texts(pdf_path))
         except Exception as e:
             logger.error(f"Error reading medical PDF {pdf_path}: {e}")
             return ""
@@ -111,10 +145,12 @@ class MedicalExerciseRecommendationSystem:
         text = self.read_exercises_file(exercises_file)
         if text:
             self.available_exercises = self.parse_exercise_config(text)
+            self.catalog_version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
             logger.info(f"Loaded {len(self.available_exercises)} available exercises")
         else:
             # Use default exercises if file not found
             self.available_exercises = self.get_default_exercises()
+            self.catalog_version = "default"
             logger.info("Using default exercise configuration")
     
     def get_default_exercises(self) -> Dict:
@@ -176,73 +212,45 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
     
     def extract_medical_features(self, medical_text: str) -> Dict:
         """Extract relevant medical information from PDF text"""
-        medical_text = medical_text.lower()
-        
-        # Define medical condition keywords and their associated exercises
-        condition_exercise_mapping = {
-            'stroke': ['ARM_STRETCH', 'SHOULDER_RAISE', 'LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'LEG_RAISE', 'STANDING_BALANCE'],
-            'shoulder': ['SHOULDER_RAISE', 'ARM_STRETCH', 'LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE'],
-            'arm weakness': ['LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'ARM_STRETCH', 'GRIP_STRENGTH'],
-            'leg weakness': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE', 'WALKING_PRACTICE'],
-            'balance': ['STANDING_BALANCE', 'LEG_RAISE', 'WALKING_PRACTICE'],
-            'mobility': ['WALKING_PRACTICE', 'LEG_RAISE', 'STANDING_BALANCE', 'SQUAT'],
-            'neck': ['NECK_ROTATION'],
-            'posture': ['STANDING_BALANCE', 'SHOULDER_RAISE', 'NECK_ROTATION'],
-            'range of motion': ['ARM_STRETCH', 'SHOULDER_RAISE', 'NECK_ROTATION', 'LEG_RAISE'],
-            'hemiplegia': ['LEFT_ARM_RAISE', 'RIGHT_ARM_RAISE', 'LEG_RAISE', 'STANDING_BALANCE'],
-            'hemiparesis': ['ARM_STRETCH', 'SHOULDER_RAISE', 'LEG_RAISE', 'WALKING_PRACTICE'],
-            'paraplegia': ['ARM_STRETCH', 'SHOULDER_RAISE', 'GRIP_STRENGTH'],
-            'spinal cord': ['ARM_STRETCH', 'SHOULDER_RAISE', 'GRIP_STRENGTH', 'STANDING_BALANCE'],
-            'knee': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE'],
-            'hip': ['LEG_RAISE', 'SQUAT', 'STANDING_BALANCE'],
-            'gait': ['WALKING_PRACTICE', 'LEG_RAISE', 'STANDING_BALANCE'],
-            'coordination': ['ARM_STRETCH', 'STANDING_BALANCE', 'NECK_ROTATION']
-        }
+        return self.extract_medical_features_from_pages([medical_text])
+    
+    def extract_medical_features_from_pages(self, pages: Iterable[str]) -> Dict:
+        """Extract medical information from report pages in one streaming pass"""
+        stream = MEDICAL_KEYWORDS.stream(captures={'age': AGE_PATTERN})
+        for page in pages:
+            stream.feed(page)
+        keyword_counts = stream.finish()
         
         # Extract patient demographics
-        age_match = re.search(r'age[:\s]+(\d+)', medical_text)
+        age_match = stream.captures['age']
         age = int(age_match.group(1)) if age_match else 50
         
-        # Extract severity indicators
-        severity_keywords = ['severe', 'moderate', 'mild', 'slight']
-        severity_scores = {'severe': 1, 'moderate': 2, 'mild': 3, 'slight': 4}
+        # Extract severity indicators, most severe first
         severity = 3  # default moderate
-        
-        for keyword in severity_keywords:
-            if keyword in medical_text:
-                severity = severity_scores[keyword]
+        for keyword, score in SEVERITY_SCORES.items():
+            if keyword_counts[keyword]:
+                severity = score
                 break
         
         # Find relevant conditions and recommended exercises
         recommended_exercises = set()
         condition_scores = {}
         
-        for condition, exercises in condition_exercise_mapping.items():
-            if condition in medical_text:
-                condition_scores[condition] = medical_text.count(condition)
+        for condition, exercises in CONDITION_EXERCISE_MAPPING.items():
+            if keyword_counts[condition]:
+                condition_scores[condition] = keyword_counts[condition]
                 recommended_exercises.update(exercises)
         
         # Extract specific limitations or contraindications
         limitations = []
-        if 'no weight bearing' in medical_text:
-            limitations.append('no_weight_bearing')
-        if 'limited range' in medical_text or 'restricted movement' in medical_text:
-            limitations.append('limited_range')
-        if 'pain' in medical_text:
-            limitations.append('pain_present')
+        for keyword, limitation in LIMITATION_KEYWORDS.items():
+            if keyword_counts[keyword] and limitation not in limitations:
+                limitations.append(limitation)
         
         # Determine functional level
-        functional_indicators = {
-            'independent': 4,
-            'minimal assistance': 3,
-            'moderate assistance': 2,
-            'maximum assistance': 1,
-            'dependent': 1
-        }
-        
         functional_level = 3  # default
-        for indicator, score in functional_indicators.items():
-            if indicator in medical_text:
+        for indicator, score in FUNCTIONAL_INDICATORS.items():
+            if keyword_counts[indicator]:
                 functional_level = score
                 break
         
@@ -253,11 +261,11 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
             'recommended_exercises': list(recommended_exercises),
             'condition_scores': condition_scores,
             'limitations': limitations,
-            'medical_text_length': len(medical_text),
+            'medical_text_length': stream.text_length,
             'medical_keywords_count': sum(condition_scores.values())
         }
     
-    def create_training_data(self) -> pd.DataFrame:
+    def create_training_data(self) -> "pd.DataFrame":
         """Create synthetic training data for exercise recommendation"""
         np.random.seed(42)
         
@@ -349,10 +357,16 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
                             'duration': 15
                         })
         
+        import pandas as pd
         return pd.DataFrame(training_data)
     
     def train_models(self) -> None:
         """Train ML models for exercise recommendation and parameter prediction"""
+        from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import mean_squared_error, accuracy_score
+        
         logger.info("Creating training data and training ML models...")
         
         # Create training data
@@ -371,6 +385,7 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
         # Prepare feature matrix
         feature_columns = [f'{f}_encoded' for f in categorical_features] + numerical_features
         X = df[feature_columns].values
+        self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         
         # Train recommendation model (classification)
@@ -449,53 +464,71 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
     
     def predict_exercise_recommendations(self, medical_features: Dict) -> Dict:
         """Predict which exercises to recommend and their parameters"""
-        recommendations = {}
-        
-        # Determine primary condition for modeling
-        condition_scores = medical_features.get('condition_scores', {})
-        primary_condition = max(condition_scores.keys()) if condition_scores else 'general'
-        
-        # Check each available exercise
-        for exercise_name, exercise_data in self.available_exercises.items():
-            
-            # Prepare input for models
-            input_data = {
-                'condition': primary_condition,
-                'exercise_name': exercise_name,
-                'age': medical_features.get('age', 50),
-                'severity': medical_features.get('severity', 3),
-                'functional_level': medical_features.get('functional_level', 3)
-            }
-            
-            # Encode categorical features
-            encoded_features = []
-            for feature in ['condition', 'exercise_name']:
-                if feature in self.label_encoders:
-                    try:
-                        encoded_val = self.label_encoders[feature].transform([str(input_data[feature])])[0]
-                    except ValueError:
-                        # Handle unknown categories
-                        encoded_val = 0
-                    encoded_features.append(encoded_val)
-                else:
-                    encoded_features.append(0)
-            
-            # Add numerical features
-            numerical_features = [input_data['age'], input_data['severity'], input_data['functional_level']]
-            
-            # Combine all features
-            X = np.array([encoded_features + numerical_features])
-            X_scaled = self.scaler.transform(X)
+        return self.predict_exercise_recommendations_batch([medical_features])[0]
+    
+    def encode_category(self, feature: str, value: str) -> int:
+        """Label-encode a categorical feature, mapping unknown categories to 0"""
+        if feature not in self.label_encoders:
+            return 0
+        try:
+            return self.label_encoders[feature].transform([str(value)])[0]
+        except ValueError:
+            # Handle unknown categories
+            return 0
+    
+    def predict_exercise_recommendations_batch(self, medical_features_list: List[Dict]) -> List[Dict]:
+        """Score every patient against every available exercise as one feature matrix"""
+        exercise_names = list(self.available_exercises)
+        if not medical_features_list or not exercise_names:
+            return [{} for _ in medical_features_list]
+        
+        exercise_codes = [self.encode_category('exercise_name', name) for name in exercise_names]
+        
+        # One row per (patient, exercise) pair, patients in blocks of len(exercise_names)
+        rows = []
+        primary_conditions = []
+        for medical_features in medical_features_list:
+            # Determine primary condition for modeling
+            condition_scores = medical_features.get('condition_scores', {})
+            primary_condition = max(condition_scores.keys()) if condition_scores else 'general'
+            primary_conditions.append(primary_condition)
             
-            # Predict if exercise should be recommended
-            recommendation_prob = self.recommendation_model.predict_proba(X_scaled)[0][1]  # Probability of being recommended
+            condition_code = self.encode_category('condition', primary_condition)
+            numerical_features = [
+                medical_features.get('age', 50),
+                medical_features.get('severity', 3),
+                medical_features.get('functional_level', 3)
+            ]
+            for exercise_code in exercise_codes:
+                rows.append([condition_code, exercise_code] + numerical_features)
+        
+        X_scaled = self.scaler.transform(np.array(rows))
+        
+        # Probability of being recommended, thresholded for recommendation
+        recommendation_probs = self.recommendation_model.predict_proba(X_scaled)[:, 1]
+        recommended_rows = np.flatnonzero(recommendation_probs > 0.5)
+        
+        # Parameter models only see the recommended pairs
+        parameter_predictions = {}
+        if len(recommended_rows):
+            for param_name, model in self.parameter_models.items():
+                parameter_predictions[param_name] = dict(
+                    zip(recommended_rows.tolist(), model.predict(X_scaled[recommended_rows]))
+                )
+        
+        results = []
+        for patient_index, medical_features in enumerate(medical_features_list):
+            recommendations = {}
+            first_row = patient_index * len(exercise_names)
             
-            # Use threshold for recommendation
-            if recommendation_prob > 0.5:
-                # Predict parameters
+            for offset, exercise_name in enumerate(exercise_names):
+                row = first_row + offset
+                if recommendation_probs[row] <= 0.5:
+                    continue
+                
                 parameters = {}
-                for param_name, model in self.parameter_models.items():
-                    pred_value = model.predict(X_scaled)[0]
+                for param_name, predictions in parameter_predictions.items():
+                    pred_value = predictions[row]
                     
                     if param_name == 'sets':
                         parameters['sets'] = max(1, int(round(pred_value)))
@@ -508,13 +541,15 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
                 parameters = self.adjust_for_limitations(parameters, medical_features.get('limitations', []))
                 
                 recommendations[exercise_name] = {
-                    'exercise_data': exercise_data,
-                    'recommendation_confidence': float(recommendation_prob),
+                    'exercise_data': self.available_exercises[exercise_name],
+                    'recommendation_confidence': float(recommendation_probs[row]),
                     'parameters': parameters,
-                    'rationale': self.generate_rationale(exercise_name, primary_condition, medical_features)
+                    'rationale': self.generate_rationale(exercise_name, primary_conditions[patient_index], medical_features)
                 }
+            
+            results.append(recommendations)
         
-        return recommendations
+        return results
     
     def adjust_for_limitations(self, parameters: Dict, limitations: List) -> Dict:
         """Adjust exercise parameters based on patient limitations"""
@@ -566,25 +601,34 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
         model_data = {
             'recommendation_model': self.recommendation_model,
             'parameter_models': self.parameter_models,
-            'text_vectorizer': self.text_vectorizer,
             'label_encoders': self.label_encoders,
             'scaler': self.scaler,
             'available_exercises': self.available_exercises
         }
         
+        import pickle
         with open(model_path, 'wb') as f:
             pickle.dump(model_data, f)
         logger.info(f"Models saved to {model_path}")
     
+    def export_mapped_models(self, directory: str) -> str:
+        """Save trained models as memory-mappable artifacts and return their version"""
+        self.model_version = export_models(self, directory)
+        return self.model_version
+    
     def load_models(self, model_path: str) -> None:
-        """Load trained models"""
+        """Load trained models from a pickle file or a mapped artifact directory"""
         try:
-            with open(model_path, 'rb') as f:
-                model_data = pickle.load(f)
+            if os.path.isdir(model_path):
+                model_data = load_mapped_models(model_path)
+                self.model_version = model_data['version']
+            else:
+                import pickle
+                with open(model_path, 'rb') as f:
+                    model_data = pickle.load(f)
             
             self.recommendation_model = model_data['recommendation_model']
             self.parameter_models = model_data['parameter_models']
-            self.text_vectorizer = model_data['text_vectorizer']
             self.label_encoders = model_data['label_encoders']
             self.scaler = model_data['scaler']
             self.available_exercises = model_data.get('available_exercises', {})
@@ -593,6 +637,28 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
         except Exception as e:
             logger.error(f"Error loading models: {e}")
 
+def load_recommender(artifact_dir: str, exercises_file: str = "exercises.txt") -> MedicalExerciseRecommendationSystem:
+    """Map the shared model artifacts, training and exporting them first if missing"""
+    recommender = MedicalExerciseRecommendationSystem()
+    
+    if not os.path.isdir(artifact_dir):
+        trainer = MedicalExerciseRecommendationSystem()
+        trainer.load_available_exercises(exercises_file)
+        trainer.train_models()
+        try:
+            trainer.export_mapped_models(artifact_dir)
+        except OSError as e:
+            # Another worker published the artifacts first; map theirs instead
+            logger.info(f"Using model artifacts exported by another worker: {e}")
+    
+    recommender.load_models(artifact_dir)
+    if recommender.recommendation_model is None:
+        raise RuntimeError(f"Could not load model artifacts from {artifact_dir}")
+    
+    # The catalog can change without retraining; unknown exercises encode as 0
+    recommender.load_available_exercises(exercises_file)
+    return recommender
+
 def create_sample_medical_report():
     """Create a sample medical PDF report for testing"""
     sample_report = """
@@ -716,13 +782,11 @@ RULE: right_shoulder,right_elbow,right_wrist|170,190|Arm should be extended|1.0
     
     print("Sample exercises.txt file created!")
 
-from pdfminer.high_level import extract_text
-
 def pdf_to_txt(input_pdf: str, output_txt: str) -> None:
     """
     Extract text from a text-based PDF and save it to a .txt file.
     """
-    text = extract_text(input_pdf)
+    text = "\n".join(iter_page_texts(input_pdf))
     with open(output_txt, "w", encoding="utf-8") as f:
         f.write(text)
 
@@ -744,8 +808,6 @@ def main():
     
     # Note: In practice, this would be a PDF file
     # For demo, we'll use the text file as if it were extracted from PDF
-    from pdfminer.high_level import extract_text
-
     pdf_to_txt("Report_001.pdf", "medical_report.txt")
 
 
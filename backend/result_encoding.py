@@ -0,0 +1,128 @@
+"""Shape each session's analysis results to what its client asked for.
+
+Results are the hottest message type, and by default every one repeats the
+exercise name, every rule's feedback and scores, and all 33 landmarks.  A
+session can ask for less:
+
+- ``score``: the score, the verdict and any audio cue.
+- ``changes``: the same, plus only the rules whose feedback changed since the
+  previous result, and the exercise name only when it changes.
+- ``full``: everything, as before.
+
+On top of any level, delta mode sends only the fields that differ from the
+last result the client acknowledged with ``{"type": "ack", "data": {"seq": n}}``,
+with ``base`` naming that result and ``removed`` listing fields it no longer has.
+A client rebuilds the whole result as its copy of ``base``, updated with the
+delta.  Until the first ack, and whenever acks fall ``DELTA_KEYFRAME_INTERVAL``
+results behind, the result goes out whole.
+"""
+import os
+from typing import Dict, List, Optional
+
+VERBOSITY_LEVELS = ("score", "changes", "full")
+RESULT_VERBOSITY = os.environ.get("RESULT_VERBOSITY", "full")
+RESULT_DELTA = os.environ.get("RESULT_DELTA", "0") == "1"
+# Unacknowledged results before the next one goes out whole
+DELTA_KEYFRAME_INTERVAL = int(os.environ.get("DELTA_KEYFRAME_INTERVAL", "30"))
+
+# Sent at every verbosity; errors keep their own fields
+SCORE_FIELDS = ("success", "score", "is_correct", "audio_feedback", "pose_reused",
+                "annotated_frame", "error", "feedback", "frame_id")
+
+
+class ResultEncoder:
+    """Verbosity and delta encoding of one session's analysis results."""
+
+    def __init__(self, verbosity: str = RESULT_VERBOSITY, delta: bool = RESULT_DELTA,
+                 keyframe_interval: int = DELTA_KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.results = 0
+        self.deltas = 0
+        self.configure(verbosity if verbosity in VERBOSITY_LEVELS else "full", delta)
+
+    def configure(self, verbosity: str, delta: bool):
+        """Change the encoding; the next result goes out whole."""
+        self.verbosity = verbosity
+        self.delta = delta
+        self.sequence = 0
+        # Results sent since the last ack, by sequence number
+        self._sent: Dict[int, Dict] = {}
+        self._base: Optional[int] = None
+        self._exercise: Optional[str] = None
+        self._rule_messages: List[str] = []
+
+    @property
+    def passthrough(self) -> bool:
+        """Whether results go out exactly as built."""
+        return self.verbosity == "full" and not self.delta
+
+    def ack(self, sequence: int) -> bool:
+        """Take a client's acknowledgement of a result as the base of later deltas."""
+        if sequence not in self._sent:
+            return False
+        self._base = sequence
+        self._sent = {seq: data for seq, data in self._sent.items() if seq >= sequence}
+        return True
+
+    def _shape(self, result: Dict) -> Dict:
+        if self.verbosity == "full" or not result.get("success"):
+            return result
+        data = {field: result[field] for field in SCORE_FIELDS if field in result}
+        if self.verbosity == "score":
+            return data
+
+        exercise = result.get("exercise_name")
+        if exercise != self._exercise:
+            self._exercise = exercise
+            self._rule_messages = []
+            data["exercise_name"] = exercise
+        messages = result.get("feedback_messages", [])
+        scores = result.get("individual_scores", {})
+        if len(messages) != len(scores) or len(messages) != len(self._rule_messages):
+            # No pose, or the rules changed: the whole list replaces the client's
+            data["feedback_messages"] = messages
+            data["individual_scores"] = scores
+        else:
+            # Feedback text is reused while a rule's outcome holds, so unchanged rules compare equal
+            changed = {}
+            for i, message in enumerate(messages):
+                if message != self._rule_messages[i]:
+                    changed[f"rule_{i}"] = {"message": message, "score": scores.get(f"rule_{i}")}
+            if changed:
+                data["changed_rules"] = changed
+        self._rule_messages = messages
+        return data
+
+    def encode(self, result: Dict) -> Dict:
+        """The message data to send the client for ``result``."""
+        data = self._shape(result)
+        self.results += 1
+        self.sequence += 1
+        if not self.delta:
+            return data
+        if len(self._sent) > self.keyframe_interval:
+            # Acks have fallen behind: start over from a whole result
+            self._sent.clear()
+            self._base = None
+        self._sent[self.sequence] = data
+
+        base = self._sent.get(self._base) if self._base is not None else None
+        if base is None:
+            return {**data, "seq": self.sequence}
+        self.deltas += 1
+        delta = {field: value for field, value in data.items() if base.get(field) != value}
+        removed = [field for field in base if field not in data]
+        if removed:
+            delta["removed"] = removed
+        delta["seq"] = self.sequence
+        delta["base"] = self._base
+        return delta
+
+    def stats(self) -> Dict:
+        return {
+            "verbosity": self.verbosity,
+            "delta": self.delta,
+            "results": self.results,
+            "deltas": self.deltas,
+            "unacknowledged": len(self._sent)
+        }
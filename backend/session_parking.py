@@ -0,0 +1,106 @@
+"""Keep a session alive for a while after its WebSocket drops.
+
+When a patient's network blips, the session's posture checker is parked
+rather than closed.  A checker holds a warm pose graph, the pose history,
+the feedback cooldown and the current exercise.  A reconnect to the same
+session id within ``SESSION_RESUME_TTL`` seconds picks all of it up again.
+A background task ends sessions whose grace period has run out.  At most
+``SESSION_RESUME_MAX`` sessions are parked at once, and parking one more
+ends the one that has waited longest, so parked memory stays bounded.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Seconds a disconnected session waits for its client to come back (0 ends it at once)
+SESSION_RESUME_TTL = float(os.environ.get("SESSION_RESUME_TTL", "30"))
+SESSION_RESUME_MAX = int(os.environ.get("SESSION_RESUME_MAX", "64"))
+
+
+class ParkedSessions:
+    """Disconnected sessions waiting to be resumed, and the task that ends them when they expire."""
+
+    def __init__(self, on_expire: Callable[[str], Awaitable[None]], ttl: float = SESSION_RESUME_TTL,
+                 max_parked: int = SESSION_RESUME_MAX):
+        # Ends a session that was not resumed in time
+        self.on_expire = on_expire
+        self.ttl = ttl
+        self.max_parked = max_parked
+        # Session id -> when it expires; insertion order is parking order
+        self.deadlines: Dict[str, float] = {}
+        self.counters = {"parked": 0, "resumed": 0, "expired": 0}
+        self._reaper = None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.deadlines
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_parked > 0
+
+    async def park(self, session_id: str):
+        """Hold a disconnected session until it is resumed or expires."""
+        if session_id in self.deadlines:
+            return
+        while len(self.deadlines) >= self.max_parked:
+            oldest = next(iter(self.deadlines))
+            logger.info(f"Too many parked sessions; ending {oldest} early")
+            await self._expire(oldest)
+        self.deadlines[session_id] = time.monotonic() + self.ttl
+        self.counters["parked"] += 1
+
+    def resume(self, session_id: str) -> bool:
+        """Take a session back from parking; False if it was not parked."""
+        if self.deadlines.pop(session_id, None) is None:
+            return False
+        self.counters["resumed"] += 1
+        return True
+
+    def discard(self, session_id: str):
+        """Forget a parked session that has been ended some other way."""
+        self.deadlines.pop(session_id, None)
+
+    async def _expire(self, session_id: str):
+        if self.deadlines.pop(session_id, None) is None:
+            return
+        self.counters["expired"] += 1
+        try:
+            await self.on_expire(session_id)
+        except Exception as e:
+            logger.error(f"Error ending expired session {session_id}: {e}")
+
+    async def _reap(self):
+        interval = max(0.5, min(5.0, self.ttl / 4))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for session_id in [sid for sid, deadline in self.deadlines.items() if deadline <= now]:
+                logger.info(f"Parked session {session_id} was not resumed; ending it")
+                await self._expire(session_id)
+
+    def start(self):
+        if self.enabled and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def close(self):
+        """Stop reaping; parked sessions are left to the caller's shutdown."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        self.deadlines.clear()
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "parked_now": len(self.deadlines),
+            "ttl_seconds": self.ttl,
+            "max_parked": self.max_parked
+        }
@@ -0,0 +1,139 @@
+"""Find connected sessions that are dead or idle and end them.
+
+A session used to be cleaned up only when receiving from its socket failed.
+A half-open TCP connection never fails, and a client that connects but never
+sends a frame never goes away, so either one kept a MediaPipe graph alive
+for as long as the server ran.  The reaper tracks when each connected
+session last sent anything and when it last sent a frame.  A session that
+has been quiet for ``HEARTBEAT_INTERVAL`` gets a ``heartbeat`` message, which
+clients answer with ``heartbeat_ack``.  A session that sends nothing for
+``HEARTBEAT_TIMEOUT`` is treated as unreachable.  One that sends no frames
+or landmarks for ``IDLE_FRAME_TIMEOUT`` is treated as idle.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", "15"))
+# No message at all for this long and the client is considered gone (0 disables)
+HEARTBEAT_TIMEOUT = float(os.environ.get("HEARTBEAT_TIMEOUT", "45"))
+# No frames or landmarks for this long and the session is closed (0 disables)
+IDLE_FRAME_TIMEOUT = float(os.environ.get("IDLE_FRAME_TIMEOUT", "300"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_bytes() -> Optional[int]:
+    """This process's resident memory, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Activity:
+    def __init__(self, now: float):
+        self.last_message = now
+        self.last_frame = now
+        self.last_heartbeat = now
+
+
+class SessionReaper:
+    """Heartbeats for quiet sessions, and the background task that ends dead or idle ones."""
+
+    def __init__(self, send_heartbeat: Callable[[str], None],
+                 on_stale: Callable[[str, str], Awaitable[None]],
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL, heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+                 idle_timeout: float = IDLE_FRAME_TIMEOUT):
+        self.send_heartbeat = send_heartbeat
+        # Ends a session, given why: "unresponsive" or "idle"
+        self.on_stale = on_stale
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, _Activity] = {}
+        self.counters = {"heartbeats_sent": 0, "reaped_unresponsive": 0, "reaped_idle": 0}
+        self.rss_released_bytes = 0
+        self._task = None
+
+    def track(self, session_id: str):
+        """Start watching a newly connected session."""
+        self.sessions[session_id] = _Activity(time.monotonic())
+
+    def forget(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+    def touch(self, session_id: str, frame: bool = False):
+        """Note a message from the client; ``frame`` if it was something to analyse."""
+        activity = self.sessions.get(session_id)
+        if activity is not None:
+            activity.last_message = time.monotonic()
+            if frame:
+                activity.last_frame = activity.last_message
+
+    def _stale_reason(self, activity: _Activity, now: float) -> Optional[str]:
+        if self.heartbeat_timeout > 0 and now - activity.last_message >= self.heartbeat_timeout:
+            return "unresponsive"
+        if self.idle_timeout > 0 and now - activity.last_frame >= self.idle_timeout:
+            return "idle"
+        return None
+
+    async def _reap(self, session_id: str, reason: str):
+        self.forget(session_id)
+        self.counters[f"reaped_{reason}"] += 1
+        before = resident_bytes()
+        try:
+            await self.on_stale(session_id, reason)
+        except Exception as e:
+            logger.error(f"Error ending {reason} session {session_id}: {e}")
+        after = resident_bytes()
+        if before is not None and after is not None and before > after:
+            self.rss_released_bytes += before - after
+
+    async def check(self):
+        """One pass: heartbeat quiet sessions and end stale ones."""
+        now = time.monotonic()
+        for session_id, activity in list(self.sessions.items()):
+            reason = self._stale_reason(activity, now)
+            if reason is not None:
+                logger.info(f"Ending {reason} session {session_id}")
+                await self._reap(session_id, reason)
+            elif self.heartbeat_interval > 0 and now - activity.last_message >= self.heartbeat_interval \
+                    and now - activity.last_heartbeat >= self.heartbeat_interval:
+                activity.last_heartbeat = now
+                self.counters["heartbeats_sent"] += 1
+                self.send_heartbeat(session_id)
+
+    async def _run(self):
+        periods = [p for p in (self.heartbeat_interval, self.heartbeat_timeout, self.idle_timeout) if p > 0]
+        interval = max(0.5, min(5.0, min(periods) / 3)) if periods else None
+        if interval is None:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "tracked_sessions": len(self.sessions),
+            "rss_released_bytes": self.rss_released_bytes,
+            "heartbeat_interval": self.heartbeat_interval,
+            "heartbeat_timeout": self.heartbeat_timeout,
+            "idle_frame_timeout": self.idle_timeout
+        }
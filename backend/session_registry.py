@@ -0,0 +1,282 @@
+"""Which worker owns which session, and how workers ask each other for things.
+
+A session's WebSocket, posture checker and send queue live in exactly one
+worker process.  The session bus records that ownership and carries requests
+between workers: a REST call for a session is routed to its owner, and
+cluster-wide operations (stats, broadcasts, exercise reloads) fan out to every
+live worker and merge the replies.
+
+``LocalSessionBus`` is the in-process default for a single worker.
+``RedisSessionBus`` shares the registry through a Redis-compatible server
+(Redis, Valkey, KeyDB) so several uvicorn workers or hosts can serve together:
+
+    SESSION_BUS_URL=redis://localhost:6379/0 uvicorn main:app --workers 4
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict], Awaitable[Dict]]
+
+
+class SessionBusError(Exception):
+    """Raised when another worker cannot be reached or does not answer in time."""
+
+
+class SessionBus(ABC):
+    """Session ownership plus request/reply between workers. In-process by default."""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._handlers: Dict[str, Handler] = {}
+
+    def handle(self, action: str, handler: Handler):
+        """Register the coroutine that serves ``action`` on this worker."""
+        self._handlers[action] = handler
+
+    async def _dispatch(self, action: str, payload: Dict) -> Dict:
+        handler = self._handlers.get(action)
+        if handler is None:
+            raise SessionBusError(f"No handler for '{action}'")
+        return await handler(payload)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def claim(self, session_id: str):
+        """Record this worker as the owner of a session."""
+
+    @abstractmethod
+    async def release(self, session_id: str):
+        """Forget a session, unless another worker has claimed it since."""
+
+    @abstractmethod
+    async def owner(self, session_id: str) -> Optional[str]:
+        """Return the id of the live worker that owns a session, if any."""
+
+    @abstractmethod
+    async def sessions(self) -> Dict[str, str]:
+        """Map every session on a live worker to its owner."""
+
+    @abstractmethod
+    async def call(self, worker_id: str, action: str, payload: Dict, timeout: float = 5.0) -> Dict:
+        """Run ``action`` on one worker and return its reply."""
+
+    @abstractmethod
+    async def call_all(self, action: str, payload: Dict, timeout: float = 5.0) -> Dict[str, Dict]:
+        """Run ``action`` on every live worker; workers that do not answer are left out."""
+
+
+class LocalSessionBus(SessionBus):
+    """Single-worker bus: the registry is a dict and every call is local."""
+
+    def __init__(self):
+        super().__init__()
+        self._sessions: Dict[str, str] = {}
+
+    async def claim(self, session_id: str):
+        self._sessions[session_id] = self.worker_id
+
+    async def release(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    async def owner(self, session_id: str) -> Optional[str]:
+        return self._sessions.get(session_id)
+
+    async def sessions(self) -> Dict[str, str]:
+        return dict(self._sessions)
+
+    async def call(self, worker_id: str, action: str, payload: Dict, timeout: float = 5.0) -> Dict:
+        if worker_id != self.worker_id:
+            raise SessionBusError(f"Unknown worker {worker_id}")
+        return await self._dispatch(action, payload)
+
+    async def call_all(self, action: str, payload: Dict, timeout: float = 5.0) -> Dict[str, Dict]:
+        return {self.worker_id: await self._dispatch(action, payload)}
+
+
+# Delete a session's owner entry only if it still names the releasing worker
+_RELEASE_SCRIPT = """
+if redis.call('hget', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('hdel', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class RedisSessionBus(SessionBus):
+    """Registry in Redis hashes; requests and replies over pub/sub channels."""
+
+    def __init__(self, url: str, prefix: str = "physio", heartbeat_interval: float = 5.0):
+        super().__init__()
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BUS_URL needs the 'redis' package (pip install 'redis>=5')") from e
+
+        self._client = aioredis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.heartbeat_interval = heartbeat_interval
+        # A worker that misses three heartbeats is treated as gone
+        self.worker_ttl = heartbeat_interval * 3
+        self._sessions_key = f"{prefix}:sessions"
+        self._workers_key = f"{prefix}:workers"
+        self._all_channel = f"{prefix}:all"
+        self._pending: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._pubsub = None
+        self._release = self._client.register_script(_RELEASE_SCRIPT)
+
+    def _channel(self, worker_id: str) -> str:
+        return f"{self.prefix}:worker:{worker_id}"
+
+    async def start(self):
+        await self._heartbeat_once()
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self._channel(self.worker_id), self._all_channel)
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._heartbeat())]
+        logger.info(f"Worker {self.worker_id} joined the session bus")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        try:
+            # Drop every session this worker still owns, then leave
+            owned = [sid for sid, owner in (await self._client.hgetall(self._sessions_key)).items()
+                     if owner == self.worker_id]
+            if owned:
+                await self._client.hdel(self._sessions_key, *owned)
+            await self._client.hdel(self._workers_key, self.worker_id)
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+        except Exception as e:
+            logger.warning(f"Error leaving the session bus: {e}")
+        await self._client.aclose()
+
+    async def _heartbeat_once(self):
+        await self._client.hset(self._workers_key, self.worker_id, time.time())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat_once()
+            except Exception as e:
+                logger.warning(f"Session bus heartbeat failed: {e}")
+
+    async def _live_workers(self) -> List[str]:
+        cutoff = time.time() - self.worker_ttl
+        workers = await self._client.hgetall(self._workers_key)
+        return [worker for worker, seen in workers.items() if float(seen) >= cutoff]
+
+    async def claim(self, session_id: str):
+        await self._client.hset(self._sessions_key, session_id, self.worker_id)
+
+    async def release(self, session_id: str):
+        await self._release(keys=[self._sessions_key], args=[session_id, self.worker_id])
+
+    async def owner(self, session_id: str) -> Optional[str]:
+        worker = await self._client.hget(self._sessions_key, session_id)
+        if worker is None or worker == self.worker_id:
+            return worker
+        return worker if worker in await self._live_workers() else None
+
+    async def sessions(self) -> Dict[str, str]:
+        live = set(await self._live_workers())
+        return {sid: worker for sid, worker in (await self._client.hgetall(self._sessions_key)).items()
+                if worker in live}
+
+    async def call(self, worker_id: str, action: str, payload: Dict, timeout: float = 5.0) -> Dict:
+        if worker_id == self.worker_id:
+            return await self._dispatch(action, payload)
+        replies, errors = await self._request(self._channel(worker_id), [worker_id], action, payload, timeout)
+        if worker_id in errors:
+            raise SessionBusError(f"Worker {worker_id} failed '{action}': {errors[worker_id]}")
+        if worker_id not in replies:
+            raise SessionBusError(f"Worker {worker_id} did not answer '{action}' within {timeout}s")
+        return replies[worker_id]
+
+    async def call_all(self, action: str, payload: Dict, timeout: float = 5.0) -> Dict[str, Dict]:
+        others = [worker for worker in await self._live_workers() if worker != self.worker_id]
+        local = asyncio.create_task(self._dispatch(action, payload))
+        replies = {}
+        if others:
+            replies, _ = await self._request(self._all_channel, others, action, payload, timeout)
+        replies[self.worker_id] = await local
+        return replies
+
+    async def _request(self, channel: str, expected: List[str], action: str,
+                       payload: Dict, timeout: float) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """Publish one request; collect replies and errors from ``expected`` workers until the timeout."""
+        request_id = uuid.uuid4().hex
+        waiting = {"expected": set(expected), "replies": {}, "errors": {}, "done": asyncio.Event()}
+        self._pending[request_id] = waiting
+        try:
+            await self._client.publish(channel, json.dumps({
+                "kind": "request", "id": request_id, "reply_to": self.worker_id,
+                "action": action, "payload": payload
+            }))
+            try:
+                await asyncio.wait_for(waiting["done"].wait(), timeout)
+            except asyncio.TimeoutError:
+                missing = waiting["expected"] - set(waiting["replies"]) - set(waiting["errors"])
+                logger.warning(f"No '{action}' reply from {sorted(missing)} within {timeout}s")
+            return waiting["replies"], waiting["errors"]
+        finally:
+            del self._pending[request_id]
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                envelope = json.loads(message["data"])
+                if envelope["kind"] == "reply":
+                    self._on_reply(envelope)
+                elif envelope["kind"] == "request" and envelope["reply_to"] != self.worker_id:
+                    asyncio.create_task(self._serve(envelope))
+            except (TypeError, ValueError, KeyError) as e:
+                # One bad message must not stop this worker hearing the rest
+                logger.warning(f"Ignoring a malformed session bus message on {message.get('channel')}: {e!r}")
+
+    def _on_reply(self, envelope: Dict):
+        waiting = self._pending.get(envelope["id"])
+        if waiting is None:
+            return
+        if envelope.get("error"):
+            logger.warning(f"Worker {envelope['worker']} failed a request: {envelope['error']}")
+            waiting["errors"][envelope["worker"]] = envelope["error"]
+        else:
+            waiting["replies"][envelope["worker"]] = envelope["result"]
+        if waiting["expected"] <= set(waiting["replies"]) | set(waiting["errors"]):
+            waiting["done"].set()
+
+    async def _serve(self, envelope: Dict):
+        reply = {"kind": "reply", "id": envelope["id"], "worker": self.worker_id}
+        try:
+            reply["result"] = await self._dispatch(envelope["action"], envelope["payload"])
+        except Exception as e:
+            reply["error"] = str(e)
+        await self._client.publish(self._channel(envelope["reply_to"]), json.dumps(reply))
+
+
+def create_session_bus(url: Optional[str] = None) -> SessionBus:
+    """Build the bus named by ``url`` (``SESSION_BUS_URL``); in-process when empty."""
+    url = url if url is not None else os.environ.get("SESSION_BUS_URL", "")
+    if not url:
+        return LocalSessionBus()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionBus(url, prefix=os.environ.get("SESSION_BUS_PREFIX", "physio"))
+    raise ValueError(f"Unsupported SESSION_BUS_URL scheme: {url}")
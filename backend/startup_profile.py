@@ -0,0 +1,86 @@
+"""Start-up import timing for the API server.
+
+Imports a module in a fresh interpreter under ``python -X importtime`` and
+reports where the time went, grouped by top-level package.  Run it from the
+backend directory after changing imports to check cold start:
+
+    python startup_profile.py                 # profiles "import main"
+    python startup_profile.py --top 20 --json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# "import time:  self [us] | cumulative | imported package" lines from -X importtime
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(module: str = "main") -> Dict:
+    """Import ``module`` in a subprocess and return its import-time breakdown."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    packages: Dict[str, Dict] = defaultdict(lambda: {"self_ms": 0.0, "modules": 0})
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        package = packages[name.split(".")[0]]
+        package["self_ms"] += int(self_us) / 1000
+        package["modules"] += 1
+        if len(indent) == 1:
+            # Imported directly by the interpreter (or by the profiled module itself)
+            total_us += int(cumulative_us)
+
+    ranked: List[Dict] = sorted(
+        ({"package": name, "self_ms": round(stats["self_ms"], 1), "modules": stats["modules"]}
+         for name, stats in packages.items()),
+        key=lambda entry: entry["self_ms"],
+        reverse=True
+    )
+    return {
+        "module": module,
+        "import_ms": round(total_us / 1000, 1),
+        "interpreter_wall_ms": round(wall_ms, 1),
+        "packages": ranked
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where server start-up import time goes")
+    parser.add_argument("module", nargs="?", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    report = profile_imports(args.module)
+    if args.json:
+        report["packages"] = report["packages"][:args.top]
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import {report['module']}: {report['import_ms']:.1f} ms "
+          f"(interpreter wall time {report['interpreter_wall_ms']:.1f} ms)")
+    print(f"{'package':<32}{'self ms':>10}{'modules':>10}")
+    for entry in report["packages"][:args.top]:
+        print(f"{entry['package']:<32}{entry['self_ms']:>10.1f}{entry['modules']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Backend modules import each other by bare name, as they do when the server runs."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
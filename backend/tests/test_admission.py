@@ -0,0 +1,90 @@
+import pytest
+
+from admission import AdmissionController
+from flow_control import FlowController
+
+
+class FixedCpu:
+    def __init__(self, utilisation=None):
+        self.utilisation = utilisation
+
+    def sample(self):
+        return self.utilisation
+
+
+@pytest.fixture
+def flow():
+    # 800 usable ms a second: room for ten sessions at 2 fps and 40 ms a frame
+    return FlowController(capacity_ms=1000, max_fps=10, min_fps=2, utilisation=0.8)
+
+
+@pytest.fixture
+def admission(flow):
+    controller = AdmissionController(flow, enabled=True, max_cpu=0.95, retry_after=15, default_frame_ms=40)
+    controller.cpu = FixedCpu()
+    return controller
+
+
+def measured(flow, session_id, fps, processing_ms):
+    session = flow.sessions[session_id]
+    session.fps = fps
+    session.processing_ms = processing_ms
+
+
+def test_burst_is_admitted_up_to_capacity(admission, flow):
+    decisions = [admission.admit(f"s{i}") for i in range(20)]
+    assert sum(d.admitted for d in decisions) == 10
+    assert all(d.admitted for d in decisions[:10])
+    refused = decisions[10]
+    assert refused.retry_after == 15
+    assert refused.reason == "inference capacity is fully committed"
+    assert len(flow.sessions) == 10
+    assert admission.counters == {"admitted_standard": 10, "admitted_reduced": 0, "refused": 10}
+
+
+def test_release_gives_the_place_back(admission):
+    for i in range(10):
+        admission.admit(f"s{i}")
+    assert not admission.assess().admitted
+    admission.release("s3")
+    assert admission.admit("late").admitted
+
+
+def test_busy_server_admits_on_the_reduced_tier(admission, flow):
+    admission.admit("a")
+    # Using 500 of 800 ms: another full-rate session would not fit, a minimum-rate one would
+    measured(flow, "a", fps=10, processing_ms=50)
+    decision = admission.admit("b")
+    assert decision.admitted and decision.tier == "reduced"
+    assert flow.sessions["b"].tier == "reduced"
+
+
+def test_measured_frame_cost_is_used(admission, flow):
+    admission.admit("a")
+    measured(flow, "a", fps=2, processing_ms=200)
+    # 400 reserved for "a", and a new one costs another 2 x 200
+    assert admission.assess().admitted
+    admission.admit("b")
+    assert not admission.assess().admitted
+
+
+def test_saturated_cpu_refuses(admission):
+    admission.cpu = FixedCpu(0.99)
+    decision = admission.admit("a")
+    assert not decision.admitted
+    assert decision.reason == "CPU is saturated"
+
+
+def test_disabled_admits_everyone(flow):
+    admission = AdmissionController(flow, enabled=False)
+    assert all(admission.admit(f"s{i}").admitted for i in range(50))
+
+
+def test_capacity_report(admission):
+    for i in range(4):
+        admission.admit(f"s{i}")
+    capacity = admission.capacity()
+    assert capacity["accepting_sessions"]
+    assert capacity["next_session_tier"] == "standard"
+    assert capacity["estimated_free_sessions"] == 6
+    assert capacity["frame_ms"] == 40
@@ -0,0 +1,118 @@
+import pytest
+
+import flow_control
+from flow_control import FRAME_LEVELS, FlowController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(flow_control, "time", fake)
+    return fake
+
+
+def send_frames(flow, clock, session_id, fps, processing_ms, seconds):
+    """Record ``seconds`` of frames at ``fps``; return every advice update sent."""
+    updates = []
+    for _ in range(int(fps * seconds)):
+        clock.now += 1.0 / fps
+        advice = flow.record(session_id, processing_ms)
+        if advice is not None:
+            updates.append(advice)
+    return updates
+
+
+def test_new_sessions_open_at_their_tier():
+    flow = FlowController(capacity_ms=1000, max_fps=10)
+    standard = flow.start_session("a")
+    assert standard["target_fps"] == 10
+    assert (standard["max_width"], standard["max_height"]) == FRAME_LEVELS[0][:2]
+
+    reduced = flow.start_session("b", "reduced")
+    assert reduced["target_fps"] == min(10, flow_control.FLOW_REDUCED_MAX_FPS)
+    assert reduced["max_width"] == FRAME_LEVELS[flow_control.FLOW_REDUCED_LEVEL][0]
+
+
+def test_first_frame_is_not_measured(clock):
+    flow = FlowController(capacity_ms=1000)
+    flow.start_session("a")
+    assert flow.record("a", 500.0) is None
+    assert flow.typical_frame_ms() is None
+
+
+def test_overloaded_session_is_slowed_to_its_share(clock):
+    flow = FlowController(capacity_ms=1000, max_fps=10, min_fps=2, utilisation=0.8, update_interval=1)
+    flow.start_session("a")
+    updates = send_frames(flow, clock, "a", fps=10, processing_ms=100, seconds=5)
+    # 800 usable ms at 100 ms a frame
+    assert updates and updates[-1]["target_fps"] == 8
+    assert flow.budget_ms("a") == pytest.approx(800, rel=0.05)
+
+
+def test_frames_shrink_when_even_min_fps_does_not_fit(clock):
+    flow = FlowController(capacity_ms=1000, max_fps=10, min_fps=2, utilisation=0.8)
+    flow.start_session("a")
+    updates = send_frames(flow, clock, "a", fps=2, processing_ms=600, seconds=5)
+    assert updates[-1]["max_width"] < FRAME_LEVELS[0][0]
+    assert updates[-1]["target_fps"] == 2
+
+
+def test_updates_are_rate_limited(clock):
+    flow = FlowController(capacity_ms=1000, update_interval=10)
+    flow.start_session("a")
+    send_frames(flow, clock, "a", fps=10, processing_ms=100, seconds=1)
+    sent = flow.updates_sent
+    send_frames(flow, clock, "a", fps=10, processing_ms=300, seconds=3)
+    assert flow.updates_sent - sent <= 1
+
+
+def test_capacity_is_shared_between_sessions(clock):
+    flow = FlowController(capacity_ms=1000, max_fps=10, min_fps=1, utilisation=0.8)
+    for session_id in ("a", "b"):
+        flow.start_session(session_id)
+    for _ in range(50):
+        clock.now += 0.1
+        flow.record("a", 100)
+        flow.record("b", 100)
+    assert flow.budget_ms("a") == pytest.approx(400, rel=0.05)
+    assert flow.budget_ms("b") == pytest.approx(400, rel=0.05)
+
+
+def test_suspended_session_holds_no_capacity(clock):
+    flow = FlowController(capacity_ms=1000)
+    flow.start_session("a")
+    send_frames(flow, clock, "a", fps=5, processing_ms=50, seconds=3)
+    demand = flow.demand_ms()
+    assert demand > 0
+
+    flow.suspend("a")
+    assert flow.demand_ms() == 0
+    assert flow.reserved_ms(40) == 0
+    assert flow.record("a", 50) is None
+    assert flow.session_stats("a")["suspended"]
+    assert flow.stats()["suspended_sessions"] == 1
+
+    clock.now += 60
+    assert flow.resume("a")
+    assert not flow.resume("a")
+    # The time parked does not count as a slow frame rate
+    flow.record("a", 50)
+    assert flow.sessions["a"].fps == pytest.approx(demand / 50, rel=0.01)
+    assert flow.session_stats("a")["processing_ms"] == pytest.approx(50)
+
+
+def test_end_session_forgets_suspended_sessions():
+    flow = FlowController(capacity_ms=1000)
+    flow.start_session("a")
+    flow.suspend("a")
+    flow.end_session("a")
+    assert flow.session_stats("a") is None
+    assert not flow.resume("a")
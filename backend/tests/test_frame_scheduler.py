@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+
+import frame_scheduler
+from frame_scheduler import FrameDropped, FrameScheduler
+
+
+class FakeClock:
+    """Stands in for the scheduler's ``time``; analysis advances it by the frame's cost."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(frame_scheduler, "time", fake)
+    return fake
+
+
+async def settle(scheduler):
+    for _ in range(1000):
+        if not scheduler.running and not any(queue.jobs for queue in scheduler.sessions.values()):
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("frames were still queued")
+
+
+def serve(scheduler, frames, clock=None):
+    """Queue ``(session_id, cost)`` frames, run them all and return the sessions in service order."""
+    order = []
+
+    async def main():
+        for session_id, cost in frames:
+            async def run(session_id=session_id, cost=cost):
+                order.append(session_id)
+                if clock is not None:
+                    clock.now += cost
+                await asyncio.sleep(0)
+            scheduler.submit(session_id, run, lambda: None)
+            if clock is not None:
+                # Frames arrive one after another
+                clock.now += 0.001
+        scheduler.start()
+        await settle(scheduler)
+        await scheduler.close()
+
+    asyncio.run(main())
+    return order
+
+
+def test_fair_mode_balances_analysis_time(clock):
+    scheduler = FrameScheduler("fair", depth=20, min_fps=0)
+    order = serve(scheduler, [("slow", 3.0)] * 10 + [("fast", 1.0)] * 20, clock)
+
+    charged = {"slow": 0.0, "fast": 0.0}
+    for session_id in order[:16]:
+        charged[session_id] += 3.0 if session_id == "slow" else 1.0
+        # Neither session ever gets more than one frame's worth ahead
+        assert abs(charged["slow"] - charged["fast"]) <= 3.0
+    assert order[:16].count("fast") == 12
+
+
+def test_round_robin_alternates(clock):
+    scheduler = FrameScheduler("round_robin", depth=5, min_fps=0)
+    order = serve(scheduler, [("a", 1.0)] * 3 + [("b", 5.0)] * 3, clock)
+    assert order == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_fifo_keeps_arrival_order(clock):
+    scheduler = FrameScheduler("fifo", depth=5, min_fps=0)
+    frames = [("a", 1.0), ("a", 1.0), ("b", 1.0), ("a", 1.0), ("b", 1.0)]
+    assert serve(scheduler, frames, clock) == ["a", "a", "b", "a", "b"]
+
+
+def test_supervised_sessions_go_first(clock):
+    scheduler = FrameScheduler("fair", depth=5, min_fps=0)
+    scheduler.set_priority("b", "supervised")
+    order = serve(scheduler, [("a", 1.0)] * 2 + [("b", 1.0)] * 2, clock)
+    assert order == ["b", "b", "a", "a"]
+    assert not scheduler.set_priority("b", "urgent")
+
+
+def test_overdue_session_goes_ahead_of_priority(clock):
+    scheduler = FrameScheduler("fair", depth=10, min_fps=1.0)
+    scheduler.set_priority("busy", "supervised")
+    order = serve(scheduler, [("busy", 0.4)] * 6 + [("quiet", 0.4)], clock)
+    # Due a frame once a second, "quiet" is served before "busy" runs out of frames
+    assert order.index("quiet") < 5
+    assert scheduler.counters["ahead_for_min_fps"] == 1
+
+
+def test_newer_frame_supersedes_the_oldest(clock):
+    scheduler = FrameScheduler("fair", depth=2, min_fps=0)
+    dropped = []
+    ran = []
+
+    async def main():
+        for frame in range(3):
+            async def run(frame=frame):
+                ran.append(frame)
+            scheduler.submit("a", run, lambda frame=frame: dropped.append(frame))
+        scheduler.start()
+        await settle(scheduler)
+        await scheduler.close()
+
+    asyncio.run(main())
+    assert dropped == [0]
+    assert ran == [1, 2]
+    assert scheduler.session_stats("a")["superseded"] == 1
+
+
+def test_run_returns_the_work_result(clock):
+    scheduler = FrameScheduler("fair", min_fps=0)
+
+    async def main():
+        scheduler.start()
+
+        async def work():
+            return 42
+        try:
+            return await scheduler.run("a", work)
+        finally:
+            await scheduler.close()
+
+    assert asyncio.run(main()) == 42
+
+
+def test_run_raises_when_superseded(clock):
+    scheduler = FrameScheduler("fair", depth=1, min_fps=0)
+
+    async def main():
+        async def work():
+            return "analysed"
+        first = asyncio.ensure_future(scheduler.run("a", work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scheduler.run("a", work))
+        await asyncio.sleep(0)
+        scheduler.start()
+        try:
+            with pytest.raises(FrameDropped):
+                await first
+            assert await second == "analysed"
+        finally:
+            await scheduler.close()
+
+    asyncio.run(main())
+
+
+def test_clear_wakes_awaited_frames_only(clock):
+    scheduler = FrameScheduler("fair", depth=5, min_fps=0)
+    answered = []
+
+    async def main():
+        async def work():
+            return "analysed"
+        waiting = asyncio.ensure_future(scheduler.run("a", work))
+        await asyncio.sleep(0)
+
+        async def run():
+            pass
+        scheduler.submit("a", run, lambda: answered.append("a"))
+        await scheduler.clear("a")
+        with pytest.raises(FrameDropped):
+            await waiting
+
+    asyncio.run(main())
+    # A disconnected client's plain frames are not answered
+    assert answered == []
+
+
+def test_clear_waits_for_the_running_frame(clock):
+    scheduler = FrameScheduler("fair", min_fps=0)
+    events = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def run():
+            events.append("started")
+            await release.wait()
+            events.append("finished")
+        scheduler.submit("a", run, lambda: None)
+        scheduler.start()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        clearing = asyncio.ensure_future(scheduler.end_session("a"))
+        await asyncio.sleep(0)
+        assert not clearing.done()
+        release.set()
+        await clearing
+        events.append("cleared")
+        await scheduler.close()
+
+    asyncio.run(main())
+    assert events == ["started", "finished", "cleared"]
+    assert "a" not in scheduler.sessions
@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+from report_reader.keyword_matcher import KeywordMatcher
+from report_reader.report_parser import (CONDITION_EXERCISE_MAPPING, FUNCTIONAL_INDICATORS, MEDICAL_KEYWORDS,
+                                         MedicalExerciseRecommendationSystem)
+
+REPORTS = [
+    "Patient Age: 67. Diagnosis: stroke with left hemiparesis. Moderate assistance required for transfers. "
+    "Shoulder pain on abduction, limited range of motion at the shoulder. Gait is unsteady; balance poor.",
+    "AGE 45\nKnee pain after surgery, no weight bearing on the left leg for six weeks. Mild swelling. "
+    "Patient is independent with mobility aids. Hip and knee range of motion to be monitored.",
+    "Spinal cord injury (paraplegia). Severe leg weakness, arm weakness is slight. "
+    "Maximum assistance for transfers. Posture and coordination exercises recommended. Neck stiffness.",
+    "No relevant findings.",
+]
+
+
+def old_extract_medical_features(medical_text):
+    """The substring matcher this module replaced, kept as the reference."""
+    medical_text = medical_text.lower()
+    age_match = re.search(r'age[:\s]+(\d+)', medical_text)
+    age = int(age_match.group(1)) if age_match else 50
+
+    severity = 3
+    for keyword, score in {'severe': 1, 'moderate': 2, 'mild': 3, 'slight': 4}.items():
+        if keyword in medical_text:
+            severity = score
+            break
+
+    recommended_exercises = set()
+    condition_scores = {}
+    for condition, exercises in CONDITION_EXERCISE_MAPPING.items():
+        if condition in medical_text:
+            condition_scores[condition] = medical_text.count(condition)
+            recommended_exercises.update(exercises)
+
+    limitations = []
+    if 'no weight bearing' in medical_text:
+        limitations.append('no_weight_bearing')
+    if 'limited range' in medical_text or 'restricted movement' in medical_text:
+        limitations.append('limited_range')
+    if 'pain' in medical_text:
+        limitations.append('pain_present')
+
+    functional_level = 3
+    for indicator, score in FUNCTIONAL_INDICATORS.items():
+        if indicator in medical_text:
+            functional_level = score
+            break
+
+    return {
+        'age': age,
+        'severity': severity,
+        'functional_level': functional_level,
+        'recommended_exercises': sorted(recommended_exercises),
+        'condition_scores': condition_scores,
+        'limitations': limitations,
+        'medical_text_length': len(medical_text),
+        'medical_keywords_count': sum(condition_scores.values())
+    }
+
+
+@pytest.fixture(scope="module")
+def recommender():
+    return MedicalExerciseRecommendationSystem()
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_features_match_old_matcher_on_whole_words(recommender, report):
+    features = recommender.extract_medical_features(report)
+    features['recommended_exercises'] = sorted(features['recommended_exercises'])
+    assert features == old_extract_medical_features(report)
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_pages_count_like_the_joined_text(report):
+    words = report.split(" ")
+    for cut in range(1, len(words)):
+        stream = MEDICAL_KEYWORDS.stream()
+        stream.feed(" ".join(words[:cut]))
+        stream.feed(" ".join(words[cut:]))
+        assert stream.finish() == MEDICAL_KEYWORDS.count(report)
+
+
+def test_phrase_split_across_pages_still_matches():
+    stream = MEDICAL_KEYWORDS.stream()
+    stream.feed("limited range of")
+    stream.feed("motion noted")
+    counts = stream.finish()
+    assert counts['range of motion'] == 1
+    assert counts['limited range'] == 1
+
+
+def test_only_whole_words_match():
+    counts = MEDICAL_KEYWORDS.count("Relationships, knees and shoulders; dependently")
+    assert counts['hip'] == 0
+    assert counts['knee'] == 0
+    assert counts['shoulder'] == 0
+    assert counts['dependent'] == 0
+
+
+def test_prefix_phrases_are_credited():
+    matcher = KeywordMatcher(["moderate", "moderate assistance", "assistance"])
+    counts = matcher.count("Moderate  assistance, then moderate pain")
+    assert counts == {"moderate": 2, "moderate assistance": 1, "assistance": 1}
+
+
+def test_age_capture_spans_pages(recommender):
+    features = recommender.extract_medical_features_from_pages(["Patient age:", " 71 years"])
+    assert features['age'] == 71
@@ -0,0 +1,97 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from report_reader.model_store import (FlatForest, MappedForestClassifier, MappedForestRegressor,
+                                       artifact_signature, export_models, load_mapped_models)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(300, 6))
+    labels = (X[:, 0] + X[:, 1] > 0).astype(int) + (X[:, 2] > 1).astype(int)
+    target = 3 * X[:, 3] - X[:, 4] ** 2 + rng.normal(scale=0.1, size=300)
+    return X, labels, target
+
+
+@pytest.fixture(scope="module")
+def classifier(data):
+    X, labels, _ = data
+    return RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, labels)
+
+
+@pytest.fixture(scope="module")
+def regressor(data):
+    X, _, target = data
+    return RandomForestRegressor(n_estimators=10, random_state=0).fit(X, target)
+
+
+def test_classifier_matches_predict_proba(data, classifier):
+    X = np.random.default_rng(1).normal(size=(200, 6))
+    arrays, max_depth = FlatForest.flatten(classifier, normalize=True)
+    flat = MappedForestClassifier(arrays, max_depth, classifier.classes_.tolist())
+    np.testing.assert_allclose(flat.predict_proba(X), classifier.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(flat.predict(X), classifier.predict(X))
+
+
+def test_regressor_matches_predict(regressor):
+    X = np.random.default_rng(2).normal(size=(200, 6))
+    arrays, max_depth = FlatForest.flatten(regressor, normalize=False)
+    flat = MappedForestRegressor(arrays, max_depth)
+    np.testing.assert_allclose(flat.predict(X), regressor.predict(X), rtol=1e-12)
+
+
+def test_apply_matches_sklearn_leaves(data, classifier):
+    X = data[0][:50]
+    arrays, max_depth = FlatForest.flatten(classifier, normalize=True)
+    leaves = FlatForest(arrays, max_depth).apply(X) - arrays['roots']
+    np.testing.assert_array_equal(leaves, classifier.apply(X))
+
+
+def test_thresholds_compare_in_float32(classifier):
+    # Features sitting exactly on a float32-rounded threshold must take sklearn's branch
+    tree = classifier.estimators_[0].tree_
+    internal = tree.children_left >= 0
+    X = np.zeros((int(internal.sum()), 6))
+    X[np.arange(len(X)), tree.feature[internal]] = tree.threshold[internal]
+    arrays, max_depth = FlatForest.flatten(classifier, normalize=True)
+    flat = MappedForestClassifier(arrays, max_depth, classifier.classes_.tolist())
+    np.testing.assert_allclose(flat.predict_proba(X), classifier.predict_proba(X), atol=1e-12)
+
+
+def test_export_round_trip(tmp_path, data, classifier, regressor):
+    X = data[0]
+    recommender = SimpleNamespace(
+        recommendation_model=classifier,
+        parameter_models={'sets': regressor},
+        scaler=StandardScaler().fit(X),
+        label_encoders={'condition': LabelEncoder().fit(['knee', 'hip', 'stroke'])},
+        available_exercises={'SQUAT': {}}
+    )
+    directory = str(tmp_path / "artifacts")
+    version = export_models(recommender, directory)
+    signature = artifact_signature(directory)
+    models = load_mapped_models(directory)
+
+    assert models['version'] == version
+    np.testing.assert_allclose(models['recommendation_model'].predict_proba(X[:20]),
+                               classifier.predict_proba(X[:20]), atol=1e-12)
+    np.testing.assert_allclose(models['parameter_models']['sets'].predict(X[:20]), regressor.predict(X[:20]))
+    np.testing.assert_allclose(models['scaler'].transform(X[:5]), recommender.scaler.transform(X[:5]))
+    assert models['label_encoders']['condition'].transform(['stroke']).tolist() == [2]
+    with pytest.raises(ValueError):
+        models['label_encoders']['condition'].transform(['neck'])
+
+    # Republishing swaps the directory, which the signature notices
+    assert export_models(recommender, directory) == version
+    assert artifact_signature(directory) != signature
+    assert not [name for name in os.listdir(tmp_path) if name != "artifacts"]
+
+
+def test_signature_of_missing_artifacts(tmp_path):
+    assert artifact_signature(str(tmp_path / "missing")) is None
@@ -0,0 +1,117 @@
+import json
+import os
+
+from report_cache import ReportResultCache
+
+
+def entry(size=100):
+    return {"recommended_exercises": ["x" * size]}
+
+
+def payload_size(result):
+    return len(json.dumps(result).encode("utf-8"))
+
+
+def test_keys_carry_model_and_catalog_versions():
+    key = ReportResultCache.make_key("abc", "m1", "c1")
+    assert key.startswith(ReportResultCache.version_prefix("m1", "c1"))
+    assert key != ReportResultCache.make_key("abc", "m2", "c1")
+    assert key != ReportResultCache.make_key("abc", "m1", "c2")
+
+
+def test_memory_lru_evicts_least_recently_used():
+    size = payload_size(entry())
+    cache = ReportResultCache(max_bytes=size * 2)
+    cache.put("a", entry())
+    cache.put("b", entry())
+    assert cache.get("a") == entry()
+    cache.put("c", entry())
+
+    assert cache.get("b") is None
+    assert cache.get("a") == entry()
+    assert cache.get("c") == entry()
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == size * 2
+    assert stats["memory_hits"] == 3 and stats["misses"] == 1
+
+
+def test_results_larger_than_memory_are_not_kept():
+    cache = ReportResultCache(max_bytes=10)
+    cache.put("a", entry())
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_results_are_copies():
+    cache = ReportResultCache()
+    cache.put("a", entry())
+    cache.get("a")["recommended_exercises"].clear()
+    assert cache.get("a") == entry()
+
+
+def test_disk_round_trip(tmp_path):
+    ReportResultCache(disk_dir=str(tmp_path)).put("a", entry())
+
+    restarted = ReportResultCache(disk_dir=str(tmp_path))
+    assert restarted.get("a") == entry()
+    assert restarted.get("a") == entry()
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+    assert stats["disk_bytes"] == payload_size(entry())
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_corrupt_disk_entry_is_a_miss_and_removed(tmp_path):
+    cache = ReportResultCache(disk_dir=str(tmp_path))
+    cache.put("a", entry())
+    path = tmp_path / "a.json"
+    path.write_bytes(path.read_bytes()[:20])
+
+    restarted = ReportResultCache(disk_dir=str(tmp_path))
+    assert restarted.get("a") is None
+    assert not path.exists()
+    assert restarted.stats()["corrupt"] == 1
+    assert restarted.stats()["misses"] == 1
+
+    (tmp_path / "b.json").write_bytes(b"\xff\xfe not json")
+    assert restarted.get("b") is None
+
+
+def test_disk_tier_keeps_the_most_recently_used(tmp_path):
+    size = payload_size(entry())
+    cache = ReportResultCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=size * 2)
+    cache.put("a", entry())
+    cache.put("b", entry())
+    os.utime(tmp_path / "a.json", ns=(1, 1))
+    os.utime(tmp_path / "b.json", ns=(2, 2))
+    # A disk hit makes "a" the most recently used
+    assert cache.get("a") == entry()
+    cache.put("c", entry())
+
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.stats()["disk_bytes"] == size * 2
+
+
+def test_invalidate_keeps_current_version(tmp_path):
+    cache = ReportResultCache(disk_dir=str(tmp_path))
+    old = ReportResultCache.make_key("abc", "m1", "c1")
+    new = ReportResultCache.make_key("abc", "m2", "c1")
+    cache.put(old, entry())
+    cache.put(new, entry())
+
+    # Held in memory and on disk, the old result is one removal
+    assert cache.invalidate(ReportResultCache.version_prefix("m2", "c1")) == 1
+    assert cache.get(old) is None
+    assert cache.get(new) == entry()
+    assert os.listdir(tmp_path) == [f"{new}.json"]
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_invalidate_counts_disk_only_entries(tmp_path):
+    ReportResultCache(disk_dir=str(tmp_path)).put("a", entry())
+    cache = ReportResultCache(disk_dir=str(tmp_path))
+    cache.put("b", entry())
+    assert cache.invalidate() == 2
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["disk_bytes"] == 0
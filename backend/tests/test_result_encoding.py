@@ -0,0 +1,122 @@
+from result_encoding import ResultEncoder
+
+
+def result(score, messages=("Good", "Raise arm"), exercise="ARM_STRETCH", landmarks=None):
+    return {
+        "success": True,
+        "score": score,
+        "is_correct": score > 50,
+        "exercise_name": exercise,
+        "feedback_messages": list(messages),
+        "individual_scores": {f"rule_{i}": score for i in range(len(messages))},
+        "landmarks": landmarks if landmarks is not None else [[0.5, 0.5, 0.0]],
+    }
+
+
+def rebuild(copies, message):
+    """What a client holds after applying ``message`` to its copies of earlier results."""
+    data = dict(message)
+    sequence = data.pop("seq")
+    base = data.pop("base", None)
+    removed = data.pop("removed", [])
+    whole = dict(copies[base]) if base is not None else {}
+    for field in removed:
+        whole.pop(field, None)
+    whole.update(data)
+    copies[sequence] = whole
+    return whole
+
+
+def test_full_without_delta_is_passthrough():
+    encoder = ResultEncoder("full", False)
+    assert encoder.passthrough
+    sent = result(80)
+    assert encoder.encode(sent) is sent
+
+
+def test_unknown_verbosity_falls_back_to_full():
+    assert ResultEncoder("everything", False).verbosity == "full"
+
+
+def test_score_verbosity_keeps_score_fields_only():
+    data = ResultEncoder("score", False).encode(result(80))
+    assert data == {"success": True, "score": 80, "is_correct": True}
+
+
+def test_changes_verbosity_sends_changed_rules():
+    encoder = ResultEncoder("changes", False)
+    first = encoder.encode(result(80))
+    assert first["exercise_name"] == "ARM_STRETCH"
+    assert first["feedback_messages"] == ["Good", "Raise arm"]
+
+    second = encoder.encode(result(70, ("Good", "Lower arm")))
+    assert "exercise_name" not in second and "feedback_messages" not in second
+    assert second["changed_rules"] == {"rule_1": {"message": "Lower arm", "score": 70}}
+
+    assert "changed_rules" not in encoder.encode(result(70, ("Good", "Lower arm")))
+
+
+def test_errors_go_out_whole_at_any_verbosity():
+    error = {"success": False, "error": "No pose detected"}
+    assert ResultEncoder("score", False).encode(error) == error
+
+
+def test_deltas_start_after_the_first_ack():
+    encoder = ResultEncoder("full", True)
+    first = encoder.encode(result(80))
+    assert first["seq"] == 1 and "base" not in first
+    assert "base" not in encoder.encode(result(81))
+
+    assert encoder.ack(1)
+    delta = encoder.encode(result(81))
+    assert delta == {"score": 81, "individual_scores": {"rule_0": 81, "rule_1": 81}, "seq": 3, "base": 1}
+    assert encoder.deltas == 1
+
+
+def test_client_rebuilds_every_result():
+    encoder = ResultEncoder("full", True)
+    copies = {}
+    sent = [result(80), result(80, landmarks=[]), result(60, ("Bad",)), result(60, ("Bad",), "SQUAT")]
+    sent[2].pop("landmarks")
+    for i, full in enumerate(sent):
+        assert rebuild(copies, encoder.encode(full)) == full
+        encoder.ack(i + 1)
+
+
+def test_removed_fields_are_listed():
+    encoder = ResultEncoder("full", True)
+    encoder.encode(result(80))
+    encoder.ack(1)
+    shorter = result(80)
+    del shorter["landmarks"]
+    assert encoder.encode(shorter)["removed"] == ["landmarks"]
+
+
+def test_unknown_or_stale_ack_is_ignored():
+    encoder = ResultEncoder("full", True)
+    encoder.encode(result(80))
+    encoder.encode(result(81))
+    assert not encoder.ack(7)
+    assert encoder.ack(2)
+    # Results before the acknowledged one are forgotten
+    assert not encoder.ack(1)
+    assert encoder.stats()["unacknowledged"] == 1
+
+
+def test_keyframe_when_acks_fall_behind():
+    encoder = ResultEncoder("full", True, keyframe_interval=3)
+    encoder.encode(result(80))
+    encoder.ack(1)
+    messages = [encoder.encode(result(80 + i)) for i in range(4)]
+    assert all("base" in message for message in messages[:3])
+    assert "base" not in messages[3]
+    assert messages[3]["score"] == 83
+
+
+def test_configure_resets_to_a_whole_result():
+    encoder = ResultEncoder("full", True)
+    encoder.encode(result(80))
+    encoder.ack(1)
+    encoder.configure("full", True)
+    message = encoder.encode(result(80))
+    assert message["seq"] == 1 and "base" not in message
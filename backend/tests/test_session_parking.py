@@ -0,0 +1,92 @@
+import asyncio
+
+from session_parking import ParkedSessions
+
+
+def parking(**kwargs):
+    expired = []
+
+    async def on_expire(session_id):
+        expired.append(session_id)
+
+    return ParkedSessions(on_expire, **kwargs), expired
+
+
+def test_resume_within_ttl():
+    parked, expired = parking(ttl=30, max_parked=4)
+
+    async def main():
+        await parked.park("a")
+        await parked.park("a")
+        assert "a" in parked and len(parked) == 1
+        assert parked.resume("a")
+        assert not parked.resume("a")
+
+    asyncio.run(main())
+    assert expired == []
+    assert parked.stats()["parked"] == 1 and parked.stats()["resumed"] == 1
+
+
+def test_oldest_is_ended_when_full():
+    parked, expired = parking(ttl=30, max_parked=2)
+
+    async def main():
+        for session_id in ("a", "b", "c"):
+            await parked.park(session_id)
+
+    asyncio.run(main())
+    assert expired == ["a"]
+    assert "a" not in parked and "c" in parked
+    assert parked.counters["expired"] == 1
+
+
+def test_unresumed_sessions_expire():
+    parked, expired = parking(ttl=0.2, max_parked=4)
+
+    async def main():
+        parked.start()
+        await parked.park("a")
+        await parked.park("b")
+        parked.resume("b")
+        await asyncio.sleep(1.2)
+        await parked.close()
+
+    asyncio.run(main())
+    assert expired == ["a"]
+    assert len(parked) == 0
+
+
+def test_discarded_session_does_not_expire():
+    parked, expired = parking(ttl=0.2, max_parked=4)
+
+    async def main():
+        parked.start()
+        await parked.park("a")
+        parked.discard("a")
+        await asyncio.sleep(1.2)
+        await parked.close()
+
+    asyncio.run(main())
+    assert expired == []
+
+
+def test_expiry_errors_do_not_stop_the_reaper():
+    calls = []
+
+    async def on_expire(session_id):
+        calls.append(session_id)
+        raise RuntimeError("checker already closed")
+
+    parked = ParkedSessions(on_expire, ttl=30, max_parked=1)
+
+    async def main():
+        await parked.park("a")
+        await parked.park("b")
+
+    asyncio.run(main())
+    assert calls == ["a"] and "b" in parked
+
+
+def test_disabled_without_ttl():
+    parked, _ = parking(ttl=0, max_parked=4)
+    assert not parked.enabled
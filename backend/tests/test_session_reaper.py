@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import session_reaper
+from session_reaper import SessionReaper
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(session_reaper, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def reaper(clock):
+    heartbeats = []
+    stale = []
+
+    async def on_stale(session_id, reason):
+        stale.append((session_id, reason))
+
+    reaper = SessionReaper(heartbeats.append, on_stale, heartbeat_interval=15,
+                           heartbeat_timeout=45, idle_timeout=300)
+    reaper.heartbeats = heartbeats
+    reaper.stale = stale
+    return reaper
+
+
+def advance(reaper, clock, seconds, touch=None, frame=False):
+    """Move time forward a second at a time, checking as the background task would."""
+    for _ in range(int(seconds)):
+        clock.now += 1
+        if touch is not None:
+            reaper.touch(touch, frame)
+        asyncio.run(reaper.check())
+
+
+def test_quiet_session_gets_heartbeats(reaper, clock):
+    reaper.track("a")
+    advance(reaper, clock, 14)
+    assert reaper.heartbeats == []
+    advance(reaper, clock, 1)
+    assert reaper.heartbeats == ["a"]
+    advance(reaper, clock, 14)
+    assert reaper.heartbeats == ["a"]
+    advance(reaper, clock, 1)
+    assert reaper.heartbeats == ["a", "a"]
+
+
+def test_silent_session_is_unresponsive(reaper, clock):
+    reaper.track("a")
+    advance(reaper, clock, 44)
+    assert reaper.stale == []
+    advance(reaper, clock, 1)
+    assert reaper.stale == [("a", "unresponsive")]
+    assert "a" not in reaper.sessions
+    assert reaper.counters["reaped_unresponsive"] == 1
+
+
+def test_acks_without_frames_end_as_idle(reaper, clock):
+    reaper.track("a")
+    advance(reaper, clock, 299, touch="a")
+    assert reaper.stale == []
+    advance(reaper, clock, 1, touch="a")
+    assert reaper.stale == [("a", "idle")]
+    assert reaper.counters["reaped_idle"] == 1
+
+
+def test_frames_keep_a_session_alive(reaper, clock):
+    reaper.track("a")
+    advance(reaper, clock, 600, touch="a", frame=True)
+    assert reaper.stale == [] and reaper.heartbeats == []
+
+
+def test_forgotten_sessions_are_not_reaped(reaper, clock):
+    reaper.track("a")
+    reaper.forget("a")
+    reaper.touch("a")
+    advance(reaper, clock, 60)
+    assert reaper.stale == []
+
+
+def test_disabled_timeouts(clock):
+    stale = []
+
+    async def on_stale(session_id, reason):
+        stale.append(reason)
+
+    reaper = SessionReaper(lambda session_id: None, on_stale, heartbeat_interval=0,
+                           heartbeat_timeout=0, idle_timeout=0)
+    reaper.track("a")
+    clock.now += 10_000
+    asyncio.run(reaper.check())
+    assert stale == []
+
+
+def test_errors_ending_a_session_are_contained(clock):
+    async def on_stale(session_id, reason):
+        raise RuntimeError("socket already closed")
+
+    reaper = SessionReaper(lambda session_id: None, on_stale, heartbeat_timeout=5, idle_timeout=0)
+    reaper.track("a")
+    reaper.track("b")
+    clock.now += 5
+    asyncio.run(reaper.check())
+    assert reaper.sessions == {}
+    assert reaper.counters["reaped_unresponsive"] == 2
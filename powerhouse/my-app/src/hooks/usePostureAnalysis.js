@@ -1,5 +1,8 @@
 import { useState, useRef, useCallback, useEffect } from 'react';
 
+// Reconnect attempts after a dropped connection, 1s apart and doubling (the server keeps sessions 30s)
+const MAX_RECONNECT_ATTEMPTS = 5;
+
 // Custom hook for posture analysis
 export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
   const [isConnected, setIsConnected] = useState(false);
@@ -26,6 +29,11 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
   const canvasRef = useRef(null);
   const streamRef = useRef(null);
   const analysisIntervalRef = useRef(null);
+  const analyzeFrameRef = useRef(null);
+  // Reconnects after an unexpected close, so the server resumes the session it kept
+  const reconnectRef = useRef({ attempts: 0, timer: null, retryAfter: 0 });
+  // Frame rate and size the server asks for; starts at what the server expects by default
+  const flowRef = useRef({ target_fps: 10, max_width: 1280, max_height: 720, jpeg_quality: 0.8 });
 
   // Text-to-speech function
   const speakFeedback = useCallback((text) => {
@@ -54,6 +62,46 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
     }
   }, []);
 
+  // Open the session's WebSocket; reopened with the same id if it drops
+  const openSocket = useCallback((id) => {
+    const ws = new WebSocket(`${serverUrl}/ws/${id}`);
+    
+    ws.onopen = () => {
+      console.log('WebSocket connected');
+      reconnectRef.current.attempts = 0;
+      setIsConnected(true);
+      setError(null);
+    };
+    
+    ws.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      handleWebSocketMessage(message);
+    };
+    
+    ws.onclose = (event) => {
+      console.log('WebSocket disconnected');
+      setIsConnected(false);
+      // Still the current socket, so not closed by disconnect(), and not ended by the server on purpose:
+      // try to resume the session
+      const reconnect = reconnectRef.current;
+      if (wsRef.current === ws && event.code !== 1000 && reconnect.attempts < MAX_RECONNECT_ATTEMPTS) {
+        // A busy server says when to come back
+        const delay = Math.max(1000 * 2 ** reconnect.attempts, 1000 * reconnect.retryAfter);
+        reconnect.retryAfter = 0;
+        reconnect.attempts += 1;
+        reconnect.timer = setTimeout(() => openSocket(id), delay);
+      }
+    };
+    
+    ws.onerror = (error) => {
+      console.error('WebSocket error:', errors);
+      setError('Connection error. Please try again.');
+      setIsConnected(false);
+    };
+    
+    wsRef.current = ws;
+  }, [serverUrl]);
+
   // Initialize WebSocket connection
   const connect = useCallback(async () => {
     try {
@@ -61,47 +109,67 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
       const response = await fetch(`${serverUrl.replace('ws://', 'http://')}/session`, {
         method: 'POST',
       });
+      if (response.status === 503) {
+        const retryAfter = response.headers.get('Retry-After');
+        setError(`Server is busy. Please try again in ${retryAfter || 'a few'} seconds.`);
+        return;
+      }
       const sessionData = await response.json();
       const newSessionId = sessionData.session_id;
       
       setSessionId(newSessionId);
       
       // Connect WebSocket
-      const ws = new WebSocket(`${serverUrl}/ws/${newSessionId}`);
-      
-      ws.onopen = () => {
-        console.log('WebSocket connected');
-        setIsConnected(true);
-        setError(null);
-      };
-      
-      ws.onmessage = (event) => {
-        const message = JSON.parse(event.data);
-        handleWebSocketMessage(message);
-      };
-      
-      ws.onclose = () => {
-        console.log('WebSocket disconnected');
-        setIsConnected(false);
-      };
-      
-      ws.onerror = (error) => {
-        console.error('WebSocket error:', errors);
-        setError('Connection error. Please try again.');
-        setIsConnected(false);
-      };
-      
-      wsRef.current = ws;
+      reconnectRef.current.attempts = 0;
+      openSocket(newSessionId);
       
     } catch (error) {
       console.error('Failed to connect:', errors);
       setError('Failed to connect to server');
     }
-  }, [serverUrl]);
+  }, [serverUrl, openSocket]);
+
+  // (Re)start the capture timer at the current target frame rate
+  const scheduleAnalysis = useCallback(() => {
+    if (analysisIntervalRef.current) {
+      clearInterval(analysisIntervalRef.current);
+    }
+    const interval = 1000 / flowRef.current.target_fps;
+    analysisIntervalRef.current = setInterval(() => analyzeFrameRef.current?.(), interval);
+  }, []);
+
+  // Apply the server's flow control advice
+  const applyFlowControl = useCallback((data) => {
+    const previousFps = flowRef.current.target_fps;
+    flowRef.current = { ...flowRef.current, ...data };
+    if (analysisIntervalRef.current && flowRef.current.target_fps !== previousFps) {
+      scheduleAnalysis();
+    }
+  }, [scheduleAnalysis]);
 
   // Handle WebSocket messages
   const handleWebSocketMessage = useCallback((message) => {
     const { type, data } = message;
+    if (type === 'heartbeat') {
+      // The server closes sessions that stop answering
+      wsRef.current?.send(JSON.stringify({ type: 'heartbeat_ack', data }));
+      return;
+    }
+    if (type === 'server_busy') {
+      // The socket closes next; retry no sooner than the server asks
+      reconnectRef.current.retryAfter = data.retry_after;
+      setError(`Server is busy. Retrying in ${data.retry_after} seconds.`);
+      return;
+    }
+    if (type === 'flow_control') {
+      // Not a result: leave the displayed analysis alone
+      applyFlowControl(data);
+      return;
+    }
+    if (type === 'frame_dropped') {
+      // A newer frame replaced this one, or the server was busy; the next result follows
+      return;
+    }
     //console.log('Received message:', message);
     const imgbase = message.data.annotated_frame;
     setImageSrc(imgbase);
@@ -157,7 +225,7 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
       default:
         console.log('Unknown message type:', type);
     }
-  }, [speakFeedback]);
+  }, [speakFeedback, applyFlowControl]);
 
   // Start camera
   const startCamera = useCallback(async () => {
@@ -202,13 +270,16 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
     const video = videoRef.current;
     const canvas = canvasRef.current;
     const ctx = canvas.getContext('2d');
+    const { max_width, max_height, jpeg_quality } = flowRef.current;
     
-    canvas.width = video.videoWidth;
-    canvas.height = video.videoHeight;
+    // Downscale to the largest size the server currently accepts
+    const scale = Math.min(1, max_width / video.videoWidth, max_height / video.videoHeight);
+    canvas.width = Math.round(video.videoWidth * scale);
+    canvas.height = Math.round(video.videoHeight * scale);
     
-    ctx.drawImage(video, 0, 0);
+    ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
     
-    return canvas.toDataURL('image/jpeg', 0.8);
+    return canvas.toDataURL('image/jpeg', jpeg_quality);
   }, []);
 
   // Send frame for analysis
@@ -229,16 +300,16 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
     wsRef.current.send(JSON.stringify(message));
   }, [isConnected, captureFrame]);
 
+  useEffect(() => {
+    analyzeFrameRef.current = analyzeFrame;
+  }, [analyzeFrame]);
+
   // Start real-time analysis
   const startAnalysis = useCallback(() => {
     //console.log('Starting analysis');
-    if (analysisIntervalRef.current) {
-      clearInterval(analysisIntervalRef.current);
-    }
-    
     setIsAnalyzing(true);
-    analysisIntervalRef.current = setInterval(analyzeFrame, 100); // 10 FPS
-  }, [analyzeFrame]);
+    scheduleAnalysis(); // Server-advised rate, 10 FPS until told otherwise
+  }, [scheduleAnalysis]);
 
   // Stop real-time analysis
   const stopAnalysis = useCallback(() => {
@@ -268,9 +339,12 @@ export const usePostureAnalysis = (serverUrl = 'ws://localhost:8000') => {
     stopAnalysis();
     stopCamera();
     
+    clearTimeout(reconnectRef.current.timer);
     if (wsRef.current) {
-      wsRef.current.close();
+      const ws = wsRef.current;
       wsRef.current = null;
+      // A normal close tells the server the session is over rather than dropped
+      ws.close(1000, 'session ended');
     }
     
     setIsConnected(false);
@@ -3,10 +3,16 @@ import numpy as np
 import mediapipe as mp
 import json
 import math
+import os
+import sys
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+# The skeleton is drawn with the server's overlay renderer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from pose_overlay import PoseOverlayRenderer
+
 class ExerciseType(Enum):
     """Define different physiotherapy exercises."""
     SHOULDER_RAISE = "shoulder_raise"
@@ -34,13 +40,66 @@ class PostureScore:
     feedback_messages: List[str]
     is_correct: bool
 
+# Score bar geometry, measured from the frame's top-right corner
+BAR_WIDTH = 200
+BAR_HEIGHT = 20
+BAR_MARGIN = 20
+BAR_TOP = 30
+BAR_BACKGROUND = (100, 100, 100)
+
+class TextSprite:
+    """Static text rendered once, to copy onto frames instead of drawing it again."""
+    
+    def __init__(self, text: str, font_scale: float, color: Tuple[int, int, int], thickness: int):
+        (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        pad = thickness + 1
+        canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad, 3), dtype=np.uint8)
+        cv2.putText(canvas, text, (pad, height + pad), cv2.FONT_HERSHEY_SIMPLEX, 
+                   font_scale, color, thickness)
+        # Position of the canvas origin relative to the putText origin
+        self._set_canvas(canvas, -pad, -(height + pad))
+    
+    def _set_canvas(self, canvas: np.ndarray, dx: int, dy: int):
+        # Colours drawn here are never pure black, so any non-zero pixel was drawn
+        self.pixels = canvas
+        self.mask = canvas.any(axis=2).astype(np.uint8)
+        self.dx, self.dy = dx, dy
+    
+    @classmethod
+    def score_bar(cls) -> "TextSprite":
+        """The empty score bar with its label, placed by the bar's top-left corner."""
+        label = cls("Posture Score", 0.5, (255, 255, 255), 1)
+        label_height, label_width = label.mask.shape
+        # The label's baseline sits 5 pixels above the bar
+        top = -5 + label.dy
+        canvas = np.zeros((BAR_HEIGHT + 1 - top, max(BAR_WIDTH + 1, label_width) - label.dx, 3), dtype=np.uint8)
+        canvas[:label_height, :label_width] = label.pixels
+        cv2.rectangle(canvas, (-label.dx, -top), (BAR_WIDTH - label.dx, BAR_HEIGHT - top), BAR_BACKGROUND, -1)
+        sprite = cls.__new__(cls)
+        sprite._set_canvas(canvas, label.dx, top)
+        return sprite
+    
+    def blit(self, image: np.ndarray, origin: Tuple[int, int]):
+        """Copy the text onto ``image`` as putText at ``origin`` would draw it."""
+        x, y = origin[0] + self.dx, origin[1] + self.dy
+        h, w = self.mask.shape
+        top, left = max(0, -y), max(0, -x)
+        bottom = min(h, image.shape[0] - y)
+        right = min(w, image.shape[1] - x)
+        if top >= bottom or left >= right:
+            return
+        # cv2.copyTo writes through the view; a masked numpy copy is many times slower
+        cv2.copyTo(self.pixels[top:bottom, left:right], self.mask[top:bottom, left:right],
+                   image[y + top:y + bottom, x + left:x + right])
+
 class PhysiotherapyPostureChecker:
     def __init__(self):
         """Initialize the posture checker system."""
         # Initialize MediaPipe
         self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # Styles resolved once; bones and joints drawn in a few vectorised calls
+        self.overlay = PoseOverlayRenderer.from_mediapipe(self.mp_pose, self.mp_drawing_styles)
         
         self.pose = self.mp_pose.Pose(
             static_image_mode=False,
@@ -73,6 +132,12 @@ class PhysiotherapyPostureChecker:
         self.max_history = 30  # frames
         self.correct_pose_threshold = 0.8
         
+        # Labels that do not change between frames, rendered once each.  They are a
+        # few strings per exercise, so the cache is never pruned.  Scores and angles
+        # change every frame and are drawn directly.
+        self.text_sprites: Dict[tuple, TextSprite] = {}
+        self.score_bar = TextSprite.score_bar()
+        
     def _initialize_exercise_rules(self) -> Dict[ExerciseType, List[PostureRule]]:
         """Initialize posture rules for different exercises."""
         rules = {}
@@ -278,6 +343,15 @@ class PhysiotherapyPostureChecker:
             is_correct=is_correct
         )
     
+    def put_static_text(self, image: np.ndarray, text: str, origin: Tuple[int, int], 
+                        font_scale: float, color: Tuple[int, int, int], thickness: int):
+        """cv2.putText with FONT_HERSHEY_SIMPLEX for text that repeats across frames."""
+        key = (text, font_scale, color, thickness)
+        sprite = self.text_sprites.get(key)
+        if sprite is None:
+            sprite = self.text_sprites[key] = TextSprite(text, font_scale, color, thickness)
+        sprite.blit(image, origin)
+    
     def draw_feedback(self, image: np.ndarray, score: PostureScore) -> np.ndarray:
         """Draw feedback on the image."""
         h, w, _ = image.shape
@@ -287,45 +361,39 @@ class PhysiotherapyPostureChecker:
         score_text = f"Score: {score.overall_score:.2f}"
         status_text = "CORRECT POSTURE" if score.is_correct else "INCORRECT POSTURE"
         
-        cv2.putText(image, score_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
-                   1.0, score_color, 2)
-        cv2.putText(image, status_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 
-                   0.8, score_color, 2)
+        cv2.putText(image, score_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, score_color, 2)
+        self.put_static_text(image, status_text, (10, 60), 0.8, score_color, 2)
         
         # Draw exercise name
         exercise_name = self.current_exercise.value.replace('_', ' ').title()
-        cv2.putText(image, f"Exercise: {exercise_name}", (10, 90), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        self.put_static_text(image, f"Exercise: {exercise_name}", (10, 90), 0.7, (255, 255, 255), 2)
         
-        # Draw feedback messages
+        # Draw feedback messages; they carry the current angles, so they differ every frame
         y_offset = 120
         for msg in score.feedback_messages[:5]:  # Show only first 5 messages
             color = (0, 255, 0) if msg.startswith("✓") else (0, 100, 255)
-            cv2.putText(image, msg, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 
-                       0.5, color, 1)
+            cv2.putText(image, msg, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
             y_offset += 25
         
-        # Draw score bar
-        bar_width = 200
-        bar_height = 20
-        bar_x = w - bar_width - 20
-        bar_y = 30
-        
-        # Background bar
-        cv2.rectangle(image, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), 
-                     (100, 100, 100), -1)
-        
-        # Score bar
-        score_width = int(bar_width * score.overall_score)
-        cv2.rectangle(image, (bar_x, bar_y), (bar_x + score_width, bar_y + bar_height), 
+        # Draw score bar: the empty bar and its label at once, then the filled part
+        bar_x = w - BAR_WIDTH - BAR_MARGIN
+        bar_y = BAR_TOP
+        self.score_bar.blit(image, (bar_x, bar_y))
+        score_width = int(BAR_WIDTH * score.overall_score)
+        cv2.rectangle(image, (bar_x, bar_y), (bar_x + score_width, bar_y + BAR_HEIGHT), 
                      score_color, -1)
         
-        # Bar text
-        cv2.putText(image, "Posture Score", (bar_x, bar_y - 5), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        
         return image
     
+    def failed_rule_joints(self, score: PostureScore) -> List[int]:
+        """Landmark indices of the joints in rules that were not met."""
+        joints = set()
+        for i, rule in enumerate(self.exercise_rules.get(self.current_exercise, [])):
+            if score.individual_scores.get(f"rule_{i}", 1.0) < 1.0:
+                for joint in (rule.joint1, rule.joint2, rule.joint3):
+                    joints.add(self.landmark_names[joint])
+        return sorted(joints)
+    
     def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, PostureScore]:
         """Process a single frame for posture analysis."""
         # Convert to RGB
@@ -334,16 +402,15 @@ class PhysiotherapyPostureChecker:
         # Process pose
         results = self.pose.process(rgb_frame)
         
-        # Draw pose landmarks
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-            )
-        
         # Evaluate posture
         score = self.evaluate_posture(results)
         
+        # Draw pose landmarks, marking the joints of rules that were not met
+        if results.pose_landmarks:
+            landmarks = np.array([(lm.x, lm.y, lm.z, lm.visibility)
+                                  for lm in results.pose_landmarks.landmark], dtype=np.float32)
+            self.overlay.draw(frame, landmarks, self.failed_rule_joints(score))
+        
         # Draw feedback
         frame = self.draw_feedback(frame, score)
         